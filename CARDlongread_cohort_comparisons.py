@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# cross-cohort significance tests for CARDlongread_extract_summary_statistics.py (--cohort_comparisons)
+# every summary statistics property is tested with a Kruskal-Wallis test across all groups and pairwise Mann-Whitney U tests between groups,
+# each with asymptotic and permutation p-values and Benjamini-Hochberg adjusted p-values
+# properties of a source table with values for the same runs are ranked once (and once per group pair) as columns of one matrix
+# and share their permuted group labels, so permutation rank sums of all of them come from one matrix product per batch of permutations
+import math
+import itertools
+import numpy as np
+import pandas as pd
+
+# random keys per batch of permutations (permutations x rows), bounding memory of permuted group label matrices
+permutation_batch_values = 4000000
+# tolerance for permuted statistics equal to observed statistic
+permutation_tolerance = 1e-9
+
+# average ranks of each column, with missing values left missing
+def get_average_ranks(values):
+    return pd.DataFrame(values).rank(method='average').to_numpy()
+
+# sum of t^3 - t over tied value counts t of each column, for tie corrections
+def get_tie_sums(values):
+    tie_sums = np.zeros(values.shape[1])
+    for i in range(values.shape[1]):
+        tie_counts = np.unique(values[:,i],return_counts=True)[1]
+        tie_sums[i] = float(np.sum(tie_counts**3 - tie_counts))
+    return tie_sums
+
+# upper tail probability of chi-square distribution, as regularized upper incomplete gamma function Q(df/2, statistic/2)
+# series expansion below a + 1 and continued fraction above, as in Numerical Recipes gammq
+def get_chi_square_p_value(statistic,df):
+    if np.isnan(statistic):
+        return np.nan
+    a = df/2
+    x = statistic/2
+    if x <= 0:
+        return 1.0
+    log_prefactor = -x + a*math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = 1/a
+        total = term
+        for n in range(1,1000):
+            term = term*x/(a + n)
+            total = total + term
+            if abs(term) < abs(total)*1e-15:
+                break
+        return max(0.0,1 - total*math.exp(log_prefactor))
+    b = x + 1 - a
+    c = 1/1e-300
+    d = 1/b
+    h = d
+    for n in range(1,1000):
+        an = -n*(n - a)
+        b = b + 2
+        d = an*d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an/c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1/d
+        h = h*d*c
+        if abs(d*c - 1) < 1e-15:
+            break
+    return math.exp(log_prefactor)*h
+
+# Benjamini-Hochberg adjusted p-values, ignoring missing p-values
+def get_benjamini_hochberg_p_values(p_values):
+    p_values = np.asarray(p_values,dtype=float)
+    adjusted_p_values = np.full(len(p_values),np.nan)
+    tested = np.flatnonzero(~np.isnan(p_values))
+    if len(tested) == 0:
+        return adjusted_p_values
+    order = tested[np.argsort(p_values[tested])]
+    # step-up adjustment with running minimum from largest p-value down
+    scaled_p_values = p_values[order]*len(tested)/np.arange(1,len(tested) + 1)
+    adjusted_p_values[order] = np.minimum(np.minimum.accumulate(scaled_p_values[::-1])[::-1],1)
+    return adjusted_p_values
+
+# permuted group rank sums of every column for batches of permutations of group labels
+# labels are group indices 0 to group_count - 1 of each row; yields (permutations in batch x groups x columns) arrays
+# each permutation gives the rows with the smallest random keys to the first group, the next smallest to the second group, and so on,
+# and rank sums of the first groups together come from one matrix product per group boundary
+def get_permuted_rank_sums(labels,ranks,group_count,permutations,rng):
+    group_ends = np.cumsum(np.bincount(labels,minlength=group_count))[:-1]
+    total_rank_sums = ranks.sum(axis=0)
+    permutations_per_batch = max(1,permutation_batch_values//len(labels))
+    for batch_start in range(0,permutations,permutations_per_batch):
+        batch_size = min(permutations_per_batch,permutations - batch_start)
+        keys = rng.random((batch_size,len(labels)))
+        # sorting each row is faster than partitioning it at the group boundaries
+        thresholds = np.sort(keys,axis=1)[:,group_ends - 1]
+        cumulative_rank_sums = np.stack([(keys <= thresholds[:,[i]]).astype(float) @ ranks for i in range(group_count - 1)],axis=1)
+        yield np.diff(cumulative_rank_sums,axis=1,prepend=0,append=np.broadcast_to(total_rank_sums,(batch_size,1,len(total_rank_sums))))
+
+# Kruskal-Wallis tests across groups for every column of values with same rows present
+# returns (statistics, asymptotic p-values, permutation p-values) per column
+def get_kruskal_wallis_tests(values,labels,group_count,permutations,rng):
+    ranks = get_average_ranks(values)
+    total = len(labels)
+    group_sizes = np.bincount(labels,minlength=group_count).astype(float)
+    # statistic without tie correction, which is the same for every permutation
+    def get_uncorrected_statistics(rank_sums):
+        return 12/(total*(total + 1))*np.sum(rank_sums**2/group_sizes[:,None],axis=-2) - 3*(total + 1)
+    uncorrected_statistics = get_uncorrected_statistics(np.stack([ranks[labels == i].sum(axis=0) for i in range(group_count)]))
+    tie_corrections = 1 - get_tie_sums(values)/(total**3 - total)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        statistics = np.where(tie_corrections > 0,uncorrected_statistics/tie_corrections,np.nan)
+    p_values = np.array([get_chi_square_p_value(i,group_count - 1) for i in statistics])
+    permutation_p_values = np.full(len(statistics),np.nan)
+    if permutations > 0:
+        exceedances = np.zeros(len(statistics))
+        for permuted_rank_sums in get_permuted_rank_sums(labels,ranks,group_count,permutations,rng):
+            exceedances = exceedances + np.sum(get_uncorrected_statistics(permuted_rank_sums) >= uncorrected_statistics - permutation_tolerance,axis=0)
+        permutation_p_values = np.where(np.isnan(statistics),np.nan,(exceedances + 1)/(permutations + 1))
+    return (statistics,p_values,permutation_p_values)
+
+# Mann-Whitney U tests between first (label 0) and second (label 1) group for every column of values with same rows present
+# asymptotic p-values use normal approximation with tie and continuity corrections; permutation p-values are two-sided
+# returns (U statistics of first group, asymptotic p-values, permutation p-values) per column
+def get_mann_whitney_tests(values,labels,permutations,rng):
+    ranks = get_average_ranks(values)
+    total = len(labels)
+    first_size = np.sum(labels == 0)
+    second_size = total - first_size
+    # deviation of first group rank sum from its expected value, which fixes U for given group sizes
+    expected_rank_sum = first_size*(total + 1)/2
+    rank_sums = ranks[labels == 0].sum(axis=0)
+    statistics = rank_sums - first_size*(first_size + 1)/2
+    standard_deviations = np.sqrt(first_size*second_size/12*((total + 1) - get_tie_sums(values)/(total*(total - 1))))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        z_scores = np.where(standard_deviations > 0,np.maximum(np.abs(statistics - first_size*second_size/2) - 0.5,0)/standard_deviations,np.nan)
+    p_values = np.array([math.erfc(i/math.sqrt(2)) if not np.isnan(i) else np.nan for i in z_scores])
+    permutation_p_values = np.full(len(statistics),np.nan)
+    if permutations > 0:
+        exceedances = np.zeros(len(statistics))
+        for permuted_rank_sums in get_permuted_rank_sums(labels,ranks,2,permutations,rng):
+            exceedances = exceedances + np.sum(np.abs(permuted_rank_sums[:,0,:] - expected_rank_sum) >= np.abs(rank_sums - expected_rank_sum) - permutation_tolerance,axis=0)
+        permutation_p_values = np.where(np.isnan(z_scores),np.nan,(exceedances + 1)/(permutations + 1))
+    return (statistics,p_values,permutation_p_values)
+
+# split columns of source table into sets of columns with same rows present, so each set is ranked and permuted together
+# returns list of (row mask, column indices)
+def get_column_sets(values):
+    column_sets = {}
+    for i in range(values.shape[1]):
+        present = ~np.isnan(values[:,i])
+        column_sets.setdefault(present.tobytes(),(present,[]))[1].append(i)
+    return list(column_sets.values())
+
+# significance tests between groups for every property of every source table
+# tables is a dictionary of source tables named as in summary_statistics_properties, each with group variable column
+# returns data frame with one Kruskal-Wallis row per property, followed by pairwise Mann-Whitney U rows per property
+def get_cohort_comparisons(tables,properties,group_variable,group_names,permutations=10000,seed=1):
+    rng = np.random.default_rng(seed)
+    # include properties whose source table and column are present, as in summary statistics
+    properties = [i for i in properties if (tables[i[1]] is not None) and (i[2] in tables[i[1]])]
+    group_pairs = list(itertools.combinations(group_names,2))
+    kruskal_wallis_rows = {}
+    mann_whitney_rows = {}
+    for table_name in dict.fromkeys(i[1] for i in properties):
+        table_properties = [i for i in properties if i[1] == table_name]
+        table = tables[table_name]
+        table = table[table[group_variable].isin(group_names)]
+        labels = pd.Categorical(table[group_variable],categories=group_names).codes
+        values = np.column_stack([pd.to_numeric(table[i[2]],errors='coerce').to_numpy(dtype=float) for i in table_properties])
+        for present, columns in get_column_sets(values):
+            # Kruskal-Wallis test across groups with values
+            present_labels = labels[present]
+            present_groups = np.unique(present_labels)
+            if len(present_groups) >= 2:
+                (statistics,p_values,permutation_p_values) = get_kruskal_wallis_tests(values[present][:,columns],np.searchsorted(present_groups,present_labels),len(present_groups),permutations,rng)
+            else:
+                (statistics,p_values,permutation_p_values) = (np.full(len(columns),np.nan),)*3
+            for idx, i in enumerate(columns):
+                kruskal_wallis_rows[table_properties[i][0]] = [table_properties[i][0],'All groups','Kruskal-Wallis',int(present.sum()),statistics[idx],p_values[idx],permutation_p_values[idx]]
+            # pairwise Mann-Whitney U tests
+            for first_group, second_group in group_pairs:
+                pair_rows = np.isin(present_labels,[group_names.index(first_group),group_names.index(second_group)])
+                pair_labels = (present_labels[pair_rows] != group_names.index(first_group)).astype(int)
+                if (np.sum(pair_labels == 0) > 0) and (np.sum(pair_labels == 1) > 0):
+                    (statistics,p_values,permutation_p_values) = get_mann_whitney_tests(values[present][pair_rows][:,columns],pair_labels,permutations,rng)
+                else:
+                    (statistics,p_values,permutation_p_values) = (np.full(len(columns),np.nan),)*3
+                for idx, i in enumerate(columns):
+                    mann_whitney_rows[(table_properties[i][0],first_group,second_group)] = [table_properties[i][0],first_group + ' vs. ' + second_group,'Mann-Whitney U',int(pair_rows.sum()),statistics[idx],p_values[idx],permutation_p_values[idx]]
+    columns = ['Property','Comparison','Test','Total','Statistic','p-value','Permutation p-value']
+    # list rows in property order, then group pair order
+    kruskal_wallis_df = pd.DataFrame([kruskal_wallis_rows[i[0]] for i in properties],columns=columns)
+    mann_whitney_df = pd.DataFrame([mann_whitney_rows[(i[0],j,k)] for i in properties for j, k in group_pairs],columns=columns)
+    # adjust for multiple testing within each test type
+    for i in [kruskal_wallis_df,mann_whitney_df]:
+        i['Statistic'] = i['Statistic'].round(3)
+        i.insert(6,'Adjusted p-value',get_benjamini_hochberg_p_values(i['p-value']))
+        i['Adjusted permutation p-value'] = get_benjamini_hochberg_p_values(i['Permutation p-value'])
+    return pd.concat([kruskal_wallis_df,mann_whitney_df],ignore_index=True)
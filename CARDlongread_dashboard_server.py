@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# local HTTP service for the MinKNOW run report dashboard
+# run tables, platform QC checks, and delivery dates/batches are read once at startup and kept in memory with pandas, seaborn, and matplotlib already imported,
+# so that summary statistics, single plot PNGs, and XLSX exports for filtered subsets of runs are served without cold starts or re-reading tables
+# processed tables and responses of recent queries are kept in least recently used caches
+# all arguments other than those below are CARDlongread_extract_summary_statistics.py arguments (e.g., -input, -names, -platform_qc)
+#
+# endpoints (all GET; filters are where, date_from, date_to, experiment, and group query parameters, which may be repeated for experiment and group):
+# /summary           summary statistics and distributions per group in JSON format
+# /plots             names of plots available for filtered runs in JSON format
+# /plot?name=NAME    PNG image of one plot
+# /xlsx              full dashboard workbook for filtered runs
+import argparse
+import ast
+import copy
+import json
+import os
+import re
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import CARDlongread_extract_summary_statistics as summary_statistics
+import CARDlongread_flow_cell_index
+
+# least recently used cache of query results, safe to use from request threads
+class LRUCache:
+    def __init__(self,max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    # get cached value, or None if not cached
+    def get(self,key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    # add value, evicting least recently used values above max entries
+    def put(self,key,value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+# dashboard state kept in memory between requests
+dashboard = {}
+# plot rendering and workbook export share matplotlib and module level plot tables, so only one request renders at a time
+render_lock = threading.Lock()
+
+# subroutine to parse command line arguments, returning (parsed arguments, arguments for summary statistics script)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve MinKNOW run report dashboard summary statistics, plots, and workbooks for filtered runs over HTTP from a warm process. Other arguments are passed to CARDlongread_extract_summary_statistics.py.", allow_abbrev=False)
+    parser.add_argument("--host", default="127.0.0.1", help="Host address to listen on (optional; default 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8050, help="Port to listen on (optional; default 8050).")
+    # argument for browser dashboards served from other origins
+    parser.add_argument("--allow_origin", nargs="+", default=[], help="Origins (e.g., http://127.0.0.1:8080) of browser dashboards allowed to read responses across origins; no other website can (optional; default none).")
+    # arguments for caches
+    parser.add_argument("--cache_size", type=int, default=128, help="Number of query responses (summaries, plots, workbooks) kept in least recently used cache (optional; default 128).")
+    parser.add_argument("--table_cache_size", type=int, default=8, help="Number of filtered and processed table sets kept in least recently used cache (optional; default 8).")
+    return parser.parse_known_args()
+
+# read input run tables, platform QC checks, and delivery dates/batches once and keep them in dashboard state
+def load_dashboard(summary_statistics_args,cache_size,table_cache_size):
+    results = summary_statistics.parse_args(summary_statistics_args)
+    if results.input_file is None:
+        quit('ERROR: No input file (-input) provided!')
+    # input tables as read from TSV, one per group
+    source_tables = [pd.read_csv(i,sep='\t') for i in results.input_file]
+    for i, j in zip(source_tables,results.input_file):
+        i.attrs['name'] = j
+    if results.group_column is not None:
+        if len(source_tables) > 1:
+            quit('ERROR: Group column (-group_column) requires a single input file.')
+        (input_tables,names) = summary_statistics.split_run_table_by_group_column(source_tables[0],results.group_column,results.names)
+    else:
+        (input_tables,names) = (source_tables,results.names)
+        if (len(input_tables) > 1) and ((names is None) or (len(names) != len(input_tables))):
+            quit('ERROR: Number of names (-names) is different from number of input files.')
+    if names is None:
+        names = [None]
+    # check startup run date filters and normalize to YYYY-MM-DD for comparison with run dates and query filters
+    for i in ['date_from','date_to']:
+        if getattr(results,i) is not None:
+            try:
+                setattr(results,i,datetime.strptime(getattr(results,i),'%Y-%m-%d').strftime('%Y-%m-%d'))
+            except ValueError:
+                quit('ERROR: -' + i + ' must be a date in YYYY-MM-DD format.')
+    # platform QC checks and delivery dates/batches of all flow cells in input tables
+    (platform_qc_from_index,delivery_date_batches_from_index) = summary_statistics.use_flow_cell_index(results)
+    flow_cell_ids = pd.concat([i['Flow Cell ID'] for i in input_tables],ignore_index=True).dropna().astype(str).unique()
+    platform_qc_table = None
+    if results.platform_qc is not None:
+        platform_qc_table = CARDlongread_flow_cell_index.lookup_platform_qc(results.flow_cell_index,flow_cell_ids) if platform_qc_from_index else pd.read_csv(results.platform_qc)
+    delivery_date_batches_table = None
+    if results.delivery_date_batches is not None:
+        delivery_date_batches_table = summary_statistics.read_delivery_date_batches(results,delivery_date_batches_from_index,flow_cell_ids)
+    # output tables and timings are only written by the command line script
+    for i in ['output_table_with_run_type','output_table_with_storage_time','output_table_with_platform_qc','summary_state','rollup_cube','timings']:
+        setattr(results,i,None)
+    results.timings_sheet = False
+    # check plot selection (-plots, -skip_plots) once at startup
+    summary_statistics.select_report_plots(results.plots,results.skip_plots)
+    dashboard.update({'results' : results, 'input_tables' : dict(zip(names,input_tables)),
+    'platform_qc_table' : platform_qc_table, 'delivery_date_batches_table' : delivery_date_batches_table,
+    'platform_qc_from_index' : platform_qc_from_index, 'delivery_date_batches_from_index' : delivery_date_batches_from_index,
+    'table_cache' : LRUCache(table_cache_size), 'response_cache' : LRUCache(cache_size)})
+
+# run summary statistics script function from request thread
+# the script stops with quit() on bad options and empty filtered tables, which is raised as ValueError with its message instead
+def run_summary_statistics_function(function,*arguments):
+    try:
+        return function(*arguments)
+    except SystemExit as error:
+        raise ValueError(str(error.code).removeprefix('ERROR: ')) from None
+
+# syntax allowed in where filters of queries: comparisons of input table columns with values, joined with and/or/not (or &, |, ~)
+where_filter_nodes = (ast.Expression,ast.BoolOp,ast.And,ast.Or,ast.UnaryOp,ast.Not,ast.Invert,ast.USub,ast.BinOp,ast.BitAnd,ast.BitOr,
+ast.Compare,ast.Eq,ast.NotEq,ast.Lt,ast.LtE,ast.Gt,ast.GtE,ast.In,ast.NotIn,ast.Name,ast.Load,ast.Constant,ast.List,ast.Tuple)
+
+# check where filter of query against allowed syntax, raising ValueError otherwise
+# pandas query expressions can also call functions and methods and read local variables (@name), which HTTP clients must not do
+def check_where_filter(where):
+    columns = set(j for i in dashboard['input_tables'].values() for j in i.columns)
+    # backtick quoted column names (e.g., `N50 (kb)`) are parsed as placeholder names
+    quoted_columns = {}
+    def quote_column(match):
+        quoted_columns['_quoted_column_' + str(len(quoted_columns))] = match.group(1)
+        return '_quoted_column_' + str(len(quoted_columns) - 1)
+    try:
+        where_tree = ast.parse(re.sub('`([^`]*)`',quote_column,where),mode='eval')
+    except SyntaxError:
+        raise ValueError('where must compare input table columns with values, e.g. `N50 (kb)` > 20 and `Sequencer ID` == \'PC48B098\'.') from None
+    for i in ast.walk(where_tree):
+        if not isinstance(i,where_filter_nodes):
+            raise ValueError('where may only compare input table columns with values using and, or, and not; ' + type(i).__name__ + ' is not allowed.')
+        if isinstance(i,ast.BinOp) and not isinstance(i.op,(ast.BitAnd,ast.BitOr)):
+            raise ValueError('where may only combine comparisons with & and |, not arithmetic.')
+        if isinstance(i,ast.UnaryOp) and isinstance(i.op,ast.USub) and not isinstance(i.operand,ast.Constant):
+            raise ValueError('where may only negate numbers.')
+        if isinstance(i,ast.Constant) and not isinstance(i.value,(str,int,float,bool,type(None))):
+            raise ValueError('where may only compare columns with strings and numbers.')
+        if isinstance(i,ast.Name) and (quoted_columns.get(i.id,i.id) not in columns):
+            raise ValueError('Unknown column ' + quoted_columns.get(i.id,i.id) + ' in where.')
+
+# filters of query as hashable cache key
+# bad filters raise ValueError
+# returns (where, date_from, date_to, experiments, groups)
+def get_query_filters(query):
+    filters = {}
+    for i in ['where','date_from','date_to']:
+        filters[i] = query[i][-1] if i in query else None
+    if filters['where'] is not None:
+        check_where_filter(filters['where'])
+    # check run date filters and normalize to YYYY-MM-DD for comparison with run dates
+    for i in ['date_from','date_to']:
+        if filters[i] is not None:
+            try:
+                filters[i] = datetime.strptime(filters[i],'%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                raise ValueError(i + ' must be a date in YYYY-MM-DD format.') from None
+    experiments = tuple(sorted(query['experiment'])) if 'experiment' in query else None
+    groups = tuple(query['group']) if 'group' in query else tuple(dashboard['input_tables'])
+    for i in groups:
+        if i not in dashboard['input_tables']:
+            raise ValueError('Unknown group ' + str(i) + '.')
+    return (filters['where'],filters['date_from'],filters['date_to'],experiments,groups)
+
+# summary statistics script options for filters and groups, applied to copy of startup options
+# query filters narrow the startup run filters (-where, -date_from, -date_to, -experiment) rather than replacing them, so runs excluded at startup are never served
+def get_query_results(query_filters):
+    (where,date_from,date_to,experiments,groups) = query_filters
+    results = copy.copy(dashboard['results'])
+    startup_results = dashboard['results']
+    # runs must match both where expressions, fall within both date ranges, and be in both experiment lists
+    where_expressions = [i for i in [startup_results.where,where] if i is not None]
+    results.where = ' and '.join('(' + i + ')' for i in where_expressions) if len(where_expressions) > 0 else None
+    results.date_from = max([i for i in [startup_results.date_from,date_from] if i is not None],default=None)
+    results.date_to = min([i for i in [startup_results.date_to,date_to] if i is not None],default=None)
+    if experiments is None:
+        results.experiments = startup_results.experiments
+    elif startup_results.experiments is None:
+        results.experiments = list(experiments)
+    else:
+        results.experiments = [i for i in experiments if i in startup_results.experiments]
+    results.input_file = [dashboard['input_tables'][i] for i in groups]
+    results.names = list(groups) if len(groups) > 1 else None
+    # keep colors of selected groups
+    if (results.colors is not None) and (len(groups) > 1):
+        results.colors = [results.colors[list(dashboard['input_tables']).index(i)] for i in groups]
+    return results
+
+# filtered and processed tables for query filters, reused from table cache if filters seen recently
+# returns (options, tables by source table name, grouped)
+def get_query_tables(query_filters):
+    query_tables = dashboard['table_cache'].get(query_filters)
+    if query_tables is None:
+        results = get_query_results(query_filters)
+        run_filters = {'where' : results.where, 'date_from' : results.date_from, 'date_to' : results.date_to, 'experiments' : results.experiments}
+        # joins add columns to platform QC and delivery tables, so each request thread joins its own copies of warm tables
+        platform_qc_table = dashboard['platform_qc_table'].copy() if dashboard['platform_qc_table'] is not None else None
+        delivery_date_batches_table = dashboard['delivery_date_batches_table'].copy() if dashboard['delivery_date_batches_table'] is not None else None
+        (longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,grouped) = run_summary_statistics_function(summary_statistics.get_report_tables,results,run_filters,dashboard['platform_qc_from_index'],dashboard['delivery_date_batches_from_index'],platform_qc_table,delivery_date_batches_table)
+        tables = {'runs' : longread_extract, 'platform_qc' : longread_extract_with_platform_qc_and_diff, 'experiments' : longread_extract_flow_cells_and_output_per_experiment, 'flow_cells' : longread_extract_output_per_flow_cell}
+        # add plot columns before caching, so cached tables are only read by request threads
+        summary_statistics.add_plot_columns(tables)
+        query_tables = (results,tables,grouped)
+        dashboard['table_cache'].put(query_filters,query_tables)
+    return query_tables
+
+# data frame as JSON records with missing values as null
+def get_json_records(df):
+    return json.loads(df.to_json(orient='records',date_format='iso'))
+
+# summary statistics and distributions per group in JSON format
+def get_summary_response(query_filters):
+    (results,tables,grouped) = get_query_tables(query_filters)
+    summary_statistics_per_group = summary_statistics.longread_platform_qc_summary_statistics(tables['runs'],tables['platform_qc'],tables['experiments'],tables['flow_cells'],'Group' if grouped else None,results.names)
+    summary = {}
+    for i, (combined_summary_stats_df,minknow_version_dist,sample_rate_dist,flow_cells_per_experiment_dist) in summary_statistics_per_group.items():
+        # name single selected group after itself rather than all runs
+        summary[(query_filters[4][0] or 'All runs') if i is None else i] = {'Summary statistics' : get_json_records(combined_summary_stats_df), 'Flow cells per experiment' : get_json_records(flow_cells_per_experiment_dist),
+        'MinKNOW version' : get_json_records(minknow_version_dist), 'Sample rate' : get_json_records(sample_rate_dist), 'Runs' : int((tables['runs']['Group'] == i).sum()) if grouped else len(tables['runs'])}
+    return ('application/json',json.dumps({'groups' : summary}).encode())
+
+# legend patches from legend colors and labels of startup options
+def get_legend_patches(results):
+    if (results.legend_colors is None) or (results.legend_labels is None):
+        return None
+    import matplotlib.patches as mpatches
+    return [mpatches.Patch(color=i, label=j) for i, j in zip(results.legend_colors,results.legend_labels)]
+
+# plot jobs for filtered runs in worksheet order
+def get_query_plot_jobs(query_filters):
+    (results,tables,grouped) = get_query_tables(query_filters)
+    group_variable = None
+    if grouped is True:
+        group_variable = 'Group and count' if results.show_group_count is True else 'Group'
+    return summary_statistics.make_report_plot_sequence(results,tables,group_variable,get_legend_patches(results),results.colors,results.strip_plot)
+
+# names of plots available for filtered runs in JSON format
+def get_plots_response(query_filters):
+    return ('application/json',json.dumps({'plots' : [i[0] for i in get_query_plot_jobs(query_filters)]}).encode())
+
+# PNG images of plot jobs, reusing plots from response cache and plot cache (-plot_cache) if provided, and rendering and caching the rest
+# plot jobs are rendered under render lock by callers
+def get_cached_plot_images(query_filters,plot_jobs,plot_tables):
+    results = dashboard['results']
+    plot_images = [dashboard['response_cache'].get(('/plot',query_filters,i[0])) for i in plot_jobs]
+    uncached_indexes = [idx for idx, i in enumerate(plot_images) if i is None]
+    rendered_plot_images = summary_statistics.get_plot_images([plot_jobs[i] for i in uncached_indexes],plot_tables,1,results.plot_cache,results.plot_cache_max_mb)
+    for idx, i in zip(uncached_indexes,rendered_plot_images):
+        plot_images[idx] = ('image/png',i)
+        dashboard['response_cache'].put(('/plot',query_filters,plot_jobs[idx][0]),plot_images[idx])
+    return [i[1] for i in plot_images]
+
+# PNG image of one plot
+def get_plot_response(query_filters,plot_name):
+    plot_jobs = [i for i in get_query_plot_jobs(query_filters) if i[0] == plot_name]
+    if len(plot_jobs) == 0:
+        raise ValueError('Plot ' + str(plot_name) + ' not available for these runs.')
+    (results,tables,grouped) = get_query_tables(query_filters)
+    with render_lock:
+        return ('image/png',get_cached_plot_images(query_filters,plot_jobs,tables)[0])
+
+# full dashboard workbook for filtered runs, written from cached tables with cached plots
+def get_xlsx_response(query_filters):
+    (results,tables,grouped) = get_query_tables(query_filters)
+    rollup_cube = None
+    if results.rollup_cube_sheet is True:
+        rollup_cube = summary_statistics.get_rollup_cube({'runs' : tables['runs'], 'platform_qc' : tables['platform_qc']},summary_statistics.summary_statistics_properties,'Group' if grouped else None)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        # workbook is written to temporary file of this request
+        results = copy.copy(results)
+        results.output_file = os.path.join(temporary_dir,'dashboard.xlsx')
+        # plots share matplotlib state
+        with render_lock:
+            summary_statistics.write_report_workbook(results,tables['runs'],tables['platform_qc'],tables['experiments'],tables['flow_cells'],grouped,get_legend_patches(results),rollup_cube,
+            plot_images_function=lambda plot_jobs, plot_tables: get_cached_plot_images(query_filters,plot_jobs,plot_tables))
+        with open(results.output_file,'rb') as infile:
+            return ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',infile.read())
+
+# request handler serving dashboard endpoints from response cache
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        endpoints = {'/summary' : get_summary_response, '/plots' : get_plots_response, '/plot' : get_plot_response, '/xlsx' : get_xlsx_response}
+        if url.path not in endpoints:
+            self.send_error(404,'Endpoints are ' + ', '.join(endpoints))
+            return
+        try:
+            query_filters = get_query_filters(query)
+            plot_name = query['name'][-1] if 'name' in query else None
+            response_key = (url.path,query_filters,plot_name)
+            response = dashboard['response_cache'].get(response_key)
+            if response is None:
+                response = get_plot_response(query_filters,plot_name) if url.path == '/plot' else endpoints[url.path](query_filters)
+                dashboard['response_cache'].put(response_key,response)
+        # bad queries and filters leaving no runs are reported with message
+        except ValueError as error:
+            self.send_error(400,'ERROR: ' + str(error))
+            return
+        # other errors are logged with traceback and reported rather than dropping the connection
+        except Exception as error:
+            self.log_error('%s',traceback.format_exc())
+            self.send_error(500,'ERROR: ' + type(error).__name__ + ': ' + str(error))
+            return
+        (content_type,content) = response
+        self.send_response(200)
+        self.send_header('Content-Type',content_type)
+        self.send_header('Content-Length',str(len(content)))
+        if url.path == '/xlsx':
+            self.send_header('Content-Disposition','attachment; filename="dashboard.xlsx"')
+        # allow only browser dashboards of origins given on command line to read run data
+        if self.headers.get('Origin') in dashboard['allowed_origins']:
+            self.send_header('Access-Control-Allow-Origin',self.headers.get('Origin'))
+            self.send_header('Vary','Origin')
+        self.end_headers()
+        self.wfile.write(content)
+
+# main script subroutine
+def main():
+    # Parse the arguments
+    (args, summary_statistics_args) = parse_args()
+    load_dashboard(summary_statistics_args,args.cache_size,args.table_cache_size)
+    dashboard['allowed_origins'] = args.allow_origin
+    # import plotting stack and process unfiltered tables before first request
+    import seaborn
+    import matplotlib.pyplot
+    get_query_tables(get_query_filters({}))
+    server = ThreadingHTTPServer((args.host,args.port),DashboardRequestHandler)
+    print("Serving dashboard on http://" + args.host + ":" + str(args.port) + "/ (endpoints /summary, /plots, /plot?name=..., /xlsx)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ import pandas as pd
 import numpy as np
 import argparse
 import dataclasses
+# for reading ahead JSON reports in background threads
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dateutil.parser import isoparse
 # get fields from json
 def get_fields_from_json(input_json_dict):
@@ -373,24 +376,6 @@ def get_fields_from_json(input_json_dict):
         fields_from_json.starting_adapter_sequencing_percentage = 'NA'
         fields_from_json.average_adapter_sequencing_percentage = 'NA'
     return fields_from_json
-# load json file list
-# user input
-inparser = argparse.ArgumentParser(description = 'Extract data from long read JSON report')
-inparser.add_argument('--json_dir', default=None, type=str, help = 'path to directory containing JSON files, if converting whole directory')
-inparser.add_argument('--filelist', default=None, type=str, help = 'text file containing list of all JSON reports to parse')
-inparser.add_argument('--output', action="store", type=str, dest="output_file", help="Output long read JSON report summary table in tab-delimited format")
-args = inparser.parse_args()
-# get list of files
-if args.json_dir is not None:
-    files = glob.glob(f'{args.json_dir}/*.json')
-elif args.filelist is not None:
-    with open(args.filelist, 'r') as infile:
-        files = [x.strip() for x in infile.readlines()]
-else:
-    quit('ERROR: No directory (--json_dir) or file list (--filelist) provided!')
-# create output data frame
-# set indices
-sequencing_report_df_indices = [np.arange(0,len(files))]
 # set column names in same order as described in GitHub readme
 sequencing_report_column_names = ['Experiment Name',
 'Sample Name',
@@ -429,62 +414,186 @@ sequencing_report_column_names = ['Experiment Name',
 'Average Adapter Sequencing Percentage',
 'Start Run ISO Timestamp',
 'Start Run Timestamp']
-# initialize data frame with said column names and filenames as indexes
-sequencing_report_df = pd.DataFrame(index=sequencing_report_df_indices,columns=sequencing_report_column_names)
-# main loop to process files
-for idx, x in enumerate(files):
-    try:
-        # JSON file
-        # debug by printing JSON file to stdout
-        # print(x)
-        f = open (x, "r")
-        # Reading Python dictionary from JSON file
-        data = orjson.loads(f.read())
-        # get important information
-        current_data_fields = get_fields_from_json(data)
-        sequencing_report_df.loc[idx] = [current_data_fields.experiment_name,
-        current_data_fields.sample_name,
-        current_data_fields.run_date,
-        current_data_fields.prom_id,
-        current_data_fields.flow_cell_position,
-        current_data_fields.flow_cell_id,
-        current_data_fields.flow_cell_product_code,
-        current_data_fields.data_output,
-        current_data_fields.read_count,
-        current_data_fields.n50,
-        current_data_fields.minknow_version,
-        current_data_fields.sample_rate,
-        current_data_fields.starting_median_translocation_speed,
-        current_data_fields.average_median_translocation_speed_over_time,
-        current_data_fields.weighted_average_median_translocation_speed_over_time,
-        current_data_fields.starting_median_q_score,
-        current_data_fields.average_median_q_score_over_time,
-        current_data_fields.weighted_average_median_q_score_over_time,
-        current_data_fields.passed_bases,
-        current_data_fields.failed_bases,
-        current_data_fields.passed_reads,
-        current_data_fields.failed_reads,
-        current_data_fields.percentage_bases_passed,
-        current_data_fields.percentage_reads_passed,
-        current_data_fields.modal_q_score_passed,
-        current_data_fields.modal_q_score_failed,
-        current_data_fields.starting_active_pores,
-        current_data_fields.second_active_pore_count,
-        current_data_fields.average_active_pores,
-        current_data_fields.active_pore_auc,
-        current_data_fields.average_active_pore_change_rate,
-        current_data_fields.starting_pore_occupancy,
-        current_data_fields.average_pore_occupancy,
-        current_data_fields.starting_adapter_sequencing_percentage,
-        current_data_fields.average_adapter_sequencing_percentage,
-        current_data_fields.iso_timestamp,
-        current_data_fields.timestamp]
-    except ValueError as e:
-        print("File causing error:",x)
-        print(e)
-        continue
-# print output data frame to tab delimited tsv file
-sequencing_report_df.to_csv(args.output_file,sep='\t',index=False)
-# end program
-quit()
 
+# get run table row from fields of one JSON report in column order
+def get_run_table_row(current_data_fields):
+    return [current_data_fields.experiment_name,
+    current_data_fields.sample_name,
+    current_data_fields.run_date,
+    current_data_fields.prom_id,
+    current_data_fields.flow_cell_position,
+    current_data_fields.flow_cell_id,
+    current_data_fields.flow_cell_product_code,
+    current_data_fields.data_output,
+    current_data_fields.read_count,
+    current_data_fields.n50,
+    current_data_fields.minknow_version,
+    current_data_fields.sample_rate,
+    current_data_fields.starting_median_translocation_speed,
+    current_data_fields.average_median_translocation_speed_over_time,
+    current_data_fields.weighted_average_median_translocation_speed_over_time,
+    current_data_fields.starting_median_q_score,
+    current_data_fields.average_median_q_score_over_time,
+    current_data_fields.weighted_average_median_q_score_over_time,
+    current_data_fields.passed_bases,
+    current_data_fields.failed_bases,
+    current_data_fields.passed_reads,
+    current_data_fields.failed_reads,
+    current_data_fields.percentage_bases_passed,
+    current_data_fields.percentage_reads_passed,
+    current_data_fields.modal_q_score_passed,
+    current_data_fields.modal_q_score_failed,
+    current_data_fields.starting_active_pores,
+    current_data_fields.second_active_pore_count,
+    current_data_fields.average_active_pores,
+    current_data_fields.active_pore_auc,
+    current_data_fields.average_active_pore_change_rate,
+    current_data_fields.starting_pore_occupancy,
+    current_data_fields.average_pore_occupancy,
+    current_data_fields.starting_adapter_sequencing_percentage,
+    current_data_fields.average_adapter_sequencing_percentage,
+    current_data_fields.iso_timestamp,
+    current_data_fields.timestamp]
+
+# get list of JSON report files from directory or file list
+def get_json_report_files(json_dir=None,filelist=None):
+    if json_dir is not None:
+        files = glob.glob(f'{json_dir}/*.json')
+    elif filelist is not None:
+        with open(filelist, 'r') as infile:
+            files = [x.strip() for x in infile.readlines()]
+    else:
+        quit('ERROR: No directory (--json_dir) or file list (--filelist) provided!')
+    return files
+
+# get JSON report file list per cohort from 'name=list.txt' cohort arguments, in argument order
+def get_cohort_json_report_files(cohorts):
+    cohort_files = {}
+    for i in cohorts:
+        (name, separator, filelist) = i.partition('=')
+        if (separator == '') or (name == '') or (filelist == ''):
+            quit('ERROR: Cohorts (--cohorts) must be given as name=list.txt, not ' + i + '.')
+        if name in cohort_files:
+            quit('ERROR: Cohort name ' + name + ' given more than once.')
+        cohort_files[name] = get_json_report_files(filelist=filelist)
+    return cohort_files
+
+# read bytes of one JSON report file
+def read_json_report(x):
+    with open(x, "rb") as f:
+        return f.read()
+
+# yield (file, bytes) of JSON report files in order, reading up to read_ahead next files in background threads
+# file reads wait on storage latency rather than CPU, so reading ahead overlaps network filesystem latency with JSON decoding of the current report
+# read errors are raised when the failing file is reached, as in a serial read
+def read_json_reports(files,read_ahead=0):
+    if read_ahead <= 0:
+        for x in files:
+            yield (x, read_json_report(x))
+        return
+    with ThreadPoolExecutor(max_workers=read_ahead) as executor:
+        # bounded queue of pending reads keeps at most read_ahead + 1 reports in memory
+        pending_reads = deque()
+        files = iter(files)
+        for x in files:
+            pending_reads.append((x, executor.submit(read_json_report,x)))
+            if len(pending_reads) > read_ahead:
+                break
+        while len(pending_reads) > 0:
+            (x, pending_read) = pending_reads.popleft()
+            # queue next file before waiting on current one
+            next_file = next(files, None)
+            if next_file is not None:
+                pending_reads.append((next_file, executor.submit(read_json_report,next_file)))
+            yield (x, pending_read.result())
+
+# extract run table from JSON report files, with 'NA' for fields missing from reports
+# reports that cannot be parsed are reported and left as empty rows
+# read_ahead sets number of files read ahead in background threads while current report is decoded (0 reads serially)
+def extract_run_table(files,read_ahead=0):
+    # create output data frame
+    # set indices
+    sequencing_report_df_indices = [np.arange(0,len(files))]
+    # initialize data frame with said column names and filenames as indexes
+    sequencing_report_df = pd.DataFrame(index=sequencing_report_df_indices,columns=sequencing_report_column_names)
+    # main loop to process files
+    for idx, (x, json_report) in enumerate(read_json_reports(files,read_ahead)):
+        try:
+            # JSON file
+            # debug by printing JSON file to stdout
+            # print(x)
+            # Reading Python dictionary from JSON file
+            data = orjson.loads(json_report)
+            # get important information
+            current_data_fields = get_fields_from_json(data)
+            sequencing_report_df.loc[idx] = get_run_table_row(current_data_fields)
+        except ValueError as e:
+            print("File causing error:",x)
+            print(e)
+            continue
+    return sequencing_report_df
+
+# extract run table per cohort, parsing each report listed in any cohort only once
+# cohort_files is a dictionary of JSON report file lists per cohort name; returns dictionary of run tables per cohort name
+# each cohort table has the same rows, in the same order, as extracting its file list on its own
+def extract_cohort_run_tables(cohort_files,read_ahead=0):
+    # union of file lists in order of first appearance
+    unique_files = list(dict.fromkeys(x for files in cohort_files.values() for x in files))
+    unique_file_rows = {x : idx for idx, x in enumerate(unique_files)}
+    sequencing_report_df = extract_run_table(unique_files,read_ahead)
+    return {name : sequencing_report_df.iloc[[unique_file_rows[x] for x in files]] for name, files in cohort_files.items()}
+
+# combine cohort run tables into one run table with cohort names in Group column
+# used with -group_column Group in CARDlongread_extract_summary_statistics.py
+def combine_cohort_run_tables(cohort_run_tables):
+    return pd.concat([i.assign(Group=name) for name, i in cohort_run_tables.items()],ignore_index=True)
+
+# convert extracted run table to the types that reading its tab-delimited output would give
+# 'NA' fields become missing values, numeric columns become numbers, and other columns hold strings
+# used to hand run tables straight to CARDlongread_extract_summary_statistics.py without writing and re-reading TSV
+def get_typed_run_table(sequencing_report_df):
+    typed_run_table = sequencing_report_df.replace('NA',np.nan).reset_index(drop=True)
+    for i in typed_run_table.columns:
+        try:
+            typed_run_table[i] = pd.to_numeric(typed_run_table[i])
+        except (ValueError, TypeError):
+            typed_run_table[i] = typed_run_table[i].where(typed_run_table[i].isna(),typed_run_table[i].astype(str))
+    return typed_run_table
+
+# load json file list
+# user input
+def parse_args():
+    inparser = argparse.ArgumentParser(description = 'Extract data from long read JSON report')
+    inparser.add_argument('--json_dir', default=None, type=str, help = 'path to directory containing JSON files, if converting whole directory')
+    inparser.add_argument('--filelist', default=None, type=str, help = 'text file containing list of all JSON reports to parse')
+    inparser.add_argument('--output', action="store", type=str, dest="output_file", help="Output long read JSON report summary table in tab-delimited format")
+    inparser.add_argument('--cohorts', default=None, nargs='+', type=str, help = 'cohorts as name=list.txt, where list.txt lists JSON reports of cohort; reports in several lists are parsed once (instead of --json_dir or --filelist)')
+    inparser.add_argument('--cohort_output', default=None, type=str, help = 'output file name template for one tab-delimited table per cohort with {name} replaced by cohort name, e.g. {name}_output.tsv; with --cohorts, --output writes one table with cohort names in Group column')
+    inparser.add_argument('--read_ahead', default=8, type=int, help = 'number of JSON reports to read ahead in background threads while current report is parsed, to hide network filesystem latency; 0 reads serially (default 8)')
+    return inparser.parse_args()
+
+# main script subroutine
+def main():
+    args = parse_args()
+    # extract all cohorts in one pass
+    if args.cohorts is not None:
+        if (args.output_file is None) and (args.cohort_output is None):
+            quit('ERROR: No output table (--output) or per cohort output template (--cohort_output) provided!')
+        if (args.cohort_output is not None) and ('{name}' not in args.cohort_output):
+            quit('ERROR: Per cohort output template (--cohort_output) must contain {name}.')
+        cohort_run_tables = extract_cohort_run_tables(get_cohort_json_report_files(args.cohorts),args.read_ahead)
+        if args.cohort_output is not None:
+            for name, i in cohort_run_tables.items():
+                i.to_csv(args.cohort_output.replace('{name}',name),sep='\t',index=False)
+        if args.output_file is not None:
+            combine_cohort_run_tables(cohort_run_tables).to_csv(args.output_file,sep='\t',index=False)
+        return
+    # get list of files
+    files = get_json_report_files(args.json_dir,args.filelist)
+    sequencing_report_df = extract_run_table(files,args.read_ahead)
+    # print output data frame to tab delimited tsv file
+    sequencing_report_df.to_csv(args.output_file,sep='\t',index=False)
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
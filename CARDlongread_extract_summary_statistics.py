@@ -2,83 +2,217 @@
 
 import pandas as pd
 import numpy as np
-import seaborn as sb
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import statistics
 import argparse
-import dataclasses
-# excel export with openpyxl
-import openpyxl
-# and xlsxwriter with pandas, though that could be modified to use openpyxl as well
-import xlsxwriter
+# plotting stack (seaborn, matplotlib) and excel export with xlsxwriter are imported where used
+# so that --tables_only runs never load them
 # for image saving
 from io import BytesIO
+# for rendering plots in parallel
+import os
+from concurrent.futures import ProcessPoolExecutor
+# for content-addressed plot cache
+import hashlib
+# for ownership and permission checks of stage cache files
+import stat
 # for date/time conversions
 from datetime import datetime, timezone
+from dateutil import tz
+# persistent flow cell index of platform QC checks and delivery dates/batches
+import CARDlongread_flow_cell_index
+# persisted, mergeable summary statistics state
+import CARDlongread_summary_state
+# cross-cohort significance tests
+import CARDlongread_cohort_comparisons
+# for stage timings
+import time
+import json
+from contextlib import contextmanager
+# peak resident memory is read from resource usage where available (not on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
 
-# get summary statistics (min, max, range, mean, median, mode, and standard deviation for N50, sequence output, and flow cells per sample)
-def get_summary_statistics(column):
-    # define summary statistics class
-    @dataclasses.dataclass
-    class summary_statistics:
-        total : int = 0
-        min : float = 0
-        max : float = 0
-        range : float = 0
-        mean : float = 0
-        median : float = 0
-        mode : float = 0
-        stdev : float = 0
-	# take single column of data frame as input
-	# fill summary statistics class with each statistic
-    # note that the line below should be used to give the total run count (across experiments and samples). Not useful with unique experiments, samples, etc.
-    # as in flow cells per unique sample
-    # later altered total to exclude NA values
-    # summary_statistics.total = len(column)
-    summary_statistics.total = column.count()
-    # only calculate statistics if at least one non-NA element
-    if summary_statistics.total > 0:
-        # summary_statistics.min = min(column)
-        summary_statistics.min = column.min()
-        # summary_statistics.max = max(column)
-        summary_statistics.max = column.max()
-        summary_statistics.range = summary_statistics.max - summary_statistics.min
-        # drop nas before calculating below if necessary
-        # summary_statistics.mean = statistics.mean(column)
-        # replaced statistics library calls with numpy calls
-        # round to 3 decimal places
-        summary_statistics.mean = round(np.nanmean(column),3)
-        summary_statistics.median = round(np.nanmedian(column),3)
-        summary_statistics.mode = round(statistics.mode(column),3)
-        summary_statistics.stdev = round(np.nanstd(column),3)
+# stage timings as records of stage, item, nesting depth, wall time, and peak resident memory, or None if timings not recorded
+stage_timings = None
+# number of stages in progress
+stage_timing_depth = 0
+# process recording stage timings ('main', or 'worker' and process ID in worker processes), since peak memory is per process
+stage_timing_process = 'main'
+
+# start recording stage timings
+def start_stage_timings():
+    global stage_timings
+    stage_timings = []
+
+# peak resident memory of this process so far in megabytes (ru_maxrss is in kilobytes on Linux and bytes on macOS)
+def get_peak_memory_mb():
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak_memory/1024/1024 if os.uname().sysname == 'Darwin' else peak_memory/1024,1)
+
+# record wall time and peak resident memory of stage if stage timings recorded
+# peak memory is the process high-water mark at stage end, and its increase shows stages that raised it
+@contextmanager
+def time_stage(stage_name,stage_item=None):
+    global stage_timing_depth
+    if stage_timings is None:
+        yield
+        return
+    # records are listed in order of stage start
+    stage_timing = {'Stage' : stage_name, 'Item' : stage_item, 'Process' : stage_timing_process, 'Depth' : stage_timing_depth}
+    stage_timings.append(stage_timing)
+    stage_timing_depth = stage_timing_depth + 1
+    start_peak_memory = get_peak_memory_mb()
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_timing_depth = stage_timing_depth - 1
+        peak_memory = get_peak_memory_mb()
+        stage_timing.update({'Seconds' : round(time.perf_counter() - start_time,3), 'Peak memory (MB)' : peak_memory, 'Peak memory increase (MB)' : round(peak_memory - start_peak_memory,1) if peak_memory is not None else None})
+
+# run function in worker process with stage timings recorded, returning (function result, stage timings)
+# records are labelled with worker process ID, as peak memory of worker processes is not that of main process
+def run_with_stage_timings(function,*arguments):
+    global stage_timing_process, stage_timing_depth
+    stage_timing_process = 'worker ' + str(os.getpid())
+    stage_timing_depth = 0
+    start_stage_timings()
+    result = function(*arguments)
+    return (result,stage_timings)
+
+# map function over arguments in process pool executor, collecting stage timings from worker processes if stage timings recorded
+def map_with_stage_timings(executor,function,*arguments):
+    if stage_timings is None:
+        return list(executor.map(function,*arguments))
+    results = []
+    for result, worker_stage_timings in executor.map(run_with_stage_timings,*([[function]*len(arguments[0])] + list(arguments))):
+        results.append(result)
+        stage_timings.extend(worker_stage_timings)
+    return results
+
+# write stage timings and total wall time to JSON file
+def write_stage_timings(timings_file,total_seconds):
+    with open(timings_file,'w') as outfile:
+        json.dump({'Total seconds' : round(total_seconds,3), 'Stages' : stage_timings},outfile,indent=1)
+
+# summary statistics report properties in report order as (property name, source table, column)
+# source tables are the run table ('runs'), run table joined with platform QC ('platform_qc'), flow cells/output per experiment ('experiments'), and output per flow cell ('flow_cells')
+summary_statistics_properties = [('Read N50 (kb)','runs','N50 (kb)'),
+('Run data output (Gb)','runs','Data output (Gb)'),
+('Run read count (millions)','runs','Read Count (M)'),
+('Starting active pores','runs','Starting Active Pores'),
+('Average active pores','runs','Average Active Pores'),
+('Platform QC active pores','platform_qc','total_pore_count'),
+('Pore difference','platform_qc','Pore Difference'),
+('Flow cells per experiment','experiments','Flow Cells'),
+('Flow cell output (Gb)','flow_cells','Flow cell output (Gb)'),
+('Total experiment output (Gb)','experiments','Total output (Gb)'),
+('Active pore AUC','runs','Active Pore AUC'),
+('Starting pore occupancy','runs','Starting Pore Occupancy'),
+('Average pore occupancy','runs','Average Pore Occupancy'),
+('Passed modal Q score','runs','Passed Modal Q Score'),
+('Failed modal Q score','runs','Failed Modal Q Score'),
+('Starting translocation speed','runs','Starting Median Translocation Speed'),
+('Average translocation speed','runs','Average Median Translocation Speed Over Time'),
+('Starting median Q score','runs','Starting Median Q Score'),
+('Average median Q score','runs','Average Median Q Score Over Time'),
+('Passed bases (Gb)','runs','Passed Bases (Gb)'),
+('Failed bases (Gb)','runs','Failed Bases (Gb)'),
+('Percentage passed bases','runs','Percentage Passed Bases'),
+('Storage time (days)','runs','Storage Time (Days)')]
+
+# get summary statistics (total, min, max, mean, median, mode, and standard deviation) for every property and every group in a single pass
+# tables is a dictionary of source tables named as in summary_statistics_properties
+# returns dictionary of summary statistics data frames per group name (None if no group variable)
+def get_batched_summary_statistics(tables, properties, group_variable=None, group_names=None):
+    # stack every property column into one long table of group, property, and value
+    # use empty group name if no group variable set
+    long_table_list = [pd.DataFrame({'Group' : tables[table_name][group_variable].astype(str) if group_variable is not None else '', 'Property' : property_name, 'Value' : pd.to_numeric(tables[table_name][column])}) for property_name, table_name, column in properties]
+    long_table = pd.concat(long_table_list, ignore_index=True)
+    if group_variable is None:
+        group_names = ['']
+    property_names = [i[0] for i in properties]
+    # aggregate count, min, max, mean, median, and standard deviation in one groupby pass
+    # total excludes NA values
+    # population standard deviation as with np.nanstd
+    grouped_values = long_table.groupby(['Group','Property'], sort=False)['Value']
+    summary_statistics_df = grouped_values.agg(['count','min','max','mean','median'])
+    summary_statistics_df['stdev'] = grouped_values.std(ddof=0)
+    # mode as most frequent value, taking first value seen in case of ties (as statistics.mode does)
+    # groupby with sort=False keeps values in order of first appearance, and idxmax returns first maximum
+    value_counts = long_table.dropna(subset=['Value']).groupby(['Group','Property','Value'], sort=False).size()
+    if len(value_counts) > 0:
+        summary_statistics_df['mode'] = value_counts.groupby(level=['Group','Property'], sort=False).idxmax().map(lambda x: x[2])
     else:
-        summary_statistics.min = np.nan
-        summary_statistics.max = np.nan
-        summary_statistics.range = np.nan
-        summary_statistics.mean = np.nan
-        summary_statistics.median = np.nan
-        summary_statistics.mode = np.nan
-        summary_statistics.stdev = np.nan
-    # return data structure with each summary statistic as an attribute
-    return summary_statistics
+        summary_statistics_df['mode'] = np.nan
+    # fill in every group/property combination, including those without any values
+    summary_statistics_df = summary_statistics_df.reindex(pd.MultiIndex.from_product([group_names, property_names], names=['Group','Property']))
+    summary_statistics_df['count'] = summary_statistics_df['count'].fillna(0).astype(int)
+    # round to 3 decimal places
+    summary_statistics_df[['mean','median','mode','stdev']] = summary_statistics_df[['mean','median','mode','stdev']].round(3)
+    # split into one summary statistics report data frame per group
+    summary_statistics_df = summary_statistics_df.reset_index().rename(columns={'count':'Total','min':'Min','max':'Max','mean':'Mean','median':'Median','mode':'Mode','stdev':'Standard Deviation'})
+    summary_statistics_per_group = {}
+    for group_name, group_summary_statistics_df in summary_statistics_df.groupby('Group', sort=False):
+        summary_statistics_per_group[group_name if group_variable is not None else None] = group_summary_statistics_df[['Property','Total','Min','Max','Mean','Median','Mode','Standard Deviation']].set_index(pd.Index(property_names))
+    # return dictionary of summary statistics data frames
+    return summary_statistics_per_group
+
+# dimensions of rollup cube after group (if any)
+rollup_cube_dimensions = ['Run month','Flow Cell Product Code','Sequencer ID','Flow Cell Position']
+
+# get rollup cube of run level properties over group, run month, flow cell product code, sequencer ID, and flow cell position
+# each cell holds count, sum, sum of squares, min, and max per property, so any slice or roll-up is found by adding cells
+# (mean = sum/count, population variance = sum of squares/count - mean^2, min of mins and max of maxes)
+# tables is a dictionary of source tables named as in summary_statistics_properties; only 'runs' and 'platform_qc' properties are additive over runs
+def get_rollup_cube(tables, properties, group_variable=None):
+    dimensions = ([group_variable] if group_variable is not None else []) + rollup_cube_dimensions
+    cube = None
+    for table_name, run_count_name in [('runs','Runs'),('platform_qc','Runs with platform QC')]:
+        if tables[table_name] is None:
+            continue
+        table = tables[table_name]
+        table_properties = [i for i in properties if (i[1] == table_name) and (i[2] in table)]
+        # dimension columns with run month from run date, plus property values and their squares
+        cube_input = pd.DataFrame({i : table[i] for i in dimensions if i != 'Run month'}).assign(**{'Run month' : table['Run Date'].astype(str).str[:7]})
+        for property_name, _, column in table_properties:
+            cube_input[property_name] = pd.to_numeric(table[column])
+            # widen downcast integer columns so that sums of squares do not overflow
+            if pd.api.types.is_integer_dtype(cube_input[property_name]):
+                cube_input[property_name] = cube_input[property_name].astype('int64')
+            cube_input[property_name + ' squared'] = cube_input[property_name]**2
+        # aggregate every cell in one groupby pass, keeping missing dimension values as their own cells
+        grouped_input = cube_input.groupby(dimensions, dropna=False, observed=True)
+        table_cube = pd.DataFrame({run_count_name : grouped_input.size()})
+        for property_name, _, column in table_properties:
+            table_cube[property_name + ' count'] = grouped_input[property_name].count()
+            table_cube[property_name + ' sum'] = grouped_input[property_name].sum()
+            table_cube[property_name + ' sum of squares'] = grouped_input[property_name + ' squared'].sum()
+            table_cube[property_name + ' min'] = grouped_input[property_name].min()
+            table_cube[property_name + ' max'] = grouped_input[property_name].max()
+        # platform qc cells are a subset of run cells
+        cube = table_cube if cube is None else cube.join(table_cube)
+    # empty cells for run counts of cells without platform qc
+    if 'Runs with platform QC' in cube:
+        cube['Runs with platform QC'] = cube['Runs with platform QC'].fillna(0).astype(int)
+    # return one row per cell with dimension columns first
+    return cube.reset_index()
     
 # get output per flow cell in two column list
 def get_output_per_flow_cell(flow_cell_IDs, output, topup):
     # make data frame of flow cell IDs and output
-    flow_cells_to_output = pd.concat([flow_cell_IDs, output, topup], axis=1, join='inner')
-    # find unique flow cells
-    unique_flow_cells = np.unique(flow_cell_IDs.astype(str))
+    flow_cells_to_output = pd.concat([flow_cell_IDs.astype(str), output, topup.astype(object)], axis=1, join='inner')
+    # add up output and collect unique run types in order of appearance per flow cell in one grouped pass, sorted by flow cell ID
+    grouped_flow_cells = flow_cells_to_output.groupby('Flow Cell ID', sort=True)
+    unique_topup_per_flow_cell = grouped_flow_cells['Run type'].unique()
     # create output_per_flow_cell_df data frame
-    output_per_flow_cell_df = pd.DataFrame({'Flow Cell ID' : unique_flow_cells}, index=unique_flow_cells, columns=['Flow Cell ID','Flow cell output (Gb)','Run type'])
-    # find flow cells and total output per unique experiment by iterating through unique experiment names
-    for i in unique_flow_cells:
-        unique_outputs_per_flow_cell = pd.unique(flow_cells_to_output[flow_cells_to_output['Flow Cell ID'] == i]['Data output (Gb)'])
-        unique_topup_per_flow_cell = pd.unique(flow_cells_to_output[flow_cells_to_output['Flow Cell ID'] == i]['Run type'])
-        # total_unique_outputs_per_flow_cell = len(unique_outputs_per_flow_cell)
-        total_output_per_flow_cell = sum(flow_cells_to_output[flow_cells_to_output['Flow Cell ID'] == i]['Data output (Gb)'])
-        output_per_flow_cell_df['Flow cell output (Gb)'][i] = total_output_per_flow_cell
-        output_per_flow_cell_df['Run type'][i] = unique_topup_per_flow_cell
+    # show single run type if only one, otherwise all run types per flow cell
+    output_per_flow_cell_df = pd.DataFrame({'Flow Cell ID' : unique_topup_per_flow_cell.index,
+    'Flow cell output (Gb)' : grouped_flow_cells['Data output (Gb)'].sum(),
+    'Run type' : unique_topup_per_flow_cell.where(unique_topup_per_flow_cell.str.len() > 1, unique_topup_per_flow_cell.str[0])}, columns=['Flow Cell ID','Flow cell output (Gb)','Run type']).rename_axis(None)
     # convert flow cell output total to numeric type for plotting
     output_per_flow_cell_df['Flow cell output (Gb)'] = pd.to_numeric(output_per_flow_cell_df['Flow cell output (Gb)'])
     # return flow_cells_per_experiment_df data frame
@@ -96,18 +230,13 @@ def get_flow_cells_and_output_per_experiment(experiments, flow_cell_IDs, output)
     experiments = experiments.str.replace(r'-', '_', regex=True)
     # make data frame of experiment names and flow cell IDs
     flow_cells_and_output_to_experiments = pd.concat([experiments, flow_cell_IDs, output], axis=1, join='inner')
-    # find unique experiment names
-    unique_experiments = np.unique(experiments)
-    # initialized flow_cells_per_experiment list
+    # count unique flow cells and add up output per experiment in one grouped pass, sorted by experiment name
+    grouped_experiments = flow_cells_and_output_to_experiments.groupby('Experiment Name', sort=True)
+    total_unique_flow_cells_per_experiment = grouped_experiments['Flow Cell ID'].nunique(dropna=False)
     # create flow_cells_per_experiment_df data frame
-    flow_cells_and_output_per_experiment_df = pd.DataFrame({'Experiment Name' : unique_experiments}, index=unique_experiments, columns=['Experiment Name','Flow Cells','Total output (Gb)'])
-    # find flow cells and total output per unique experiment by iterating through unique experiment names
-    for i in unique_experiments:
-        unique_flow_cells_per_experiment = pd.unique(flow_cells_and_output_to_experiments[flow_cells_and_output_to_experiments['Experiment Name'] == i]['Flow Cell ID'])
-        total_unique_flow_cells_per_experiment = len(unique_flow_cells_per_experiment)
-        total_output_per_experiment = sum(flow_cells_and_output_to_experiments[flow_cells_and_output_to_experiments['Experiment Name'] == i]['Data output (Gb)'])
-        flow_cells_and_output_per_experiment_df['Flow Cells'][i] = total_unique_flow_cells_per_experiment
-        flow_cells_and_output_per_experiment_df['Total output (Gb)'][i] = total_output_per_experiment
+    flow_cells_and_output_per_experiment_df = pd.DataFrame({'Experiment Name' : total_unique_flow_cells_per_experiment.index,
+    'Flow Cells' : total_unique_flow_cells_per_experiment,
+    'Total output (Gb)' : grouped_experiments['Data output (Gb)'].sum()}, columns=['Experiment Name','Flow Cells','Total output (Gb)']).rename_axis(None)
     # convert output flow cell counts and total output totals to numeric type for plotting
     flow_cells_and_output_per_experiment_df['Flow Cells'] = pd.to_numeric(flow_cells_and_output_per_experiment_df['Flow Cells'])
     flow_cells_and_output_per_experiment_df['Total output (Gb)'] = pd.to_numeric(flow_cells_and_output_per_experiment_df['Total output (Gb)'])
@@ -117,49 +246,30 @@ def get_flow_cells_and_output_per_experiment(experiments, flow_cell_IDs, output)
 # return flow cells per experiment distribution
 # get total experiment count for each number of flow cells needed to complete experiment (approach 30x?)
 def get_flow_cells_per_experiment_dist(column):
-    # put distribution in flow_cells_per_experiment_dist
-    # turn arange list into array and then 1d array with np.array() and flatten()
-    flow_cells_per_experiment_dist = np.histogram(column, bins = np.array([np.arange(1,max(column)+2)]).flatten())
+    # count experiments per number of flow cells from 1 to maximum with value_counts
+    # groups without experiments (e.g., after run filters) get empty distribution
+    flow_cells_per_experiment_dist = column.value_counts().reindex(np.arange(1,(column.max() if len(column) > 0 else 0)+1), fill_value=0)
     # put output into labeled data frame for export
-    flow_cells_per_experiment_dist_df = pd.DataFrame({'Flow Cells' : flow_cells_per_experiment_dist[1][0:max(column)], 'Frequency' : flow_cells_per_experiment_dist[0]}, columns=['Flow Cells', 'Frequency'])
+    flow_cells_per_experiment_dist_df = pd.DataFrame({'Flow Cells' : flow_cells_per_experiment_dist.index, 'Frequency' : flow_cells_per_experiment_dist.values}, columns=['Flow Cells', 'Frequency'])
     # return flow_cells_per_experiment_df data frame
     return flow_cells_per_experiment_dist_df
 
+# get frequency distribution of a column with value_counts, sorted by value
+# used for MinKNOW version and sample rate distributions
+def get_value_dist(column, column_name):
+    # leave out unused categories of categorical columns
+    value_dist = column.value_counts().sort_index()
+    value_dist = value_dist[value_dist > 0]
+    # return data frame with values and counts per value
+    return pd.DataFrame({column_name : value_dist.index, 'Frequency' : value_dist.values}, index=value_dist.index, columns=[column_name, 'Frequency'])
+
 # get MinKNOW version distribution
 def get_minknow_version_dist(column):
-    # unique minknow versions
-    unique_minknow_versions = np.unique(column)
-    # create minknow_version_dist_df data frame
-    minknow_version_dist_df = pd.DataFrame({'MinKNOW Version' : unique_minknow_versions}, index=unique_minknow_versions, columns=['MinKNOW Version', 'Frequency'])
-    # count numbers of each in dataset
-    for i in unique_minknow_versions:
-        minknow_version_dist_df['Frequency'][i] = list(column).count(i)
-    # return data frame with versions and counts per version
-    return minknow_version_dist_df
+    return get_value_dist(column, 'MinKNOW Version')
     
 # get sample rate distribution
 def get_sample_rate_dist(column):
-    # unique sample rates
-    unique_sample_rates = np.unique(column)
-    # create sample_rate_dist_df data frame
-    sample_rate_dist_df = pd.DataFrame({'Sample Rate (Hz)' : unique_sample_rates}, index=unique_sample_rates, columns=['Sample Rate (Hz)', 'Frequency'])
-    # count numbers of each in dataset
-    for i in unique_sample_rates:
-        sample_rate_dist_df.loc[i, 'Frequency'] = list(column).count(i)
-    # return data frame with versions and counts per version
-    return sample_rate_dist_df
-    
-# make summary statistic data frame
-def make_summary_statistics_data_frame(summary_statistics_set, property_names):
-    # set column names
-    column_names = ['Property', 'Total', 'Min', 'Max', 'Mean', 'Median', 'Mode', 'Standard Deviation']
-    # initialize data frame
-    summary_statistics_df = pd.DataFrame(index=property_names, columns=column_names)
-    # iterate through each property and populate data frame with summary_statistics_set attributes
-    for idx, name in enumerate(property_names):
-        summary_statistics_df.loc[name] = [property_names[idx],summary_statistics_set[idx].total,summary_statistics_set[idx].min,summary_statistics_set[idx].max,summary_statistics_set[idx].mean,summary_statistics_set[idx].median,summary_statistics_set[idx].mode,summary_statistics_set[idx].stdev]
-    # return populated summary statistics data frame
-    return summary_statistics_df
+    return get_value_dist(column, 'Sample Rate (Hz)')
     
 # identify topups and reconnections (flow cell moved and run restarted)
 # later modified this to change "Initial run" designation to "Standard run" and "Interrupted"
@@ -189,20 +299,16 @@ def identify_reconnections(data):
     # make copy of initial data to be modified further
     # sort data with reconnections by date and time so that first chronological run is "Interrupted" and subsequent are "Reconnection"
     data_with_reconnections = data.copy().sort_values(by='Start Run Timestamp')
-    # get duplicate flow cells and remove NAs/NaNs
-    duplicate_flow_cell_ids=data_with_reconnections[data_with_reconnections['Flow Cell ID'].duplicated()]['Flow Cell ID'].dropna()
-    # loop through rows of data frame on duplicate flow cell ids
-    for i in duplicate_flow_cell_ids:
-        # get current duplicate flow cell ID data frame rows
-        current_duplicate_flow_cell_id_df = data_with_reconnections[data_with_reconnections['Flow Cell ID'] == i]
-        # get indexes to reference original df
-        current_duplicate_flow_cell_id_indexes=current_duplicate_flow_cell_id_df.index
-        # check if same sample name in all cases
-        if (current_duplicate_flow_cell_id_df['Sample Name'].nunique() == 1):
-            # set run type first instance to Interrupted [0]
-            data_with_reconnections.loc[current_duplicate_flow_cell_id_indexes[0],'Run type'] = 'Interrupted'
-            # set run type second and subsequent instances to Reconnection [1:]
-            data_with_reconnections.loc[current_duplicate_flow_cell_id_indexes[1:],'Run type'] = 'Reconnection'
+    # find flow cells run more than once (excluding NAs/NaNs) with the same sample name in all cases
+    flow_cell_groups = data_with_reconnections.groupby('Flow Cell ID', observed=True)
+    reconnected_flow_cell = (flow_cell_groups['Flow Cell ID'].transform('size') > 1) & (flow_cell_groups['Sample Name'].transform('nunique') == 1)
+    reconnected_flow_cell = reconnected_flow_cell.reindex(data_with_reconnections.index, fill_value=False)
+    # first chronological instance per flow cell
+    first_flow_cell_run = ~data_with_reconnections['Flow Cell ID'].duplicated()
+    # set run type first instance to Interrupted
+    data_with_reconnections.loc[reconnected_flow_cell & first_flow_cell_run,'Run type'] = 'Interrupted'
+    # set run type second and subsequent instances to Reconnection
+    data_with_reconnections.loc[reconnected_flow_cell & ~first_flow_cell_run,'Run type'] = 'Reconnection'
     # prior method left below as comments
     # loop through rows of data frame on Flow Cell ID column
     # for idx, i in enumerate(data['Flow Cell ID']):
@@ -222,12 +328,46 @@ def identify_reconnections(data):
     # return data frame with algorithmically detected reconnections in topups column
     return data_with_reconnections
     
-# make violinplot/swarmplot figure worksheet in output workbook
-def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,workbook,worksheet_name,x_axis_title=None,cutoff=None,title=None,top_up=None):
+# add worksheet with PNG image data at A1 to output workbook
+def add_image_worksheet(workbook,worksheet_name,image_data):
+    import xlsxwriter
     # create worksheet for figure output
-    worksheet=workbook.create_sheet(worksheet_name)
+    worksheet=workbook.add_worksheet(worksheet_name)
+    # xlsxwriter scales images by 96/dpi of PNG, so scale back up to show image at full pixel size
+    img = xlsxwriter.image.Image(BytesIO(image_data))
+    # add image to worksheet at A1
+    worksheet.insert_image('A1',worksheet_name + '.png',{'image_data' : BytesIO(image_data), 'x_scale' : img.x_dpi/96, 'y_scale' : img.y_dpi/96})
+
+# deterministically subsample data points per group for large groups
+# keeps all points if no group has more than max_points values
+def subsample_plot_points(data,input_variable,group_variable,max_points):
+    if (max_points is None) or (max_points <= 0):
+        return data
+    point_data=data.dropna(subset=[input_variable])
+    # shuffle points with fixed seed, then keep the first max_points per group in original row order
+    shuffled_point_data=point_data.sample(frac=1,random_state=0)
+    if group_variable is None:
+        point_rank=pd.Series(np.arange(len(shuffled_point_data)),index=shuffled_point_data.index)
+    else:
+        point_rank=shuffled_point_data.groupby(group_variable,sort=False).cumcount()
+    if point_rank.max() < max_points:
+        return data
+    return shuffled_point_data[point_rank < max_points].sort_index()
+
+# make violinplot/swarmplot figure worksheet in output workbook
+def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,workbook,worksheet_name,x_axis_title=None,cutoff=None,title=None,top_up=None,max_points=None):
+    add_image_worksheet(workbook,worksheet_name,render_violinswarmplot(data,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,x_axis_title,cutoff,title,top_up,max_points))
+
+# render violinplot/swarmplot figure as PNG image data
+# swarm plot point placement grows superlinearly, so above max_points per group only a deterministic subsample of points is swarmed
+# violin plots and their quartiles still use all data points
+def render_violinswarmplot(data,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,x_axis_title=None,cutoff=None,title=None,top_up=None,max_points=None):
+    import seaborn as sb
+    import matplotlib.pyplot as plt
     # initialize raw data buffer for image
     imgdata=BytesIO()
+    # points shown in swarm plot (all points unless groups larger than max_points)
+    swarm_data=subsample_plot_points(data,input_variable,group_variable,max_points)
     # initialize plot overall
     fig, ax = plt.subplots()
     # make swarm plot to show how data points overlap with distribution
@@ -240,9 +380,9 @@ def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_pat
         if strip_plot_set is False:
             if top_up is not None:
                 rearranged_color_palette = [sb.color_palette()[0],'firebrick',sb.color_palette()[1],sb.color_palette()[4],sb.color_palette()[5]]
-                ax = sb.swarmplot(data=data,x=input_variable,hue="Run type",hue_order=['Standard run','Interrupted','Top up','Reconnection','Recovery'],palette=rearranged_color_palette,edgecolor='white',linewidth=1)
+                ax = sb.swarmplot(data=swarm_data,x=input_variable,hue="Run type",hue_order=['Standard run','Interrupted','Top up','Reconnection','Recovery'],palette=rearranged_color_palette,edgecolor='white',linewidth=1)
             else:
-                ax = sb.swarmplot(data=data,x=input_variable,color='black')
+                ax = sb.swarmplot(data=swarm_data,x=input_variable,color='black')
         elif strip_plot_set is True:
             if top_up is not None:
                 rearranged_color_palette = [sb.color_palette()[0],'firebrick',sb.color_palette()[1],sb.color_palette()[4],sb.color_palette()[5]]
@@ -263,11 +403,11 @@ def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_pat
             if user_palette is None:
                 if top_up is not None:
                     rearranged_color_palette = [sb.color_palette()[0],'firebrick',sb.color_palette()[1],sb.color_palette()[4],sb.color_palette()[5]]
-                    ax = sb.swarmplot(data=data,x=group_variable,y=input_variable,hue="Run type",hue_order=['Standard run','Interrupted','Top up','Reconnection','Recovery'],palette=rearranged_color_palette,edgecolor='white',linewidth=1)
+                    ax = sb.swarmplot(data=swarm_data,x=group_variable,y=input_variable,hue="Run type",hue_order=['Standard run','Interrupted','Top up','Reconnection','Recovery'],palette=rearranged_color_palette,edgecolor='white',linewidth=1)
                 else:
-                    ax = sb.swarmplot(data=data,x=group_variable,y=input_variable,hue=group_variable,legend=False)
+                    ax = sb.swarmplot(data=swarm_data,x=group_variable,y=input_variable,hue=group_variable,legend=False)
             else:
-                ax = sb.swarmplot(data=data,x=group_variable,y=input_variable,hue=group_variable,palette=user_palette,legend=False)
+                ax = sb.swarmplot(data=swarm_data,x=group_variable,y=input_variable,hue=group_variable,palette=user_palette,legend=False)
         elif strip_plot_set is True:
             # allow user set palette
             if user_palette is None:
@@ -285,6 +425,9 @@ def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_pat
     # add x axis title if specified 
     if x_axis_title is not None:
         ax.set(xlabel=x_axis_title)
+    # note subsampled swarm points below title, so that plots never silently leave out points
+    if (strip_plot_set is False) and (swarm_data is not data):
+        title=(title + '\n' if title is not None else '') + 'Swarm points: random subsample of ' + str(max_points) + ' per group; violins show all points'
     # add title if specified
     if title is not None:
         ax.set_title(title)
@@ -306,14 +449,10 @@ def make_violinswarmplot_worksheet(data,input_variable,group_variable,legend_pat
     fig.savefig(imgdata, format='png', dpi=200, bbox_inches='tight')
     # close figure
     fig.clf()
-    # make openpyxl image from raw data
-    img = openpyxl.drawing.image.Image(imgdata)
-    # set location of image in worksheet (A1)
-    img.anchor = 'A1'
-    # add image to worksheet
-    worksheet.add_image(img)
     # close figure with matplotlib plt close
     plt.close()
+    # return PNG image data
+    return imgdata.getvalue()
     
 # function for handling platform qc and calculating differences with starting active pores
 def platform_qc_starting_active_pore_diff(data,platform_qc):
@@ -324,35 +463,21 @@ def platform_qc_starting_active_pore_diff(data,platform_qc):
     # remove those where flow_cell_id is NaN
     data_platform_qc_join_cleaned = data_platform_qc_join.dropna(subset='flow_cell_id')
     # exclude NaN rows after join
-    # find unique run timestamps
-    unique_run_timestamps = np.unique(data_platform_qc_join_cleaned["Start Run Timestamp"])
-    # initialize new data frame as long as unique runs based on unique run timestamps
-    # remove {'Start Run Timestamp' : unique_run_timestamps} from arguments below
-    data_with_platform_qc_and_diff = pd.DataFrame(columns=data_platform_qc_join_cleaned.columns.tolist() + ['Pore Difference','Time Difference'])
-    # find matching rows in input platform qc table
-    for idx, i in enumerate(unique_run_timestamps):
-        # pick all platform qc results per run timestamp
-        per_unique_run_df=data_platform_qc_join_cleaned[data_platform_qc_join_cleaned["Start Run Timestamp"] == i]
-        # calculate difference between platform qc and starting active pores
-        per_unique_run_df.loc[:,['Pore Difference']]=abs(per_unique_run_df['total_pore_count']-per_unique_run_df['Starting Active Pores'])
-        # calculate difference between platfrom qc and starting active pore timestamps
-        per_unique_run_df.loc[:,['Time Difference']]=abs(per_unique_run_df['timestamp']-per_unique_run_df['Start Run Timestamp'])
-        # select per sample based on minimum time between run and platform qc check
-        # get only first result if duplicates and add to table
-        # below are some commands I tried and decided to ignore
-        # data_with_platform_qc_and_diff.loc[idx,:]=per_unique_run_df[per_unique_run_df['Time Difference']==min(per_unique_run_df['Time Difference'])].iloc[0,:]
-        # append deprecated in pandas 2.0
-        # data_with_platform_qc_and_diff = data_with_platform_qc_and_diff.append(per_unique_run_df[per_unique_run_df['Time Difference']==min(per_unique_run_df['Time Difference'])].iloc[0,:])
-        # below for debugging
-        # print(per_unique_run_df)
-        data_with_platform_qc_and_diff.loc[idx] = per_unique_run_df[per_unique_run_df['Time Difference']==min(per_unique_run_df['Time Difference'])].iloc[0,:]
-    # set dtypes to match original joined df
-    data_with_platform_qc_and_diff=data_with_platform_qc_and_diff.astype(data_platform_qc_join_cleaned.dtypes)
-    # convert starting active pore column to numeric
-    # data_with_platform_qc_and_diff.loc[:,['Starting Active Pores']]=pd.to_numeric(data_with_platform_qc_and_diff['Starting Active Pores'])
+    # calculate difference between platform qc and starting active pores
+    data_platform_qc_join_cleaned = data_platform_qc_join_cleaned.assign(**{'Pore Difference' : abs(data_platform_qc_join_cleaned['total_pore_count']-data_platform_qc_join_cleaned['Starting Active Pores']),
+    # calculate difference between platfrom qc and starting active pore timestamps
+    'Time Difference' : abs(data_platform_qc_join_cleaned['timestamp']-data_platform_qc_join_cleaned['Start Run Timestamp'])})
+    # select per unique run timestamp based on minimum time between run and platform qc check
+    # stable sort keeps first result in join order if duplicates
+    data_with_platform_qc_and_diff = data_platform_qc_join_cleaned.sort_values(by=['Start Run Timestamp','Time Difference'], kind='stable').drop_duplicates(subset='Start Run Timestamp', keep='first').reset_index(drop=True)
     # return data frame with platform qc active pores, pore differences, and timestamp differences appended
     return data_with_platform_qc_and_diff
 
+# convert unix timestamps to local date and time (as datetime.fromtimestamp does) in one vectorized conversion
+def get_local_datetimes(timestamps):
+    # round to microseconds as datetime.fromtimestamp does
+    return pd.to_datetime(pd.to_numeric(timestamps),unit='s',utc=True).dt.round('us').dt.tz_convert(tz.tzlocal()).dt.tz_localize(None)
+
 # function for calculating storage time based on imported delivery date table
 def calc_storage_time_from_delivery_date(data,delivery_date_df):
     # join delivery date and data tables on Flow Cell ID
@@ -360,31 +485,22 @@ def calc_storage_time_from_delivery_date(data,delivery_date_df):
     # remove those where Batch is NaN
     data_delivery_date_join_df = data_delivery_date_join_df.dropna(subset='Batch')
     # calculate storage time
-    # data_delivery_date_join_df.loc[:,['Storage Time (Days)']] = round((data_delivery_date_join_df['Start Run Timestamp'] - data_delivery_date_join_df['Delivery date timestamp'])/86400,3)
-    # find unique run timestamps
-    unique_run_timestamps = np.unique(data_delivery_date_join_df["Start Run Timestamp"])
-    # initialize new data frame as long as unique runs based on unique run timestamps
-    # remove {'Start Run Timestamp' : unique_run_timestamps} from arguments below
-    # convert joined table column names to list
-    data_with_delivery_date_batch_and_storage_time = pd.DataFrame(columns=data_delivery_date_join_df.columns.tolist() + ['Storage Time (Days)'])
-    # find matching rows in input delivery date/batch table
-    for idx, i in enumerate(unique_run_timestamps):
-        # pick all platform qc results per run timestamp
-        per_unique_run_df=data_delivery_date_join_df[data_delivery_date_join_df["Start Run Timestamp"] == i]
-        # calculate storage time
-        per_unique_run_df.loc[:,['Storage Time (Days)']] = (per_unique_run_df['Start Run Timestamp'] - per_unique_run_df['Delivery date timestamp'])/86400
-        # if multiple delivery dates for unique run, then use most recent (shortest storage time calculation)
-        data_with_delivery_date_batch_and_storage_time.loc[idx] = per_unique_run_df[per_unique_run_df['Storage Time (Days)']==min(per_unique_run_df['Storage Time (Days)'])].iloc[0,:]
-    # set dtypes to match original joined df
-    data_with_delivery_date_batch_and_storage_time=data_with_delivery_date_batch_and_storage_time.astype(data_delivery_date_join_df.dtypes)
+    data_delivery_date_join_df = data_delivery_date_join_df.assign(**{'Storage Time (Days)' : (data_delivery_date_join_df['Start Run Timestamp'] - data_delivery_date_join_df['Delivery date timestamp'])/86400})
+    # if multiple delivery dates for unique run timestamp, then use most recent (shortest storage time calculation)
+    # stable sort keeps first result in join order if duplicates
+    data_with_delivery_date_batch_and_storage_time = data_delivery_date_join_df.sort_values(by=['Start Run Timestamp','Storage Time (Days)'], kind='stable').drop_duplicates(subset='Start Run Timestamp', keep='first').reset_index(drop=True)
     # return data frame with delivery date/batch info and storage times calculated as differences between start run timestamps and delivery date timestamps
     return data_with_delivery_date_batch_and_storage_time
 
 # single function for scatterplots with/without cutoffs
 
 def make_scatterplot_worksheet(data,group_variable,legend_patches,user_palette,strip_plot_set,workbook,worksheet_name,title=None,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable=None,y_variable=None,prop_point_size=False,size_column=None,has_date_time=False):
-    # create worksheet for figure output
-    worksheet=workbook.create_sheet(worksheet_name)
+    add_image_worksheet(workbook,worksheet_name,render_scatterplot(data,group_variable,legend_patches,user_palette,strip_plot_set,title,x_cutoffs,x_cutoff_colors,y_cutoffs,y_cutoff_colors,show_run_colors,show_reg_line,x_variable,y_variable,prop_point_size,size_column,has_date_time))
+
+# render scatterplot figure as PNG image data
+def render_scatterplot(data,group_variable,legend_patches,user_palette,strip_plot_set,title=None,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable=None,y_variable=None,prop_point_size=False,size_column=None,has_date_time=False):
+    import seaborn as sb
+    import matplotlib.pyplot as plt
     # initialize raw data buffer for image
     imgdata=BytesIO()
     # initialize plot overall
@@ -459,714 +575,1086 @@ def make_scatterplot_worksheet(data,group_variable,legend_patches,user_palette,s
     fig.savefig(imgdata, format='png', dpi=150, bbox_inches='tight')
     # close figure
     fig.clf()
-    # make openpyxl image from raw data
-    img = openpyxl.drawing.image.Image(imgdata)
-    # set location of image in worksheet (A1)
-    img.anchor = 'A1'
-    # add image to worksheet
-    worksheet.add_image(img)
     # close figure with matplotlib plt close
     plt.close()
+    # return PNG image data
+    return imgdata.getvalue()
+
+# describe violinplot/swarmplot figure as plot job for rendering
+# plot jobs are (worksheet name, plot type, source table name, plot arguments) so that they can be sent to rendering processes without their data
+def violinswarmplot_job(table_name,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,worksheet_name,x_axis_title=None,cutoff=None,title=None,top_up=None,max_points=None):
+    return (worksheet_name,'violinswarmplot',table_name,dict(input_variable=input_variable,group_variable=group_variable,legend_patches=legend_patches,user_palette=user_palette,strip_plot_set=strip_plot_set,x_axis_title=x_axis_title,cutoff=cutoff,title=title,top_up=top_up,max_points=max_points))
+
+# describe scatterplot figure as plot job for rendering
+def scatterplot_job(table_name,group_variable,legend_patches,user_palette,strip_plot_set,worksheet_name,**plot_arguments):
+    return (worksheet_name,'scatterplot',table_name,dict(group_variable=group_variable,legend_patches=legend_patches,user_palette=user_palette,strip_plot_set=strip_plot_set,**plot_arguments))
+
+# source tables for plot jobs in each rendering process
+plot_tables=None
+
+# initialize rendering process with source tables so that they are sent once per process rather than once per plot
+def init_plot_worker(tables):
+    global plot_tables
+    plot_tables=tables
+
+# render single plot job as PNG image data
+def render_plot_job(plot_job):
+    (worksheet_name,plot_type,table_name,plot_arguments)=plot_job
+    with time_stage('Render plot',worksheet_name):
+        if plot_type == 'violinswarmplot':
+            return render_violinswarmplot(plot_tables[table_name],**plot_arguments)
+        elif plot_type == 'scatterplot':
+            return render_scatterplot(plot_tables[table_name],**plot_arguments)
+
+# plot cache format version; change when plot rendering changes so that old cached plots are not reused
+plot_cache_version = 2
+
+# columns of source table used by a plot job
+def get_plot_job_columns(plot_job):
+    (worksheet_name,plot_type,table_name,plot_arguments)=plot_job
+    if plot_type == 'violinswarmplot':
+        plot_columns=[plot_arguments['input_variable'],plot_arguments['group_variable']]
+        if plot_arguments['top_up'] is not None:
+            plot_columns.append('Run type')
+    elif plot_type == 'scatterplot':
+        plot_columns=[plot_arguments.get('x_variable'),plot_arguments.get('y_variable'),plot_arguments['group_variable'],plot_arguments.get('size_column')]
+        if plot_arguments.get('show_run_colors',True) is True:
+            plot_columns.append('Run type')
+    # drop unset columns and duplicates while keeping order
+    return list(dict.fromkeys([i for i in plot_columns if i is not None]))
+
+# plot cache key as hash of the source table columns a plot uses plus its plot arguments
+def get_plot_cache_key(plot_job,tables):
+    import seaborn as sb
+    (worksheet_name,plot_type,table_name,plot_arguments)=plot_job
+    data=tables[table_name]
+    plot_columns=[i for i in get_plot_job_columns(plot_job) if i in data]
+    # legend patches are compared by color and label
+    cache_arguments=dict(plot_arguments)
+    if cache_arguments.get('legend_patches') is not None:
+        cache_arguments['legend_patches']=[(i.get_facecolor(),i.get_label()) for i in cache_arguments['legend_patches']]
+    plot_cache_hash=hashlib.sha256()
+    plot_cache_hash.update(repr((plot_cache_version,sb.__version__,plot_type,plot_columns,sorted(cache_arguments.items()))).encode())
+    # hash column values in row order
+    plot_cache_hash.update(pd.util.hash_pandas_object(data[plot_columns],index=False).values.tobytes())
+    return plot_cache_hash.hexdigest()
+
+# get cached PNG image data for plot cache key, or None if not cached
+def read_plot_cache(plot_cache_dir,plot_cache_key):
+    plot_cache_file=os.path.join(plot_cache_dir,plot_cache_key + '.png')
+    if not os.path.exists(plot_cache_file):
+        return None
+    with open(plot_cache_file,'rb') as infile:
+        image_data=infile.read()
+    # mark plot as recently used for least recently used eviction
+    os.utime(plot_cache_file)
+    return image_data
+
+# add PNG image data to plot cache
+def write_plot_cache(plot_cache_dir,plot_cache_key,image_data):
+    plot_cache_file=os.path.join(plot_cache_dir,plot_cache_key + '.png')
+    # write to temporary file first so that interrupted writes never leave partial images in cache
+    with open(plot_cache_file + '.tmp','wb') as outfile:
+        outfile.write(image_data)
+    os.replace(plot_cache_file + '.tmp',plot_cache_file)
+
+# remove least recently used plots until plot cache is no larger than max_mb megabytes
+def evict_plot_cache(plot_cache_dir,max_mb):
+    plot_cache_files=[os.path.join(plot_cache_dir,i) for i in os.listdir(plot_cache_dir) if i.endswith('.png')]
+    plot_cache_files=sorted(plot_cache_files,key=os.path.getmtime)
+    plot_cache_size=sum(os.path.getsize(i) for i in plot_cache_files)
+    for i in plot_cache_files:
+        if plot_cache_size <= max_mb * 1024 * 1024:
+            break
+        plot_cache_size=plot_cache_size - os.path.getsize(i)
+        os.remove(i)
+
+# get PNG image data for plot jobs, reusing unchanged plots from previous workbook images and plot cache if provided and rendering the rest
+# previous_plot_images is a dictionary of PNG image data by plot cache key (e.g., from read_incremental_manifest)
+def get_plot_images(plot_jobs,tables,processes=1,plot_cache_dir=None,plot_cache_max_mb=500,plot_cache_keys=None,previous_plot_images=None):
+    if (plot_cache_dir is None) and (previous_plot_images is None):
+        return render_plot_jobs(plot_jobs,tables,processes)
+    if plot_cache_keys is None:
+        plot_cache_keys=[get_plot_cache_key(i,tables) for i in plot_jobs]
+    # reuse plots of previous workbook first, then plots from plot cache
+    plot_images=[previous_plot_images.get(i) if previous_plot_images is not None else None for i in plot_cache_keys]
+    if plot_cache_dir is not None:
+        os.makedirs(plot_cache_dir,exist_ok=True)
+        plot_images=[i if i is not None else read_plot_cache(plot_cache_dir,j) for i, j in zip(plot_images,plot_cache_keys)]
+    # render only plots missing from previous workbook and cache
+    uncached_indexes=[idx for idx, i in enumerate(plot_images) if i is None]
+    rendered_plot_images=render_plot_jobs([plot_jobs[i] for i in uncached_indexes],tables,processes)
+    for idx, i in zip(uncached_indexes,rendered_plot_images):
+        plot_images[idx]=i
+        if plot_cache_dir is not None:
+            write_plot_cache(plot_cache_dir,plot_cache_keys[idx],i)
+    if plot_cache_dir is not None:
+        evict_plot_cache(plot_cache_dir,plot_cache_max_mb)
+    return plot_images
+
+# version of stage cache entries; change when stage outputs change
+stage_cache_version = 1
+
+# get stage cache key from stage name and stage inputs
+# data frames are hashed by columns and values in row order, and other inputs by their representation
+def get_stage_cache_key(stage_name,*stage_inputs):
+    stage_cache_hash=hashlib.sha256()
+    stage_cache_hash.update(repr((stage_cache_version,pd.__version__,stage_name)).encode())
+    for i in stage_inputs:
+        if isinstance(i,pd.DataFrame):
+            stage_cache_hash.update(repr(list(i.columns)).encode())
+            stage_cache_hash.update(pd.util.hash_pandas_object(i,index=False).values.tobytes())
+        else:
+            stage_cache_hash.update(repr(i).encode())
+    return stage_cache_hash.hexdigest()
+
+# hash file contents for stage cache keys
+def get_file_hash(input_file):
+    file_hash=hashlib.sha256()
+    with open(input_file,'rb') as infile:
+        for file_chunk in iter(lambda: infile.read(1024 * 1024),b''):
+            file_hash.update(file_chunk)
+    return file_hash.hexdigest()
+
+# stage outputs are stored as pickles (Parquet cannot hold the categorical run tables with per flow cell run type arrays), and reading a pickle can run code
+# so stage outputs are only read if written by this user and not writable by others, even if the stage cache directory is shared
+def is_trusted_stage_cache_file(stage_cache_file):
+    # file ownership is not checked where there are no user IDs (Windows)
+    if not hasattr(os,'getuid'):
+        return True
+    stage_cache_file_stat=os.stat(stage_cache_file)
+    return (stage_cache_file_stat.st_uid == os.getuid()) and not (stage_cache_file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+# get cached stage output for stage cache key, or None if not cached
+def read_stage_cache(stage_cache_dir,stage_cache_key):
+    stage_cache_file=os.path.join(stage_cache_dir,stage_cache_key + '.pkl')
+    if not os.path.exists(stage_cache_file):
+        return None
+    # run stage again and replace stage output written by another user
+    if not is_trusted_stage_cache_file(stage_cache_file):
+        print('Warning: Stage cache file ' + stage_cache_file + ' is owned or writable by another user and is not read.')
+        return None
+    # mark stage output as used by this run so that incremental regeneration keeps it
+    os.utime(stage_cache_file)
+    return pd.read_pickle(stage_cache_file)
+
+# add stage output to stage cache
+def write_stage_cache(stage_cache_dir,stage_cache_key,stage_output):
+    stage_cache_file=os.path.join(stage_cache_dir,stage_cache_key + '.pkl')
+    # write to temporary file first so that interrupted writes never leave partial stage outputs in cache
+    pd.to_pickle(stage_output,stage_cache_file + '.tmp',compression=None)
+    # stage outputs are only writable by this user whatever the umask, so that they are read again
+    os.chmod(stage_cache_file + '.tmp',0o644)
+    os.replace(stage_cache_file + '.tmp',stage_cache_file)
+
+# run pipeline stage function, reusing its output from stage cache if stage cache provided and stage inputs unchanged
+# stage_key_inputs identify everything the stage output depends on (e.g., input file hash, run cutoff, and joined tables)
+def run_cached_stage(stage_cache_dir,stage_name,stage_key_inputs,stage_function,*stage_arguments):
+    if stage_cache_dir is None:
+        return stage_function(*stage_arguments)
+    os.makedirs(stage_cache_dir,exist_ok=True)
+    stage_cache_key=get_stage_cache_key(stage_name,*stage_key_inputs)
+    stage_output=read_stage_cache(stage_cache_dir,stage_cache_key)
+    if stage_output is None:
+        stage_output=stage_function(*stage_arguments)
+        write_stage_cache(stage_cache_dir,stage_cache_key,stage_output)
+    return stage_output
+
+# remove stage outputs not used since before_time (seconds since epoch) from stage cache
+def prune_stage_cache(stage_cache_dir,before_time):
+    for i in os.listdir(stage_cache_dir):
+        if i.endswith('.pkl') and (os.path.getmtime(os.path.join(stage_cache_dir,i)) < before_time):
+            os.remove(os.path.join(stage_cache_dir,i))
+
+# incremental manifest format version; change when manifest contents change so that old manifests are not used
+incremental_manifest_version = 1
+
+# sidecar directory of output workbook for incremental regeneration, holding manifest and cached cohort tables
+def get_incremental_dir(output_file):
+    return output_file + '.incremental'
+
+# content hash of data frames written to a worksheet
+def get_sheet_hash(*sheet_tables):
+    return get_stage_cache_key('sheet',*sheet_tables)
+
+# get PNG image data of each image worksheet of xlsx workbook by worksheet name
+# images are found through workbook, worksheet, and drawing relationships in xlsx zip archive
+def get_workbook_images(workbook_file):
+    import zipfile
+    import posixpath
+    import xml.etree.ElementTree as ET
+    # get (relationship type, target part) of each relationship id of part
+    def get_part_relationships(workbook_zip,part):
+        relationships_part=posixpath.join(posixpath.dirname(part),'_rels',posixpath.basename(part) + '.rels')
+        if relationships_part not in workbook_zip.namelist():
+            return {}
+        part_relationships={}
+        for i in ET.fromstring(workbook_zip.read(relationships_part)).iter('{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
+            # targets are relative to part directory unless absolute
+            target=i.get('Target').lstrip('/') if i.get('Target').startswith('/') else posixpath.normpath(posixpath.join(posixpath.dirname(part),i.get('Target')))
+            part_relationships[i.get('Id')]=(i.get('Type').rsplit('/',1)[-1],target)
+        return part_relationships
+    workbook_images={}
+    with zipfile.ZipFile(workbook_file) as workbook_zip:
+        workbook_relationships=get_part_relationships(workbook_zip,'xl/workbook.xml')
+        for sheet in ET.fromstring(workbook_zip.read('xl/workbook.xml')).iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}sheet'):
+            sheet_part=workbook_relationships[sheet.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')][1]
+            for drawing_type, drawing_part in get_part_relationships(workbook_zip,sheet_part).values():
+                if drawing_type != 'drawing':
+                    continue
+                image_parts=[j for i, j in get_part_relationships(workbook_zip,drawing_part).values() if i == 'image']
+                if len(image_parts) > 0:
+                    workbook_images[sheet.get('name')]=workbook_zip.read(image_parts[0])
+    return workbook_images
+
+# read incremental manifest of previous output workbook and its plot images
+# returns (manifest or None, dictionary of PNG image data by plot cache key)
+# previous workbook is only used if unchanged since manifest was written
+def read_incremental_manifest(output_file):
+    manifest_file=os.path.join(get_incremental_dir(output_file),'manifest.json')
+    if (not os.path.exists(manifest_file)) or (not os.path.exists(output_file)):
+        return (None,{})
+    with open(manifest_file) as infile:
+        manifest=json.load(infile)
+    if (manifest.get('version') != incremental_manifest_version) or (manifest.get('workbook') != get_file_hash(output_file)):
+        print('Previous output ' + output_file + ' does not match its incremental manifest; regenerating all plots.')
+        return (None,{})
+    workbook_images=get_workbook_images(output_file)
+    previous_plot_images={j : workbook_images[i] for i, j in manifest['images'].items() if i in workbook_images}
+    return (manifest,previous_plot_images)
+
+# write incremental manifest of cohort, table worksheet, and plot worksheet content hashes for output workbook
+# each is a dictionary of hashes by cohort or worksheet name
+def write_incremental_manifest(output_file,cohort_hashes,sheet_hashes,plot_hashes):
+    manifest={'version' : incremental_manifest_version, 'workbook' : get_file_hash(output_file), 'cohorts' : cohort_hashes, 'sheets' : sheet_hashes, 'images' : plot_hashes}
+    manifest_file=os.path.join(get_incremental_dir(output_file),'manifest.json')
+    os.makedirs(get_incremental_dir(output_file),exist_ok=True)
+    # write to temporary file first so that interrupted writes never leave partial manifests
+    with open(manifest_file + '.tmp','w') as outfile:
+        json.dump(manifest,outfile,indent=1)
+    os.replace(manifest_file + '.tmp',manifest_file)
+
+# print number of changed cohorts, table worksheets, and plots compared to previous manifest
+def print_incremental_changes(previous_manifest,cohort_hashes,sheet_hashes,plot_hashes):
+    if previous_manifest is None:
+        previous_manifest={'cohorts' : {}, 'sheets' : {}, 'images' : {}}
+    changes=[]
+    for i, j, k in [('cohorts',cohort_hashes,'cohorts'),('sheets',sheet_hashes,'table worksheets'),('images',plot_hashes,'plots')]:
+        changes.append(str(sum(previous_manifest[i].get(l) != m for l, m in j.items())) + ' of ' + str(len(j)) + ' ' + k)
+    print('Incremental update: ' + ', '.join(changes) + ' changed.')
+
+# render plot jobs in a process pool
+# returns PNG image data in plot job order regardless of which process finishes first
+def render_plot_jobs(plot_jobs,tables,processes=1):
+    # render in this process if only one process requested
+    if (processes is None) or (processes <= 1) or (len(plot_jobs) <= 1):
+        init_plot_worker(tables)
+        return [render_plot_job(i) for i in plot_jobs]
+    with ProcessPoolExecutor(max_workers=min(processes,len(plot_jobs)),initializer=init_plot_worker,initargs=(tables,)) as executor:
+        return map_with_stage_timings(executor,render_plot_job,plot_jobs)
     
-# set up command line argument parser
-parser = argparse.ArgumentParser(description='This program gets summary statistics from long read sequencing report data.')
-
-# get input and output arguments
-# allow multiple inputs
-parser.add_argument('-input', action="store", dest="input_file", nargs="+", help="Input tab-delimited tsv file(s) containing features extracted from long read sequencing reports.")
-# if multiple inputs, require input names
-parser.add_argument('-names', action="store", dest="names", nargs="*", help="Names corresponding to input tsv file(s); required if more than one tsv provided.")
-# single output xlsx
-parser.add_argument('-output', action="store", dest="output_file", help="Output long read sequencing summary statistics XLSX")
-# import platform QC table in format specified in CARDlongread_MinKNOW_api_scripts repository
-parser.add_argument('-platform_qc', action="store",default=None, dest="platform_qc", help="Input platform QC table to calculate active pore dropoff upon sequencing (optional)")
-# import delivery date table parsed from ONT provided spreadsheet with export_flow_cell_delivery_dates.py
-parser.add_argument('-delivery_date_batches',action="store",default=None,dest="delivery_date_batches", help="Input delivery date/batch table to calculate storage time per flow cell based on delivery date and run timestamp (optional).")
-# add option to specify plot title
-parser.add_argument('-plot_title', action="store", default=None, dest="plot_title", help="Title for each plot in output XLSX (optional)")
-# add boolean --plot_cutoff argument
-parser.add_argument('--plot_cutoff', action=argparse.BooleanOptionalAction, default=True, dest="plot_cutoff", help="Include cutoff lines in violin plots (optional; default true; --no-plot_cutoff to override)")
-# include failed run cutoff to exclude as well
-parser.add_argument('-run_cutoff', action="store", default=1, type=float, dest="run_cutoff", help="Minimum data output per flow cell run to include (optional, 1 Gb default)")
-# add option for stripplot instead of swarmplot (in case of excessive data points)
-parser.add_argument('--strip_plot', action=argparse.BooleanOptionalAction, default=False, dest="strip_plot", help="Show strip plots instead of swarm plots inside violin plots (optional; default false)")
-# add option for color palette
-parser.add_argument('-colors', action="store", default=None, dest="colors", nargs="*", help="Color palette corresponding to sequential groups displayed (e.g., 'blue', 'red', 'blue'); optional and used only if more than one tsv provided.")
-# add option for custom legend colors
-parser.add_argument('-legend_colors', action="store", default=None, dest="legend_colors", nargs="*", help="Colors shown in the legend (e.g., 'blue', 'red'); optional and used only if more color palette included above. Must be palette subset.")
-# add option for custom legend labels
-parser.add_argument('-legend_labels', action="store", default=None, dest="legend_labels", nargs="*", help="Labels for each color in legend in order specified in -legend_colors.")
-# add option to show sample size for groups in grouped violinplots
-parser.add_argument('--group_count', action=argparse.BooleanOptionalAction, default=False, dest="show_group_count", help="Show group count in x-axis labels (optional; default false)")
-# add option to output platform qc joined table
-parser.add_argument('-output_table_with_platform_qc', action="store", default=None, help="Output filename for run report summary table joined with platform QC flow cell check information (optional).")
-# add option to output run type designation
-parser.add_argument('-output_table_with_run_type', action="store", default=None, help="Output filename for run report summary table with appended run type, such as 'top up' or 'reconnection' (optional).")
-# add option to output storage time designation
-parser.add_argument('-output_table_with_storage_time', action="store", default=None, help="Output filename for run report summary table with delivery date, batch, and storage times in days added (optional).")
-
-# parse arguments
-results = parser.parse_args()
-
-# throw error if no input file provided
-if results.input_file is None:
-	quit('ERROR: No input file (-input) provided!')
-    
-# throw error if no names provided if multiple input files provided
-if len(results.input_file)>1:
-    if len(results.names)<=1:
-        quit('ERROR: Multiple input files provided but not multiple names (-names).')
-        
-# throw error if no names provided if multiple input files provided
-if len(results.input_file)>1:
-    if len(results.names)<=1:
-        quit('ERROR: Multiple input files provided but not multiple names (-names).')
-    elif len(results.names) != len(results.input_file):
-        quit('ERROR: Number of names is different from number of input files.')
-    # test if number of colors different from input files and names
-    elif (results.colors is not None) and (len(results.colors) != len(results.names)):
-        quit("ERROR: Color palette provided, but number of colors doesnt match number of group names.")
-        
-# set legend_patches to None by default
-legend_patches=None
-# test if legend colors and labels have proper length
-if (results.legend_colors is not None) or (results.legend_labels is not None):
-    if len(results.legend_colors) != len(results.legend_labels):
-        quit('ERROR: Number of legend colors does not match number of legend labels.')
+# functionalize all below to run through on separate groups
+# summary statistics for all properties and all groups are calculated together in one batched pass
+# returns dictionary of (summary statistics, MinKNOW version distribution, sample rate distribution, flow cells per experiment distribution) per group name (None if no group variable)
+def longread_platform_qc_summary_statistics(longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,group_variable=None,group_names=None):
+    # source tables for summary statistics properties
+    tables = {'runs' : longread_extract,
+    'platform_qc' : longread_extract_with_platform_qc_and_diff,
+    'experiments' : longread_extract_flow_cells_and_output_per_experiment,
+    'flow_cells' : longread_extract_output_per_flow_cell}
+    # include platform QC active pores/pore difference information where applicable
+    # and storage time if present in longread_extract
+    combined_properties = [i for i in summary_statistics_properties if (tables[i[1]] is not None) and (i[2] in tables[i[1]])]
+    # summary statistics on all properties for all groups
+    combined_summary_stats_per_group = get_batched_summary_statistics(tables,combined_properties,group_variable,group_names)
+    # split run and experiment tables by group once for distributions
+    if group_variable is None:
+        longread_extract_per_group = {None : longread_extract}
+        longread_extract_flow_cells_and_output_per_experiment_per_group = {None : longread_extract_flow_cells_and_output_per_experiment}
+    else:
+        longread_extract_per_group = split_by_group(longread_extract,group_variable,group_names)
+        longread_extract_flow_cells_and_output_per_experiment_per_group = split_by_group(longread_extract_flow_cells_and_output_per_experiment,group_variable,group_names)
+    summary_statistics_per_group = {}
+    for i in combined_summary_stats_per_group:
+        # flow cells per experiment distribution
+        longread_extract_flow_cells_per_experiment_dist = get_flow_cells_per_experiment_dist(longread_extract_flow_cells_and_output_per_experiment_per_group[i]['Flow Cells'])
+        # minknow version distribution
+        longread_extract_minknow_version_dist = get_minknow_version_dist(longread_extract_per_group[i]['MinKNOW Version'])
+        # sampling rate distribution
+        longread_extract_sample_rate_dist = get_sample_rate_dist(longread_extract_per_group[i]['Sample Rate (Hz)'])
+        summary_statistics_per_group[i] = (combined_summary_stats_per_group[i],longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)
+    # stop functionalizing here
+    return summary_statistics_per_group
+
+# add log10 transformed platform qc active pores, starting active pores, and pore differences to platform qc table for plots
+# columns are only added once, so tables cached with plot columns (e.g., by CARDlongread_dashboard_server.py) are not changed again while read
+def add_plot_columns(tables):
+    longread_extract_with_platform_qc_and_diff=tables['platform_qc']
+    if (longread_extract_with_platform_qc_and_diff is None) or ('log_pore_difference' in longread_extract_with_platform_qc_and_diff):
+        return
+    longread_extract_with_platform_qc_and_diff['log_platform_qc_active_pores']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Platform QC active pores']))
+    longread_extract_with_platform_qc_and_diff['log_starting_active_pores']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Starting Active Pores']))
+    longread_extract_with_platform_qc_and_diff['log_pore_difference']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Pore Difference']))
+
+# report plots in worksheet order
+# each plot is described by worksheet name, plot type, source table, tags for -plots/-skip_plots selection,
+# optional inputs it requires ('platform_qc', 'delivery_date_batches'), run table columns that must have data, and plot arguments
+# violin plot cutoffs are only drawn with --plot_cutoff; scatterplot cutoffs are always drawn
+# top_up='plot_cutoff' shows topups only with --plot_cutoff, as platform qc difference plots have always done
+report_plots = [
+# show topups in run level violin/swarm plots
+dict(name='Read N50 plot',plot_type='violinswarmplot',table='runs',tags=['n50'],input_variable="N50 (kb)",top_up=True),
+dict(name='Run data output plot',plot_type='violinswarmplot',table='runs',tags=['yield'],input_variable="Data output (Gb)",cutoff=90,top_up=True),
+dict(name='Run read count plot',plot_type='violinswarmplot',table='runs',tags=['yield'],input_variable="Read Count (M)",x_axis_title="Read Count (million reads)",top_up=True),
+dict(name='Starting active pores plot',plot_type='violinswarmplot',table='runs',tags=['pores'],input_variable="Starting Active Pores",x_axis_title="Starting active pores",cutoff=6500,top_up=True),
+dict(name='Average active pores plot',plot_type='violinswarmplot',table='runs',tags=['pores'],input_variable="Average Active Pores",x_axis_title="Average active pores",top_up=True),
+dict(name='Active pore AUC plot',plot_type='violinswarmplot',table='runs',tags=['pores'],input_variable="Active Pore AUC",x_axis_title="Active pore AUC",top_up=True),
+dict(name='Starting pore occupancy plot',plot_type='violinswarmplot',table='runs',tags=['occupancy'],input_variable="Starting Pore Occupancy",x_axis_title="Starting pore occupancy",top_up=True),
+dict(name='Average pore occupancy plot',plot_type='violinswarmplot',table='runs',tags=['occupancy'],input_variable="Average Pore Occupancy",x_axis_title="Average pore occupancy",top_up=True),
+# hard coded Q score cutoffs of 8 based on fast basecalling
+dict(name='Passed modal Q score plot',plot_type='violinswarmplot',table='runs',tags=['qscore'],requires_data=['Passed Modal Q Score'],input_variable="Passed Modal Q Score",x_axis_title="Passed modal Q score",cutoff=8,top_up=True),
+dict(name='Failed modal Q score plot',plot_type='violinswarmplot',table='runs',tags=['qscore'],requires_data=['Failed Modal Q Score'],input_variable="Failed Modal Q Score",x_axis_title="Failed modal Q score",cutoff=8,top_up=True),
+dict(name='Starting transloc speed plot',plot_type='violinswarmplot',table='runs',tags=['speed'],requires_data=['Starting Median Translocation Speed'],input_variable="Starting Median Translocation Speed",x_axis_title="Starting translocation speed (bp/sec)",cutoff=400,top_up=True),
+dict(name='Starting median Q score plot',plot_type='violinswarmplot',table='runs',tags=['qscore'],requires_data=['Starting Median Q Score'],input_variable="Starting Median Q Score",x_axis_title="Starting median Q score",cutoff=8,top_up=True),
+dict(name='Passed bases plot',plot_type='violinswarmplot',table='runs',tags=['yield'],requires_data=['Passed Bases (Gb)'],input_variable="Passed Bases (Gb)",x_axis_title="Passed bases (Gb)",cutoff=90,top_up=True),
+dict(name='Failed bases plot',plot_type='violinswarmplot',table='runs',tags=['yield'],requires_data=['Failed Bases (Gb)'],input_variable="Failed Bases (Gb)",x_axis_title="Failed bases (Gb)",top_up=True),
+dict(name='Percentage passed bases plot',plot_type='violinswarmplot',table='runs',tags=['yield'],requires_data=['Percentage Passed Bases'],input_variable="Percentage Passed Bases",x_axis_title="Percentage of bases passing filter",top_up=True),
+# no topups in experiment and flow cell level plots
+dict(name='Flow cells per experiment plot',plot_type='violinswarmplot',table='experiments',tags=['yield'],input_variable="Flow Cells",x_axis_title="Flow cells"),
+dict(name='Output per experiment plot',plot_type='violinswarmplot',table='experiments',tags=['yield'],input_variable="Total output (Gb)",cutoff=90),
+dict(name='Output per flow cell plot',plot_type='violinswarmplot',table='flow_cells',tags=['yield'],input_variable="Flow cell output (Gb)",cutoff=90),
+# platform qc violin/swarm plots
+dict(name='Platform QC active pores plot',plot_type='violinswarmplot',table='platform_qc',tags=['pores','platform_qc'],requires=['platform_qc'],input_variable="Platform QC active pores",cutoff=6500),
+dict(name='Platform-seq pore diff plot',plot_type='violinswarmplot',table='platform_qc',tags=['pores','platform_qc'],requires=['platform_qc'],input_variable="Pore Difference",x_axis_title="Platform to sequencing pore difference",top_up='plot_cutoff'),
+dict(name='Platform-seq time diff plot',plot_type='violinswarmplot',table='platform_qc',tags=['time','platform_qc'],requires=['platform_qc'],input_variable="Time Difference",x_axis_title="Platform to sequencing time difference",top_up='plot_cutoff'),
+# delivery date/batch/storage time swarmplots
+dict(name='Storage time plot',plot_type='violinswarmplot',table='runs',tags=['storage'],requires=['delivery_date_batches'],input_variable="Storage Time (Days)",x_axis_title="Storage time (days)",top_up=True),
+# run level scatterplots
+dict(name="Active pores vs. data output",plot_type='scatterplot',table='runs',tags=['pores','yield'],x_variable='Starting Active Pores',y_variable='Data output (Gb)',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=[90],y_cutoff_colors=['gray']),
+# cutoffs not known yet for read count
+dict(name="Active pores vs. read count",plot_type='scatterplot',table='runs',tags=['pores','yield'],x_variable='Starting Active Pores',y_variable='Read Count (M)',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green']),
+dict(name="Active pores vs. read N50",plot_type='scatterplot',table='runs',tags=['pores','n50'],x_variable='Starting Active Pores',y_variable='N50 (kb)',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green']),
+dict(name="Read N50 vs. data output",plot_type='scatterplot',table='runs',tags=['n50','yield'],x_variable='N50 (kb)',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray'],show_reg_line=True),
+dict(name="Read N50 vs. data no line",plot_type='scatterplot',table='runs',tags=['n50','yield'],x_variable='N50 (kb)',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Read N50 vs. read count",plot_type='scatterplot',table='runs',tags=['n50','yield'],x_variable='N50 (kb)',y_variable='Read Count (M)',show_reg_line=True),
+dict(name="Read N50 vs. count no line",plot_type='scatterplot',table='runs',tags=['n50','yield'],x_variable='N50 (kb)',y_variable='Read Count (M)'),
+dict(name="Start vs. avg active pores",plot_type='scatterplot',table='runs',tags=['pores'],x_variable='Starting Active Pores',y_variable='Average Active Pores',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green']),
+dict(name="Start active pores vs. AUC",plot_type='scatterplot',table='runs',tags=['pores'],x_variable='Starting Active Pores',y_variable='Active Pore AUC',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green']),
+dict(name="Avg active pores vs. data",plot_type='scatterplot',table='runs',tags=['pores','yield'],x_variable='Average Active Pores',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Active pore AUC vs. data",plot_type='scatterplot',table='runs',tags=['pores','yield'],x_variable='Active Pore AUC',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Pore AUC vs. read count",plot_type='scatterplot',table='runs',tags=['pores','yield'],x_variable='Active Pore AUC',y_variable='Read Count (M)'),
+dict(name="Avg pore occup. vs. data",plot_type='scatterplot',table='runs',tags=['occupancy','yield'],x_variable='Average Pore Occupancy',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Transloc. speed vs. Q score",plot_type='scatterplot',table='runs',tags=['speed','qscore'],requires_data=['Average Median Translocation Speed Over Time','Average Median Q Score Over Time'],x_variable='Average Median Translocation Speed Over Time',y_variable='Average Median Q Score Over Time',x_cutoffs=[400],x_cutoff_colors=['blue'],y_cutoffs=[8],y_cutoff_colors=['green']),
+dict(name="Data output vs. Q score",plot_type='scatterplot',table='runs',tags=['yield','qscore'],requires_data=['Average Median Q Score Over Time'],x_variable='Data output (Gb)',y_variable='Average Median Q Score Over Time',x_cutoffs=[90],x_cutoff_colors=['gray'],y_cutoffs=[8],y_cutoff_colors=['green']),
+dict(name="Start. pores vs. Q score",plot_type='scatterplot',table='runs',tags=['pores','qscore'],requires_data=['Average Median Q Score Over Time'],x_variable='Starting Active Pores',y_variable='Average Median Q Score Over Time',x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=[8],y_cutoff_colors=['blue']),
+dict(name="Active pore AUC vs. Q score",plot_type='scatterplot',table='runs',tags=['pores','qscore'],requires_data=['Average Median Q Score Over Time'],x_variable='Active Pore AUC',y_variable='Average Median Q Score Over Time',y_cutoffs=[8],y_cutoff_colors=['green']),
+dict(name="Passed bases vs. Q score",plot_type='scatterplot',table='runs',tags=['yield','qscore'],requires_data=['Passed Bases (Gb)','Passed Modal Q Score'],x_variable='Passed Bases (Gb)',y_variable='Average Median Q Score Over Time',x_cutoffs=[90],x_cutoff_colors=['gray'],y_cutoffs=[8],y_cutoff_colors=['green']),
+# platform qc scatterplots
+dict(name="Pqc vs. starting active pores",plot_type='scatterplot',table='platform_qc',tags=['pores','platform_qc'],requires=['platform_qc'],x_variable='Platform QC active pores',y_variable='Starting Active Pores'),
+dict(name="Pqc vs. pore difference",plot_type='scatterplot',table='platform_qc',tags=['pores','platform_qc'],requires=['platform_qc'],x_variable='Platform QC active pores',y_variable='Pore Difference'),
+dict(name="Pore vs. time difference",plot_type='scatterplot',table='platform_qc',tags=['pores','time','platform_qc'],requires=['platform_qc'],x_variable='Time Difference',y_variable='Pore Difference'),
+dict(name="Pore difference vs. run output",plot_type='scatterplot',table='platform_qc',tags=['pores','yield','platform_qc'],requires=['platform_qc'],x_variable='Pore Difference',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Pore diff. vs. active pore AUC",plot_type='scatterplot',table='platform_qc',tags=['pores','platform_qc'],requires=['platform_qc'],x_variable='Pore Difference',y_variable='Active Pore AUC'),
+dict(name="Pore diff. vs. Q score",plot_type='scatterplot',table='platform_qc',tags=['pores','qscore','platform_qc'],requires=['platform_qc'],requires_data=['Average Median Q Score Over Time'],x_variable='Pore Difference',y_variable='Average Median Q Score Over Time',y_cutoffs=[8],y_cutoff_colors=['blue']),
+dict(name="Pore occup. vs. pore diff.",plot_type='scatterplot',table='platform_qc',tags=['occupancy','pores','platform_qc'],requires=['platform_qc'],x_variable='Starting Pore Occupancy',y_variable='Pore Difference'),
+# read N50 vs. run output with point size based on pore difference or starting active pores
+dict(name="N50 output pore diff",plot_type='scatterplot',table='platform_qc',tags=['n50','yield','pores','platform_qc'],requires=['platform_qc'],x_variable='N50 (kb)',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray'],prop_point_size=True,size_column='Pore Difference'),
+dict(name="N50 output starting pores",plot_type='scatterplot',table='platform_qc',tags=['n50','yield','pores','platform_qc'],requires=['platform_qc'],x_variable='N50 (kb)',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray'],prop_point_size=True,size_column='Starting Active Pores'),
+dict(name="Platform QC pores over time",plot_type='scatterplot',table='platform_qc',tags=['pores','time','platform_qc'],requires=['platform_qc'],x_variable='Platform QC date',y_variable='Platform QC active pores',y_cutoffs=[6500],y_cutoff_colors=['green'],has_date_time=True),
+dict(name="Pore difference over time",plot_type='scatterplot',table='platform_qc',tags=['pores','time','platform_qc'],requires=['platform_qc'],x_variable='Run date',y_variable='Pore Difference',has_date_time=True),
+dict(name="Pore diff. vs storage",plot_type='scatterplot',table='platform_qc',tags=['pores','storage','platform_qc'],requires=['platform_qc','delivery_date_batches'],x_variable='Storage Time (Days)',y_variable='Pore Difference',has_date_time=True),
+# run output over time
+dict(name="Run output over time",plot_type='scatterplot',table='runs',tags=['yield','time'],x_variable='Run date',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray'],has_date_time=True),
+# delivery date/batch/storage time scatterplots
+dict(name="Storage vs. data output",plot_type='scatterplot',table='runs',tags=['storage','yield'],requires=['delivery_date_batches'],x_variable='Storage Time (Days)',y_variable='Data output (Gb)',y_cutoffs=[90],y_cutoff_colors=['gray']),
+dict(name="Storage vs. starting pores",plot_type='scatterplot',table='runs',tags=['storage','pores'],requires=['delivery_date_batches'],x_variable='Storage Time (Days)',y_variable='Starting Active Pores',y_cutoffs=[5000,6500],y_cutoff_colors=['red','green']),
+dict(name="Storage vs. pore AUC",plot_type='scatterplot',table='runs',tags=['storage','pores'],requires=['delivery_date_batches'],x_variable='Storage Time (Days)',y_variable='Active Pore AUC'),
+dict(name="Storage vs. Q score",plot_type='scatterplot',table='runs',tags=['storage','qscore'],requires=['delivery_date_batches'],requires_data=['Average Median Q Score Over Time'],x_variable='Storage Time (Days)',y_variable='Average Median Q Score Over Time',y_cutoffs=[8],y_cutoff_colors=['blue']),
+]
+
+# tags for plot selection, including plot type
+def get_report_plot_tags(report_plot):
+    if report_plot['plot_type'] == 'violinswarmplot':
+        return report_plot['tags'] + ['violin']
+    return report_plot['tags'] + ['scatter']
+
+# select report plots by worksheet name or tag with -plots and -skip_plots
+# all plots are selected if no plots listed
+def select_report_plots(plots=None,skip_plots=None):
+    # check that every name or tag given matches at least one plot
+    for i in (plots or []) + (skip_plots or []):
+        if not any((i == j['name']) or (i in get_report_plot_tags(j)) for j in report_plots):
+            quit('ERROR: Unknown plot name or tag ' + i + '. Plot tags are ' + ', '.join(sorted(set(k for j in report_plots for k in get_report_plot_tags(j)))) + '.')
+    selected_report_plots=report_plots
+    if plots:
+        selected_report_plots=[i for i in selected_report_plots if (i['name'] in plots) or any(j in plots for j in get_report_plot_tags(i))]
+    if skip_plots:
+        selected_report_plots=[i for i in selected_report_plots if (i['name'] not in skip_plots) and not any(j in skip_plots for j in get_report_plot_tags(i))]
+    return selected_report_plots
+
+# describe selected report plots as plot jobs in worksheet order
+# plots are rendered afterwards with render_plot_jobs
+def make_report_plot_sequence(results,tables,group_variable,legend_patches,user_palette,strip_plot_set):
+    # plot jobs in worksheet order
+    plot_jobs=[]
+    # run table checked for data before including plots below
+    longread_extract=tables['runs']
+    # add log transformed platform qc columns unless already added
+    add_plot_columns(tables)
+    # optional inputs provided
+    optional_inputs={'platform_qc' : results.platform_qc is not None, 'delivery_date_batches' : results.delivery_date_batches is not None}
+    for i in select_report_plots(results.plots,results.skip_plots):
+        # skip plots missing optional inputs
+        if not all(optional_inputs[j] for j in i.get('requires',[])):
+            continue
+        # check if values are even present using count (find how many non-NA values)
+        if not all(longread_extract[j].count()>0 for j in i.get('requires_data',[])):
+            continue
+        if i['plot_type'] == 'violinswarmplot':
+            # violin plot cutoff only if --plot_cutoff set
+            cutoff=i.get('cutoff') if results.plot_cutoff is True else None
+            top_up=i.get('top_up')
+            if top_up == 'plot_cutoff':
+                top_up=True if results.plot_cutoff is True else None
+            # switch swarm plots to large group mode above swarm point limit
+            plot_jobs.append(violinswarmplot_job(i['table'],i['input_variable'],group_variable,legend_patches,user_palette,strip_plot_set,i['name'],i.get('x_axis_title'),cutoff,results.plot_title,top_up,results.swarm_max_points))
+        elif i['plot_type'] == 'scatterplot':
+            plot_jobs.append(scatterplot_job(i['table'],group_variable,legend_patches,user_palette,strip_plot_set,i['name'],title=results.plot_title,x_cutoffs=i.get('x_cutoffs'),x_cutoff_colors=i.get('x_cutoff_colors'),y_cutoffs=i.get('y_cutoffs'),y_cutoff_colors=i.get('y_cutoff_colors'),show_run_colors=True,show_reg_line=i.get('show_reg_line',False),x_variable=i['x_variable'],y_variable=i['y_variable'],prop_point_size=i.get('prop_point_size',False),size_column=i.get('size_column'),has_date_time=i.get('has_date_time',False)))
+    # leave out plots without any run with all plotted values (e.g., no platform QC checks for runs left by run filters)
+    plot_jobs=[i for i in plot_jobs if not tables[i[2]][[j for j in get_plot_job_columns(i) if j in tables[i[2]]]].dropna().empty]
+    # return plot jobs for rendering
+    return plot_jobs
+
+# rows read at a time when filtering run tables
+run_table_chunk_rows = 100000
+# typed run table schema
+# identifier and low cardinality string columns are stored as categoricals
+run_table_categorical_columns = ['Experiment Name','Sample Name','Run Date','Sequencer ID','Flow Cell Position','Flow Cell ID','Flow Cell Product Code','MinKNOW Version']
+# integer columns downcast to smallest integer type holding their values
+# timestamps stay 64 bit for timestamp arithmetic, and float columns are left as is so that statistics are unchanged
+run_table_integer_columns = ['Sample Rate (Hz)','Starting Active Pores']
+
+# apply typed schema to run table
+# also used after concatenating cohorts, since categoricals with different categories concatenate as strings
+def apply_run_table_schema(run_table):
+    for i in run_table_categorical_columns:
+        if (i in run_table) and not isinstance(run_table[i].dtype,pd.CategoricalDtype):
+            run_table[i] = run_table[i].astype('category')
+    for i in run_table_integer_columns:
+        if (i in run_table) and pd.api.types.is_integer_dtype(run_table[i]):
+            run_table[i] = pd.to_numeric(run_table[i],downcast='integer')
+    return run_table
+
+# name of run table input for messages and stage timings
+# in-memory run tables (e.g., from CARDlongread_run.py) are named by their 'name' attribute
+def get_run_table_name(input_file):
+    if isinstance(input_file,pd.DataFrame):
+        return input_file.attrs.get('name','in-memory run table')
+    return input_file
+
+# read tab delimited run table keeping only runs above output cutoff that match optional filters
+# filters are applied to each chunk as it is read, so only matching runs are ever held in memory
+# input_file may also be an in-memory run table typed as read from TSV, which is filtered as a single chunk
+# run_filters is a dictionary with optional 'where' (pandas query expression over run table columns),
+# 'date_from' and 'date_to' (inclusive YYYY-MM-DD run dates), and 'experiments' (list of experiment names)
+def read_run_table(input_file,run_cutoff,run_filters=None):
+    if run_filters is None:
+        run_filters = {}
+    run_table_chunks = []
+    if isinstance(input_file,pd.DataFrame):
+        input_chunks = [input_file]
     else:
-        # prepare legend patches
-        # make list as long as legend colors (at this point same as legend_labels)
-        legend_patches = [0] * len(results.legend_colors)
-        for idx, i in enumerate(results.legend_colors):
-            legend_patches[idx] = mpatches.Patch(color=i, label=results.legend_labels[idx])
-        
-# test if legend colors provided but not labels or vice versa
-if ((results.legend_colors is not None) and (results.legend_labels is None)) or ((results.legend_colors is None) and (results.legend_labels is not None)):
-    quit('ERROR: Either legend colors or legend labels provided but not both.')
-        
-# set default output filename
-if results.output_file is None:
-    results.output_file='output_summary_statistics.xlsx'
-
-# read tab delimited output into pandas data frame
-# case if just one input file provided
-if len(results.input_file)==1:
-    longread_extract_initial=pd.read_csv(results.input_file[0],sep='\t')
-    # first filter out low output runs
-    longread_extract = longread_extract_initial[longread_extract_initial['Data output (Gb)'] > results.run_cutoff]
-    # fix indices
-    longread_extract.reset_index(drop='True',inplace=True)
+        input_chunks = pd.read_csv(input_file,sep='\t',chunksize=run_table_chunk_rows)
+    for run_table_chunk in input_chunks:
+        # combine cutoff, date, and experiment filters into one row mask
+        keep_runs = run_table_chunk['Data output (Gb)'] > run_cutoff
+        # ISO formatted run dates compare in date order as strings
+        if run_filters.get('date_from') is not None:
+            keep_runs &= run_table_chunk['Run Date'].astype(str) >= run_filters['date_from']
+        if run_filters.get('date_to') is not None:
+            keep_runs &= run_table_chunk['Run Date'].astype(str) <= run_filters['date_to']
+        if run_filters.get('experiments') is not None:
+            keep_runs &= run_table_chunk['Experiment Name'].isin(run_filters['experiments'])
+        run_table_chunk = run_table_chunk[keep_runs]
+        # apply query expression to remaining runs
+        if run_filters.get('where') is not None:
+            try:
+                run_table_chunk = run_table_chunk.query(run_filters['where'])
+            except Exception as error:
+                quit('ERROR: Could not apply -where expression to ' + get_run_table_name(input_file) + ': ' + str(error))
+        run_table_chunks.append(run_table_chunk)
+    # fix indices and store columns with typed schema
+    return apply_run_table_schema(pd.concat(run_table_chunks,ignore_index=True))
+
+# read tab delimited output of one cohort into pandas data frame, filter out low output runs, and classify run types
+# returns (run table, flow cells/output per experiment table, output per flow cell table), with group name (and count) columns added if group name set
+def process_cohort(input_file,run_cutoff,group_name=None,show_group_count=False,run_filters=None):
+    input_name = get_run_table_name(input_file)
+    # first filter out low output runs and runs not matching filters while reading
+    with time_stage('Read run table',input_name):
+        longread_extract = read_run_table(input_file,run_cutoff,run_filters)
     # add top up column to data frame
     # avoid nested tuple warning
     # longread_extract["Top up"] = identify_topups(longread_extract["Sample Name"])
     # add after 12th column or last column (dataframe.shape[1])
-    longread_extract.insert(longread_extract.shape[1],"Run type",identify_topups(longread_extract["Sample Name"]),True)
+    with time_stage('Identify top ups',input_name):
+        longread_extract.insert(longread_extract.shape[1],"Run type",identify_topups(longread_extract["Sample Name"]),True)
     # identify reconnections amongst flow cells
-    longread_extract = identify_reconnections(longread_extract)
+    with time_stage('Identify reconnections',input_name):
+        longread_extract = identify_reconnections(longread_extract)
     # convert run starting timestamp to date and time
-    longread_extract['Run date']=[datetime.fromtimestamp(x) for x in pd.to_numeric(longread_extract['Start Run Timestamp'])]
-    # get flow cells/output per experiment table overall
-    longread_extract_flow_cells_and_output_per_experiment = get_flow_cells_and_output_per_experiment(longread_extract['Experiment Name'], longread_extract['Flow Cell ID'], longread_extract['Data output (Gb)'])
-    # get output per flow cell table overall
-    longread_extract_output_per_flow_cell = get_output_per_flow_cell(longread_extract['Flow Cell ID'], longread_extract['Data output (Gb)'], longread_extract['Run type'])
-    # set grouped variable as False
-    grouped=False
-    # output table with run type determined if specified in options
-    if results.output_table_with_run_type is not None:
-        # output to TSV with indexes excluded
-        longread_extract.to_csv(results.output_table_with_run_type,index=False,sep="\t")
-    # handle delivery dates
-    if results.delivery_date_batches is not None:
-        delivery_date_batches_table=pd.read_csv(results.delivery_date_batches,sep="\t")
-        # set longread_extract to original table joined with delivery date/batches table + calculated storage times in days
-        longread_extract=calc_storage_time_from_delivery_date(longread_extract,delivery_date_batches_table)
-        # convert critical variable to numeric for statistics and plotting
-        longread_extract['Storage Time (Days)']=pd.to_numeric(longread_extract['Storage Time (Days)'])
-        # output table with delivery date determined if specified in options
-        if results.output_table_with_storage_time is not None:
-            longread_extract.to_csv(results.output_table_with_storage_time,index=False,sep="\t")
-    
-# what if multiple input files provided
-elif len(results.input_file)>1:
-    # store input tables in list as long input filename set
-    longread_extract_initial_list=[0] * len(results.input_file)
-    # store flow cells/output per experiment tables for each group
-    longread_extract_flow_cells_and_output_per_experiment_initial_list=[0] * len(results.input_file)
-    # store output per flow cell tables for each group
-    longread_extract_output_per_flow_cell_initial_list=[0] * len(results.input_file)
-    # iterate through groups
-    for idx, i in enumerate(results.input_file): 
-        longread_extract_initial_list[idx]=pd.read_csv(i,sep='\t')
-        # first filter out low output runs
-        longread_extract_initial_list[idx]=longread_extract_initial_list[idx][longread_extract_initial_list[idx]['Data output (Gb)'] > results.run_cutoff]
-        # fix indices
-        longread_extract_initial_list[idx].reset_index(drop='True',inplace=True)
-        # add top up column to data frame
-        # avoid nested tuple warning
-        # longread_extract["Top up"] = identify_topups(longread_extract["Sample Name"])
-        # add after 12th column or last column (dataframe.shape[1])
-        longread_extract_initial_list[idx].insert(longread_extract_initial_list[idx].shape[1],"Run type",identify_topups(longread_extract_initial_list[idx]["Sample Name"]),True)
-        # identify reconnections amongst flow cells
-        longread_extract_initial_list[idx] = identify_reconnections(longread_extract_initial_list[idx])
-        # convert run starting timestamp to date and time
-        longread_extract_initial_list[idx]['Run date']=[datetime.fromtimestamp(x) for x in pd.to_numeric(longread_extract_initial_list[idx]['Start Run Timestamp'])]
-        # get flow cells/output per experiment table for group
-        longread_extract_flow_cells_and_output_per_experiment_initial_list[idx] = get_flow_cells_and_output_per_experiment(longread_extract_initial_list[idx]['Experiment Name'], longread_extract_initial_list[idx]['Flow Cell ID'], longread_extract_initial_list[idx]['Data output (Gb)'])
-        # get output per flow cell table for group
-        longread_extract_output_per_flow_cell_initial_list[idx] = get_output_per_flow_cell(longread_extract_initial_list[idx]['Flow Cell ID'], longread_extract_initial_list[idx]['Data output (Gb)'], longread_extract_initial_list[idx]['Run type'])
-        # add group name to each table in list
-        if results.show_group_count is True:
+    longread_extract['Run date']=get_local_datetimes(longread_extract['Start Run Timestamp'])
+    # get flow cells/output per experiment table for cohort
+    with time_stage('Flow cells and output per experiment',input_name):
+        longread_extract_flow_cells_and_output_per_experiment = get_flow_cells_and_output_per_experiment(longread_extract['Experiment Name'], longread_extract['Flow Cell ID'], longread_extract['Data output (Gb)'])
+    # get output per flow cell table for cohort
+    with time_stage('Output per flow cell',input_name):
+        longread_extract_output_per_flow_cell = get_output_per_flow_cell(longread_extract['Flow Cell ID'], longread_extract['Data output (Gb)'], longread_extract['Run type'])
+    # add group name to each table
+    if group_name is not None:
+        for i in [longread_extract,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell]:
+            i['Group']=group_name
             # if group count specified, add group count to group name
-            group_count = len(longread_extract_initial_list[idx])
             # in this way, show n=717 or similar below group names in all plots
-            # note this is count of runs per group after filtering for per run cutoff
-            longread_extract_initial_list[idx]['Group']=results.names[idx]
-            longread_extract_initial_list[idx]['Group and count']=results.names[idx] + "\nn=" + str(group_count)
-            # do this for additional distributions
-            # change group count to match next data frame size
-            # if group count specified, add group count to group name
-            group_count = len(longread_extract_flow_cells_and_output_per_experiment_initial_list[idx])
-            longread_extract_flow_cells_and_output_per_experiment_initial_list[idx]['Group']=results.names[idx]
-            longread_extract_flow_cells_and_output_per_experiment_initial_list[idx]['Group and count']=results.names[idx] + "\nn=" + str(group_count)
-            # repeat for output per flow cell table
-            group_count = len(longread_extract_output_per_flow_cell_initial_list[idx])
-            longread_extract_output_per_flow_cell_initial_list[idx]['Group']=results.names[idx]
-            longread_extract_output_per_flow_cell_initial_list[idx]['Group and count']=results.names[idx] + "\nn=" + str(group_count)
-            # group_names_list[idx]=results.names[idx] + "\nn=" + str(group_count)
-        else:
-            longread_extract_initial_list[idx]['Group']=results.names[idx]
-            # add group name to additional distributions
-            longread_extract_flow_cells_and_output_per_experiment_initial_list[idx]['Group']=results.names[idx]
-            longread_extract_output_per_flow_cell_initial_list[idx]['Group']=results.names[idx]
-    # combine groups into single concatenated data table
-    longread_extract=pd.concat(longread_extract_initial_list[:],ignore_index=True)
-    longread_extract_flow_cells_and_output_per_experiment=pd.concat(longread_extract_flow_cells_and_output_per_experiment_initial_list[:],ignore_index=True)
-    longread_extract_output_per_flow_cell=pd.concat(longread_extract_output_per_flow_cell_initial_list[:],ignore_index=True)
-    # set grouped variable as True
-    grouped=True
-    # output table with run type determined if specified in options
-    if results.output_table_with_run_type is not None:
-        # output to TSV with indexes excluded
-        longread_extract.to_csv(results.output_table_with_run_type,index=False,sep="\t")
-    # handle delivery dates
-    if results.delivery_date_batches is not None:
-        delivery_date_batches_table=pd.read_csv(results.delivery_date_batches,sep="\t")
-        # set longread_extract to original table joined with delivery date/batches table + calculated storage times in days
-        longread_extract=calc_storage_time_from_delivery_date(longread_extract,delivery_date_batches_table)
-        # convert critical variables to numeric for statistics and plotting
-        longread_extract['Storage Time (Days)']=pd.to_numeric(longread_extract['Storage Time (Days)'])
-        # output table with delivery date determined if specified in options
-        if results.output_table_with_storage_time is not None:
-            longread_extract.to_csv(results.output_table_with_storage_time,index=False,sep="\t")
-    
-# read csv delimited platform qc file into pandas data frame if provided
-if results.platform_qc is not None:
-    platform_qc_table=pd.read_csv(results.platform_qc)
-
-# use functions above
-# if platform qc file provided, make joined longread_extract/platform_qc_table
-if results.platform_qc is not None:
-    longread_extract_with_platform_qc_and_diff=platform_qc_starting_active_pore_diff(longread_extract,platform_qc_table)
-    # make Platform QC active pores column for plotting
-    longread_extract_with_platform_qc_and_diff.loc[:,['Platform QC active pores']]=pd.to_numeric(longread_extract_with_platform_qc_and_diff['total_pore_count'])
-    # convert all plotted columns to numeric
-    longread_extract_with_platform_qc_and_diff['Pore Difference']=pd.to_numeric(longread_extract_with_platform_qc_and_diff['Pore Difference'])
-    longread_extract_with_platform_qc_and_diff['Time Difference']=pd.to_numeric(longread_extract_with_platform_qc_and_diff['Time Difference'])
-    longread_extract_with_platform_qc_and_diff['N50 (kb)']=pd.to_numeric(longread_extract_with_platform_qc_and_diff['N50 (kb)'])
-    longread_extract_with_platform_qc_and_diff['Data output (Gb)']=pd.to_numeric(longread_extract_with_platform_qc_and_diff['Data output (Gb)'])
-    # also include time series for plotting
-    # convert to iso8601 format
-    longread_extract_with_platform_qc_and_diff['Platform QC date']=[datetime.fromtimestamp(x) for x in pd.to_numeric(longread_extract_with_platform_qc_and_diff['timestamp'])]
-    longread_extract_with_platform_qc_and_diff['Run date']=[datetime.fromtimestamp(x) for x in pd.to_numeric(longread_extract_with_platform_qc_and_diff['Start Run Timestamp'])] 
-    # output longread_extract/platform_qc joined table if option specified
-    # output table with platform QC stats joined if specified in options
-    if results.output_table_with_platform_qc is not None:
-        # output to TSV with indexes excluded
-        longread_extract_with_platform_qc_and_diff.to_csv(results.output_table_with_platform_qc,index=False,sep="\t")       
+            # note this is count of runs (or experiments or flow cells) per group after filtering for per run cutoff
+            if show_group_count is True:
+                i['Group and count']=group_name + "\nn=" + str(len(i))
+    return (longread_extract,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell)
 
-# functionalize all below to run through on separate groups
-def longread_platform_qc_summary_statistics(longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell):
-    # flow cells per experiment distribution
-    longread_extract_flow_cells_per_experiment_dist = get_flow_cells_per_experiment_dist(longread_extract_flow_cells_and_output_per_experiment['Flow Cells'])
-    # summary statistics on...
-    # read N50
-    read_N50_summary_stats = get_summary_statistics(longread_extract['N50 (kb)'])
-    # sequence output
-    sequence_output_summary_stats = get_summary_statistics(longread_extract['Data output (Gb)'])
-    # read count per run
-    read_count_summary_stats = get_summary_statistics(longread_extract['Read Count (M)'])
-    # starting active pores per run
-    starting_active_pores_summary_stats = get_summary_statistics(longread_extract['Starting Active Pores'])
-    # platform QC active pores per run if possible
-    if longread_extract_with_platform_qc_and_diff is not None:
-        platform_qc_summary_stats = get_summary_statistics(longread_extract_with_platform_qc_and_diff['total_pore_count'])
-        # differences between platform QC and starting active pores if possible
-        pore_difference_qc_summary_stats = get_summary_statistics(longread_extract_with_platform_qc_and_diff['Pore Difference'])
-    # flow cells per experiment
-    flow_cells_per_experiment_summary_stats = get_summary_statistics(longread_extract_flow_cells_and_output_per_experiment['Flow Cells'])
-    # output per flow cell
-    output_per_flow_cell_summary_stats = get_summary_statistics(longread_extract_output_per_flow_cell['Flow cell output (Gb)'])
-    # total output per experiment
-    output_per_experiment_summary_stats = get_summary_statistics(longread_extract_flow_cells_and_output_per_experiment['Total output (Gb)'])
-    # additional summary stats added 10/8/2025
-    # active pore AUC
-    active_pore_auc_summary_stats = get_summary_statistics(longread_extract['Active Pore AUC'])
-    # average active pores
-    average_active_pores_summary_stats = get_summary_statistics(longread_extract['Average Active Pores'])
-    # starting pore occupancy
-    starting_pore_occupancy_summary_stats = get_summary_statistics(longread_extract['Starting Pore Occupancy'])
-    # average pore occupancy
-    average_pore_occupancy_summary_stats = get_summary_statistics(longread_extract['Average Pore Occupancy'])
-    # passed modal Q score
-    passed_modal_q_score_summary_stats = get_summary_statistics(longread_extract['Passed Modal Q Score'])
-    # failed modal Q score
-    failed_modal_q_score_summary_stats = get_summary_statistics(longread_extract['Failed Modal Q Score'])
-    # starting translocation speed
-    starting_translocation_speed_summary_stats = get_summary_statistics(longread_extract['Starting Median Translocation Speed'])
-    # average translocation speed
-    average_translocation_speed_summary_stats = get_summary_statistics(longread_extract['Average Median Translocation Speed Over Time'])
-    # starting median Q score
-    starting_median_q_score_summary_stats = get_summary_statistics(longread_extract['Starting Median Q Score'])
-    # average median Q score
-    average_median_q_score_summary_stats = get_summary_statistics(longread_extract['Average Median Q Score Over Time'])
-    # passed bases
-    passed_bases_summary_stats = get_summary_statistics(longread_extract['Passed Bases (Gb)'])
-    # failed bases
-    failed_bases_summary_stats = get_summary_statistics(longread_extract['Failed Bases (Gb)'])
-    # percentage passed bases
-    percentage_passed_bases_summary_stats = get_summary_statistics(longread_extract['Percentage Passed Bases'])
-    # check if storage time included in longread_extract
-    if 'Storage Time (Days)' in longread_extract:
-        storage_time_summary_stats = get_summary_statistics(longread_extract['Storage Time (Days)'])
-    
-    # combine summary stats into one list
-    combined_summary_stats = [read_N50_summary_stats,
-    sequence_output_summary_stats,
-    read_count_summary_stats,
-    starting_active_pores_summary_stats,
-    average_active_pores_summary_stats,
-    flow_cells_per_experiment_summary_stats,
-    output_per_flow_cell_summary_stats,
-    output_per_experiment_summary_stats,
-    active_pore_auc_summary_stats,
-    starting_pore_occupancy_summary_stats,
-    average_pore_occupancy_summary_stats,
-    passed_modal_q_score_summary_stats,
-    failed_modal_q_score_summary_stats,
-    starting_translocation_speed_summary_stats,
-    average_translocation_speed_summary_stats,
-    starting_median_q_score_summary_stats,
-    average_median_q_score_summary_stats,
-    passed_bases_summary_stats,
-    failed_bases_summary_stats,
-    percentage_passed_bases_summary_stats]
-
-    # make data frame from combined_summary_stats
-    combined_property_names = ['Read N50 (kb)',
-    'Run data output (Gb)',
-    'Run read count (millions)',
-    'Starting active pores',
-    'Average active pores',
-    'Flow cells per experiment',
-    'Flow cell output (Gb)', 
-    'Total experiment output (Gb)',
-    'Active pore AUC',
-    'Starting pore occupancy',
-    'Average pore occupancy',
-    'Passed modal Q score',
-    'Failed modal Q score',
-    'Starting translocation speed',
-    'Average translocation speed',
-    'Starting median Q score',
-    'Average median Q score',
-    'Passed bases (Gb)',
-    'Failed bases (Gb)',
-    'Percentage passed bases']
-    
-    # append storage time to combined_summary_stats and combined_property_names if present:
-    if 'Storage Time (Days)' in longread_extract:
-        combined_summary_stats.append(storage_time_summary_stats)
-        combined_property_names.append('Storage time (days)')
-    
-    combined_summary_stats_df = make_summary_statistics_data_frame(combined_summary_stats,combined_property_names)
+# stage cache key inputs of cohort: input file contents (or in-memory run table) and parameters
+def get_cohort_stage_key_inputs(input_file,run_cutoff,group_name=None,show_group_count=False,run_filters=None):
+    return (input_file if isinstance(input_file,pd.DataFrame) else get_file_hash(input_file),run_cutoff,group_name,show_group_count,sorted(run_filters.items()) if run_filters is not None else None)
 
-    # include platform QC active pores/pore difference information where applicable
-    if longread_extract_with_platform_qc_and_diff is not None:
-        # combine summary stats into one list
-        combined_summary_stats = [read_N50_summary_stats,
-        sequence_output_summary_stats,
-        read_count_summary_stats,
-        starting_active_pores_summary_stats,
-        average_active_pores_summary_stats,
-        platform_qc_summary_stats,
-        pore_difference_qc_summary_stats,
-        flow_cells_per_experiment_summary_stats,
-        output_per_flow_cell_summary_stats,
-        output_per_experiment_summary_stats,
-        active_pore_auc_summary_stats,
-        starting_pore_occupancy_summary_stats,
-        average_pore_occupancy_summary_stats,
-        passed_modal_q_score_summary_stats,
-        failed_modal_q_score_summary_stats,
-        starting_translocation_speed_summary_stats,
-        average_translocation_speed_summary_stats,
-        starting_median_q_score_summary_stats,
-        average_median_q_score_summary_stats,
-        passed_bases_summary_stats,
-        failed_bases_summary_stats,
-        percentage_passed_bases_summary_stats]
-        # make data frame from combined_summary_stats
-        combined_property_names = ['Read N50 (kb)',
-        'Run data output (Gb)',
-        'Run read count (millions)',
-        'Starting active pores',
-        'Average active pores',
-        'Platform QC active pores',
-        'Pore difference',
-        'Flow cells per experiment',
-        'Flow cell output (Gb)',
-        'Total experiment output (Gb)',
-        'Active pore AUC',
-        'Starting pore occupancy',
-        'Average pore occupancy',
-        'Passed modal Q score',
-        'Failed modal Q score',
-        'Starting translocation speed',
-        'Average translocation speed',
-        'Starting median Q score',
-        'Average median Q score',
-        'Passed bases (Gb)',
-        'Failed bases (Gb)',
-        'Percentage passed bases']
-        
-        # append storage time to combined_summary_stats and combined_property_names if present:
-        if 'Storage Time (Days)' in longread_extract:
-            combined_summary_stats.append(storage_time_summary_stats)
-            combined_property_names.append('Storage time (days)')
-        
-        combined_summary_stats_df = make_summary_statistics_data_frame(combined_summary_stats,combined_property_names)
-        
-    # minknow version distribution
-    longread_extract_minknow_version_dist = get_minknow_version_dist(longread_extract['MinKNOW Version'])
-    # sampling rate distribution
-    longread_extract_sample_rate_dist = get_sample_rate_dist(longread_extract['Sample Rate (Hz)'])
-    # stop functionalizing here
-    return(combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)
-
-# save data frames as tab-delimited file (.tsv)
-# Example data structure
-# Header 
-# Property   Total   Min Max Mean    Median  Mode    Standard Deviation
-# Read N50 (kb)
-# Data output (Gb)
-# Flow cells per experiment
-# <empty>
-# Flow Cells    Frequency
-# 1 128
-# 2 398
-# etc.
-# <empty>
-# MinKNOW Version   Frequency
-# 22.10.7   756
-# 23.11.4   9
-# etc.
-# <empty>
-
-if grouped is False:
-    # run above summary statistics function
-    if results.platform_qc is not None:
-        (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell) 
+# process cohort, reusing cohort tables from stage cache if input file contents and parameters unchanged
+# in-memory run tables are keyed by their contents
+def process_cached_cohort(input_file,run_cutoff,group_name=None,show_group_count=False,run_filters=None,stage_cache_dir=None):
+    stage_key_inputs=get_cohort_stage_key_inputs(input_file,run_cutoff,group_name,show_group_count,run_filters) if stage_cache_dir is not None else ()
+    with time_stage('Process cohort',get_run_table_name(input_file)):
+        return run_cached_stage(stage_cache_dir,'cohort',stage_key_inputs,process_cohort,input_file,run_cutoff,group_name,show_group_count,run_filters)
+
+# process cohorts as independent tasks in a process pool
+# returns cohort tables in input file order regardless of which process finishes first
+def process_cohorts(input_files,run_cutoff,group_names,show_group_count=False,processes=1,run_filters=None,stage_cache_dir=None):
+    # process in this process if only one process requested
+    if (processes is None) or (processes <= 1) or (len(input_files) <= 1):
+        return [process_cached_cohort(i,run_cutoff,group_names[idx],show_group_count,run_filters,stage_cache_dir) for idx, i in enumerate(input_files)]
+    with ProcessPoolExecutor(max_workers=min(processes,len(input_files))) as executor:
+        return map_with_stage_timings(executor,process_cached_cohort,input_files,[run_cutoff]*len(input_files),group_names,[show_group_count]*len(input_files),[run_filters]*len(input_files),[stage_cache_dir]*len(input_files))
+
+# split run table with group column into one in-memory run table per group
+# groups are returned in order of group names if provided, otherwise in order of first appearance
+# returns (run tables, group names)
+def split_run_table_by_group_column(input_file,group_column,group_names=None):
+    run_table = input_file if isinstance(input_file,pd.DataFrame) else pd.read_csv(input_file,sep='\t')
+    if group_column not in run_table:
+        quit('ERROR: Group column ' + group_column + ' not found in ' + get_run_table_name(input_file) + '.')
+    groups = run_table[group_column].astype(str)
+    if (group_names is None) or (len(group_names) == 0):
+        group_names = list(dict.fromkeys(groups))
+    elif not set(group_names).issubset(set(groups)):
+        quit('ERROR: Group name(s) ' + ', '.join([i for i in group_names if i not in set(groups)]) + ' not found in group column ' + group_column + '.')
+    run_tables = []
+    for i in group_names:
+        group_run_table = run_table[(groups == i).values].drop(columns=group_column).reset_index(drop=True)
+        # columns with missing values only in other groups are typed as a separate input file of this group would be
+        for j in group_run_table.columns:
+            if pd.api.types.is_float_dtype(group_run_table[j]) and (len(group_run_table) > 0) and group_run_table[j].notna().all() and (group_run_table[j] % 1 == 0).all():
+                group_run_table[j] = group_run_table[j].astype('int64')
+        group_run_table.attrs['name'] = i
+        run_tables.append(group_run_table)
+    return (run_tables,group_names)
+
+# split table into one table per group name in one pass
+# groups without rows get empty tables
+def split_by_group(data,group_variable,group_names):
+    data_per_group = dict(tuple(data.groupby(group_variable, sort=False)))
+    return {i : data_per_group.get(i, data.iloc[0:0]) for i in group_names}
+
+# use flow cell index for platform qc and delivery date/batch tables not provided directly
+# look up only flow cells in input tables rather than reading full tables
+# returns (platform qc from index, delivery date/batches from index)
+def use_flow_cell_index(results):
+    platform_qc_from_index=False
+    delivery_date_batches_from_index=False
+    if results.flow_cell_index is not None:
+        flow_cell_index_row_counts=CARDlongread_flow_cell_index.get_flow_cell_index_row_counts(results.flow_cell_index)
+        if (results.platform_qc is None) and (flow_cell_index_row_counts['platform_qc'] > 0):
+            results.platform_qc=results.flow_cell_index
+            platform_qc_from_index=True
+        if (results.delivery_date_batches is None) and (flow_cell_index_row_counts['delivery_date_batches'] > 0):
+            results.delivery_date_batches=results.flow_cell_index
+            delivery_date_batches_from_index=True
+    return (platform_qc_from_index,delivery_date_batches_from_index)
+
+# read delivery date/batch table from file or flow cell index
+def read_delivery_date_batches(results,delivery_date_batches_from_index,flow_cell_ids):
+    if delivery_date_batches_from_index is True:
+        return CARDlongread_flow_cell_index.lookup_delivery_date_batches(results.flow_cell_index,flow_cell_ids)
     else:
-        (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract,None,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell)
-    # output data frames and figures to excel spreadsheet
-    writer = pd.ExcelWriter(results.output_file)
-    # write data frames with a row between each
-    # write combined summary stats
-    start_row = 0
-    combined_summary_stats_df.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
-    # write flow cells per experiment distribution
-    # add 1 to row number after combined_summary_stats_df exported
-    start_row = start_row + len(combined_summary_stats_df) + 2
-    longread_extract_flow_cells_per_experiment_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
-    # write minknow version distribution
-    start_row = start_row + len(longread_extract_flow_cells_per_experiment_dist) + 2
-    longread_extract_minknow_version_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
-    # write sample rate distribution
-    start_row = start_row + len(longread_extract_minknow_version_dist) + 2
-    longread_extract_sample_rate_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
-    # write flow cells and output per flow cell on another worksheet
-    longread_extract_output_per_flow_cell.to_excel(writer, index=False, sheet_name='Output per flow cell ID')
-    # write flow cells and output per unique experiment on another worksheet
-    longread_extract_flow_cells_and_output_per_experiment.to_excel(writer, index=False, sheet_name='FC + output per experiment')
-    # eventually write joined platform QC/summary table to worksheet (to do)
-    # close writer and save workbook
-    writer.close()
-elif grouped is True:
-    # output data frames and figures to excel spreadsheet
-    writer = pd.ExcelWriter(results.output_file)
-    # run through loop here
-    # loop through all group names from input
-    for idx, i in enumerate(results.names):
-        # run above summary statistics function
-        if results.platform_qc is not None:
-            (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract[longread_extract['Group'] == i],longread_extract_with_platform_qc_and_diff[longread_extract_with_platform_qc_and_diff['Group']==i],longread_extract_flow_cells_and_output_per_experiment[longread_extract_flow_cells_and_output_per_experiment['Group']==i],longread_extract_output_per_flow_cell[longread_extract_output_per_flow_cell['Group']==i])
+        return pd.read_csv(results.delivery_date_batches,sep="\t")
+
+# read, filter, and classify runs of all input files, and join delivery dates/batches and platform QC checks if provided in options
+# delivery date/batch and platform QC tables already held in memory (e.g., by CARDlongread_dashboard_server.py) are used instead of being read again
+# returns (run table, run table joined with platform QC or None, flow cells/output per experiment table, output per flow cell table, grouped)
+def get_report_tables(results,run_filters,platform_qc_from_index=False,delivery_date_batches_from_index=False,platform_qc_table=None,delivery_date_batches_table=None):
+    # read tab delimited output into pandas data frame
+    # case if just one input file provided
+    if len(results.input_file)==1:
+        # read, filter, and classify runs and get flow cells/output per experiment and output per flow cell tables
+        (longread_extract,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell)=process_cached_cohort(results.input_file[0],results.run_cutoff,None,False,run_filters,results.stage_cache)
+        # set grouped variable as False
+        grouped=False
+        # output table with run type determined if specified in options
+        if results.output_table_with_run_type is not None:
+            # output to TSV with indexes excluded
+            longread_extract.to_csv(results.output_table_with_run_type,index=False,sep="\t")
+        # handle delivery dates
+        if results.delivery_date_batches is not None:
+            if delivery_date_batches_table is None:
+                delivery_date_batches_table=read_delivery_date_batches(results,delivery_date_batches_from_index,longread_extract['Flow Cell ID'])
+            # set longread_extract to original table joined with delivery date/batches table + calculated storage times in days
+            with time_stage('Storage time join'):
+                longread_extract=run_cached_stage(results.stage_cache,'storage_time',(longread_extract,delivery_date_batches_table),calc_storage_time_from_delivery_date,longread_extract,delivery_date_batches_table)
+            # convert critical variable to numeric for statistics and plotting
+            longread_extract['Storage Time (Days)']=pd.to_numeric(longread_extract['Storage Time (Days)'])
+            # output table with delivery date determined if specified in options
+            if results.output_table_with_storage_time is not None:
+                longread_extract.to_csv(results.output_table_with_storage_time,index=False,sep="\t")
+
+    # what if multiple input files provided
+    elif len(results.input_file)>1:
+        # process each cohort as independent task in process pool
+        cohort_tables=process_cohorts(results.input_file,results.run_cutoff,results.names,results.show_group_count,results.processes,run_filters,results.stage_cache)
+        # store input tables in list as long input filename set
+        longread_extract_initial_list=[i[0] for i in cohort_tables]
+        # store flow cells/output per experiment tables for each group
+        longread_extract_flow_cells_and_output_per_experiment_initial_list=[i[1] for i in cohort_tables]
+        # store output per flow cell tables for each group
+        longread_extract_output_per_flow_cell_initial_list=[i[2] for i in cohort_tables]
+        # combine groups into single concatenated data table
+        longread_extract=apply_run_table_schema(pd.concat(longread_extract_initial_list[:],ignore_index=True))
+        longread_extract_flow_cells_and_output_per_experiment=pd.concat(longread_extract_flow_cells_and_output_per_experiment_initial_list[:],ignore_index=True)
+        longread_extract_output_per_flow_cell=pd.concat(longread_extract_output_per_flow_cell_initial_list[:],ignore_index=True)
+        # set grouped variable as True
+        grouped=True
+        # output table with run type determined if specified in options
+        if results.output_table_with_run_type is not None:
+            # output to TSV with indexes excluded
+            longread_extract.to_csv(results.output_table_with_run_type,index=False,sep="\t")
+        # handle delivery dates
+        if results.delivery_date_batches is not None:
+            if delivery_date_batches_table is None:
+                delivery_date_batches_table=read_delivery_date_batches(results,delivery_date_batches_from_index,longread_extract['Flow Cell ID'])
+            # set longread_extract to original table joined with delivery date/batches table + calculated storage times in days
+            with time_stage('Storage time join'):
+                longread_extract=run_cached_stage(results.stage_cache,'storage_time',(longread_extract,delivery_date_batches_table),calc_storage_time_from_delivery_date,longread_extract,delivery_date_batches_table)
+            # convert critical variables to numeric for statistics and plotting
+            longread_extract['Storage Time (Days)']=pd.to_numeric(longread_extract['Storage Time (Days)'])
+            # output table with delivery date determined if specified in options
+            if results.output_table_with_storage_time is not None:
+                longread_extract.to_csv(results.output_table_with_storage_time,index=False,sep="\t")
+
+    # stop with clear message rather than failing in summary statistics if no runs are left
+    if len(longread_extract)==0:
+        quit('ERROR: No runs left after output cutoff (-run_cutoff) and run filters (-where, -date_from, -date_to, -experiment).')
+
+    # platform qc joined table stays empty unless platform qc table provided
+    longread_extract_with_platform_qc_and_diff=None
+    # read csv delimited platform qc file into pandas data frame if provided
+    if (results.platform_qc is not None) and (platform_qc_table is None):
+        if platform_qc_from_index is True:
+            platform_qc_table=CARDlongread_flow_cell_index.lookup_platform_qc(results.flow_cell_index,longread_extract['Flow Cell ID'])
         else:
-            (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract[longread_extract['Group'] == i],None,longread_extract_flow_cells_and_output_per_experiment[longread_extract_flow_cells_and_output_per_experiment['Group']==i],longread_extract_output_per_flow_cell[longread_extract_output_per_flow_cell['Group']==i])
+            platform_qc_table=pd.read_csv(results.platform_qc)
+
+    # use functions above
+    # if platform qc file provided, make joined longread_extract/platform_qc_table
+    if results.platform_qc is not None:
+        with time_stage('Platform QC join'):
+            longread_extract_with_platform_qc_and_diff=run_cached_stage(results.stage_cache,'platform_qc',(longread_extract,platform_qc_table),platform_qc_starting_active_pore_diff,longread_extract,platform_qc_table)
+        # make Platform QC active pores column for plotting
+        longread_extract_with_platform_qc_and_diff.loc[:,['Platform QC active pores']]=pd.to_numeric(longread_extract_with_platform_qc_and_diff['total_pore_count'])
+        # convert all plotted columns to numeric
+        # only copy columns not already read as numbers
+        for i in ['Pore Difference','Time Difference','N50 (kb)','Data output (Gb)']:
+            if not pd.api.types.is_numeric_dtype(longread_extract_with_platform_qc_and_diff[i]):
+                longread_extract_with_platform_qc_and_diff[i]=pd.to_numeric(longread_extract_with_platform_qc_and_diff[i])
+        # also include time series for plotting
+        # convert to iso8601 format
+        longread_extract_with_platform_qc_and_diff['Platform QC date']=get_local_datetimes(longread_extract_with_platform_qc_and_diff['timestamp'])
+        longread_extract_with_platform_qc_and_diff['Run date']=get_local_datetimes(longread_extract_with_platform_qc_and_diff['Start Run Timestamp'])
+        # output longread_extract/platform_qc joined table if option specified
+        # output table with platform QC stats joined if specified in options
+        if results.output_table_with_platform_qc is not None:
+            # output to TSV with indexes excluded
+            longread_extract_with_platform_qc_and_diff.to_csv(results.output_table_with_platform_qc,index=False,sep="\t")
+    return (longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,grouped)
+
+# write summary statistics, distributions, output per flow cell and experiment tables, and plots of report tables to output workbook (results.output_file)
+# plot_images_function(plot_jobs,plot_tables) returns PNG image data of plot jobs in place of rendering with plot cache options (e.g., cached plots of CARDlongread_dashboard_server.py)
+# returns (content hashes of table worksheets, plot cache keys of plot worksheets) for incremental manifest
+def write_report_workbook(results,longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,grouped,legend_patches,rollup_cube=None,previous_plot_images=None,plot_images_function=None):
+    # save data frames as tab-delimited file (.tsv)
+    # Example data structure
+    # Header 
+    # Property   Total   Min Max Mean    Median  Mode    Standard Deviation
+    # Read N50 (kb)
+    # Data output (Gb)
+    # Flow cells per experiment
+    # <empty>
+    # Flow Cells    Frequency
+    # 1 128
+    # 2 398
+    # etc.
+    # <empty>
+    # MinKNOW Version   Frequency
+    # 22.10.7   756
+    # 23.11.4   9
+    # etc.
+    # <empty>
+
+    # content hashes of table worksheets for incremental manifest
+    sheet_hashes={}
+    if grouped is False:
+        # run above summary statistics function
+        with time_stage('Summary statistics'):
+            if results.platform_qc is not None:
+                (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell)[None]
+            else:
+                (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=longread_platform_qc_summary_statistics(longread_extract,None,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell)[None]
+        # output data frames and figures to excel spreadsheet
+        writer = pd.ExcelWriter(results.output_file,engine='xlsxwriter')
         # write data frames with a row between each
         # write combined summary stats
         start_row = 0
-        combined_summary_stats_df.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+        combined_summary_stats_df.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
         # write flow cells per experiment distribution
         # add 1 to row number after combined_summary_stats_df exported
         start_row = start_row + len(combined_summary_stats_df) + 2
-        longread_extract_flow_cells_per_experiment_dist.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+        longread_extract_flow_cells_per_experiment_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
         # write minknow version distribution
         start_row = start_row + len(longread_extract_flow_cells_per_experiment_dist) + 2
-        longread_extract_minknow_version_dist.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+        longread_extract_minknow_version_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
+        # write sample rate distribution
+        start_row = start_row + len(longread_extract_minknow_version_dist) + 2
+        longread_extract_sample_rate_dist.to_excel(writer, startrow=start_row, index=False, sheet_name='Summary statistics report')
         # write flow cells and output per flow cell on another worksheet
-        longread_extract_output_per_flow_cell[longread_extract_output_per_flow_cell['Group']==i].to_excel(writer, index=False, sheet_name=i + ' output per FC')
+        longread_extract_output_per_flow_cell.to_excel(writer, index=False, sheet_name='Output per flow cell ID')
         # write flow cells and output per unique experiment on another worksheet
-        longread_extract_flow_cells_and_output_per_experiment[longread_extract_flow_cells_and_output_per_experiment['Group']==i].to_excel(writer, index=False, sheet_name=i + ' FC+output per expt')
+        longread_extract_flow_cells_and_output_per_experiment.to_excel(writer, index=False, sheet_name='FC + output per experiment')
         # eventually write joined platform QC/summary table to worksheet (to do)
-    # close writer and save workbook
-    writer.close()
-
-# then add svg figures
-# use openpyxl and pipe image data into new worksheets
-# append new worksheets to existing workbook
-workbook = openpyxl.load_workbook(results.output_file)
-
-# probably functionalize all plots below and pass in group/group count variables
-def make_report_plot_sequence(group_variable,legend_patches,user_palette,strip_plot_set):
-    # use make_violinswarmplot_worksheet function to insert figures
-    # plots that don't need cutoff included below to maintain order of spreadsheets (and order of figures)
-    # if/else depending on whether -plot_cutoff set
-    if results.plot_cutoff is True:
-        # show topups in first four plots
-        # test to check data type for first plotted variable: print(longread_extract['N50 (kb)'].dtype)
-        make_violinswarmplot_worksheet(longread_extract,"N50 (kb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Read N50 plot',None,None,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Data output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Run data output plot',None,90,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Read Count (M)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Run read count plot',"Read Count (million reads)",None,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Starting Active Pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting active pores plot',"Starting active pores",6500,results.plot_title,True)
-        # new fields to show
-        # average active pores
-        make_violinswarmplot_worksheet(longread_extract,"Average Active Pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Average active pores plot',"Average active pores",None,results.plot_title,True)
-        # active pore AUC
-        make_violinswarmplot_worksheet(longread_extract,"Active Pore AUC",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Active pore AUC plot',"Active pore AUC",None,results.plot_title,True)
-        # starting pore occupancy
-        make_violinswarmplot_worksheet(longread_extract,"Starting Pore Occupancy",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting pore occupancy plot',"Starting pore occupancy",None,results.plot_title,True)
-        # average pore occupancy
-        make_violinswarmplot_worksheet(longread_extract,"Average Pore Occupancy",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Average pore occupancy plot',"Average pore occupancy",None,results.plot_title,True)
-        # hard coded Q score cutoffs of 8 based on fast basecalling
-        # check if these values are even present using count (find how many non-NA values)
-        if (longread_extract['Passed Modal Q Score'].count()>0):
-            # passed modal Q score
-            make_violinswarmplot_worksheet(longread_extract,"Passed Modal Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Passed modal Q score plot',"Passed modal Q score",8,results.plot_title,True)
-        if (longread_extract['Failed Modal Q Score'].count()>0):
-            # failed modal Q score
-            make_violinswarmplot_worksheet(longread_extract,"Failed Modal Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Failed modal Q score plot',"Failed modal Q score",8,results.plot_title,True)
-        if (longread_extract['Starting Median Translocation Speed'].count()>0):
-            # starting translocation speed
-            make_violinswarmplot_worksheet(longread_extract,"Starting Median Translocation Speed",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting transloc speed plot',"Starting translocation speed (bp/sec)",400,results.plot_title,True)
-        if (longread_extract['Starting Median Q Score'].count()>0):
-            # starting median Q score
-            make_violinswarmplot_worksheet(longread_extract,"Starting Median Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting median Q score plot',"Starting median Q score",8,results.plot_title,True)
-        if (longread_extract['Passed Bases (Gb)'].count()>0):
-            # passed bases
-            make_violinswarmplot_worksheet(longread_extract,"Passed Bases (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Passed bases plot',"Passed bases (Gb)",90,results.plot_title,True)
-        if (longread_extract['Failed Bases (Gb)'].count()>0):
-            # failed bases
-            make_violinswarmplot_worksheet(longread_extract,"Failed Bases (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Failed bases plot',"Failed bases (Gb)",None,results.plot_title,True)
-        if (longread_extract['Percentage Passed Bases'].count()>0):
-            # percentage passed bases
-            make_violinswarmplot_worksheet(longread_extract,"Percentage Passed Bases",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Percentage passed bases plot',"Percentage of bases passing filter",None,results.plot_title,True)
-        # no topups in next three plots
-        make_violinswarmplot_worksheet(longread_extract_flow_cells_and_output_per_experiment,"Flow Cells",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Flow cells per experiment plot',"Flow cells",None,results.plot_title)
-        make_violinswarmplot_worksheet(longread_extract_flow_cells_and_output_per_experiment,"Total output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Output per experiment plot',None,90,results.plot_title)
-        make_violinswarmplot_worksheet(longread_extract_output_per_flow_cell,"Flow cell output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Output per flow cell plot',None,90,results.plot_title)
-        # platform qc violin/swarm plots
-        if results.platform_qc is not None:
-            # platform qc active pores 
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Platform QC active pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform QC active pores plot',None,6500,results.plot_title)
-            # pore differences between sequencing and platform QC
-            # show topups
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Pore Difference",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform-seq pore diff plot',"Platform to sequencing pore difference",None,results.plot_title,True)
-            # time differences between sequencing and platform QC
-            # show topups
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Time Difference",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform-seq time diff plot',"Platform to sequencing time difference",None,results.plot_title,True)
-        # delivery date/batch/storage time swarmplots
-        if results.delivery_date_batches is not None:
-            # plot storage time in days
-            make_violinswarmplot_worksheet(longread_extract,"Storage Time (Days)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Storage time plot',"Storage time (days)",None,results.plot_title,True)
-                  
-    else:
-        # show topups in first four plots
-        make_violinswarmplot_worksheet(longread_extract,"N50 (kb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Read N50 plot',None,None,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Data output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Run data output plot',None,None,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Read Count (M)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Run read count plot',"Read Count (million reads)",None,results.plot_title,True)
-        make_violinswarmplot_worksheet(longread_extract,"Starting Active Pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting active pores plot',"Starting active pores",None,results.plot_title,True)
-        # new fields to show
-        # average active pores
-        make_violinswarmplot_worksheet(longread_extract,"Average Active Pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Average active pores plot',"Average active pores",None,results.plot_title,True)
-        # active pore AUC
-        make_violinswarmplot_worksheet(longread_extract,"Active Pore AUC",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Active pore AUC plot',"Active pore AUC",None,results.plot_title,True)
-        # starting pore occupancy
-        make_violinswarmplot_worksheet(longread_extract,"Starting Pore Occupancy",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting pore occupancy plot',"Starting pore occupancy",None,results.plot_title,True)
-        # average pore occupancy
-        make_violinswarmplot_worksheet(longread_extract,"Average Pore Occupancy",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Average pore occupancy plot',"Average pore occupancy",None,results.plot_title,True)
-        # hard coded Q score cutoffs of 8 based on fast basecalling
-        # check if these values are even present using count (find how many non-NA values)
-        if (longread_extract['Passed Modal Q Score'].count()>0):
-            # passed modal Q score
-            make_violinswarmplot_worksheet(longread_extract,"Passed Modal Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Passed modal Q score plot',"Passed modal Q score",None,results.plot_title,True)
-        if (longread_extract['Failed Modal Q Score'].count()>0):
-            # failed modal Q score
-            make_violinswarmplot_worksheet(longread_extract,"Failed Modal Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Failed modal Q score plot',"Failed modal Q score",None,results.plot_title,True)
-        if (longread_extract['Starting Median Translocation Speed'].count()>0):
-            # starting translocation speed
-            make_violinswarmplot_worksheet(longread_extract,"Starting Median Translocation Speed",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting transloc speed plot',"Starting translocation speed (bp/sec)",None,results.plot_title,True)
-        if (longread_extract['Starting Median Q Score'].count()>0):
-            # starting median Q score
-            make_violinswarmplot_worksheet(longread_extract,"Starting Median Q Score",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Starting median Q score plot',"Starting median Q score",None,results.plot_title,True)
-        if (longread_extract['Passed Bases (Gb)'].count()>0):
-            # passed bases
-            make_violinswarmplot_worksheet(longread_extract,"Passed Bases (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Passed bases plot',"Passed bases (Gb)",None,results.plot_title,True)
-        if (longread_extract['Failed Bases (Gb)'].count()>0):
-            # failed bases
-            make_violinswarmplot_worksheet(longread_extract,"Failed Bases (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Failed bases plot',"Failed bases (Gb)",None,results.plot_title,True)
-        if (longread_extract['Percentage Passed Bases'].count()>0):
-            # percentage passed bases
-            make_violinswarmplot_worksheet(longread_extract,"Percentage Passed Bases",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Percentage passed bases plot',"Percentage of bases passing filter",None,results.plot_title,True)
-        # no topups in next three plots
-        make_violinswarmplot_worksheet(longread_extract_flow_cells_and_output_per_experiment,"Flow Cells",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Flow cells per experiment plot',"Flow cells",None,results.plot_title)
-        make_violinswarmplot_worksheet(longread_extract_flow_cells_and_output_per_experiment,"Total output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Output per experiment plot',None,None,results.plot_title)
-        make_violinswarmplot_worksheet(longread_extract_output_per_flow_cell,"Flow cell output (Gb)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Output per flow cell plot',None,None,results.plot_title)
-        # platform qc violin/swarm plots
-        if results.platform_qc is not None:
-            # platform qc active pores 
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Platform QC active pores",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform QC active pores plot',None,None,results.plot_title)
-            # pore differences between sequencing and platform QC
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Pore Difference",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform-seq pore diff plot',"Platform to sequencing pore difference",None,results.plot_title)
-            # time differences between sequencing and platform QC
-            make_violinswarmplot_worksheet(longread_extract_with_platform_qc_and_diff,"Time Difference",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Platform-seq time diff plot',"Platform to sequencing time difference",None,results.plot_title)
-        # delivery date/batch/storage time swarmplots
-        if results.delivery_date_batches is not None:
-            # plot storage time in days
-            make_violinswarmplot_worksheet(longread_extract,"Storage Time (Days)",group_variable,legend_patches,user_palette,strip_plot_set,workbook,'Storage time plot',"Storage time (days)",None,results.plot_title,True)
-    # use make_active_pore_data_output_scatterplot function to add starting active pore vs. data output scatterplot
-    # make_active_pore_data_output_scatterplot(longread_extract,workbook,'Active pores vs. data output',results.plot_title)
-    # redo with make_scatterplot_worksheet
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Active pores vs. data output",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-    # do also with read count
-    # cutoffs not known yet for read count
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Active pores vs. read count",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='Read Count (M)',prop_point_size=False,size_column=None)            
-    # make_active_pore_flow_cell_output_scatterplot(longread_extract_output_per_flow_cell,workbook,'Active pores vs. flow cell output',results.plot_title)
-    # make_active_pore_read_n50_scatterplot(longread_extract,workbook,'Active pores vs. read N50',results.plot_title)
-    # redo with make_scatterplot_worksheet
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Active pores vs. read N50",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='N50 (kb)',prop_point_size=False,size_column=None)            
-    # make_read_n50_data_output_scatterplot(longread_extract,workbook,'Read N50 vs. data output',results.plot_title)
-    # redo with make_scatterplot_worksheet
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Read N50 vs. data output",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=True,x_variable='N50 (kb)',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-    # add read N50 vs. data output without regression line
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Read N50 vs. data no line",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='N50 (kb)',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)     
-    # do also with read count
-    # redo with make_scatterplot_worksheet
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Read N50 vs. read count",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=True,x_variable='N50 (kb)',y_variable='Read Count (M)',prop_point_size=False,size_column=None)            
-    # add read N50 vs. data output without regression line
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Read N50 vs. count no line",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='N50 (kb)',y_variable='Read Count (M)',prop_point_size=False,size_column=None)     
-    # add starting active pores vs. average active pores
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Start vs. avg active pores",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='Average Active Pores',prop_point_size=False,size_column=None)            
-    # add starting active pores vs. active pore AUC
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Start active pores vs. AUC",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='Active Pore AUC',prop_point_size=False,size_column=None)            
-    # add average active pores vs. data output
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Avg active pores vs. data",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Average Active Pores',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-    # add active pore AUC vs. data output
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Active pore AUC vs. data",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Active Pore AUC',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-    # add active pore AUC vs. read count
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore AUC vs. read count",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Active Pore AUC',y_variable='Read Count (M)',prop_point_size=False,size_column=None)            
-    
-    # add average pore occupancy vs. data output
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Avg pore occup. vs. data",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Average Pore Occupancy',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-    # add average median translocation speed vs. average median Q score if both columns have data present
-    if ((longread_extract['Average Median Translocation Speed Over Time'].count()>0) and (longread_extract['Average Median Q Score Over Time'].count()>0)):
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Transloc. speed vs. Q score",title=results.plot_title,x_cutoffs=[400],x_cutoff_colors=['blue'],y_cutoffs=[8],y_cutoff_colors=['green'],show_run_colors=True,show_reg_line=False,x_variable='Average Median Translocation Speed Over Time',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-    # add data output vs. average median Q score if Q score present
-    if (longread_extract['Average Median Q Score Over Time'].count()>0):
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Data output vs. Q score",title=results.plot_title,x_cutoffs=[90],x_cutoff_colors=['gray'],y_cutoffs=[8],y_cutoff_colors=['green'],show_run_colors=True,show_reg_line=False,x_variable='Data output (Gb)',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-    # add starting active pores vs. average median Q score if Q score present
-    if (longread_extract['Average Median Q Score Over Time'].count()>0):
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Start. pores vs. Q score",title=results.plot_title,x_cutoffs=[5000,6500],x_cutoff_colors=['red','green'],y_cutoffs=[8],y_cutoff_colors=['blue'],show_run_colors=True,show_reg_line=False,x_variable='Starting Active Pores',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-    # add active pore AUC vs. average median Q score if Q score present
-    if (longread_extract['Average Median Q Score Over Time'].count()>0):
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Active pore AUC vs. Q score",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[8],y_cutoff_colors=['green'],show_run_colors=True,show_reg_line=False,x_variable='Active Pore AUC',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-    # add passed bases vs. passed modal q score if both columns have data present
-    if ((longread_extract['Passed Bases (Gb)'].count()>0) and (longread_extract['Passed Modal Q Score'].count()>0)):
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Passed bases vs. Q score",title=results.plot_title,x_cutoffs=[90],x_cutoff_colors=['gray'],y_cutoffs=[8],y_cutoff_colors=['green'],show_run_colors=True,show_reg_line=False,x_variable='Passed Bases (Gb)',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-    # log10 transform platform qc active pores, starting active pores, and pore differences
-    if results.platform_qc is not None:
-        longread_extract_with_platform_qc_and_diff['log_platform_qc_active_pores']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Platform QC active pores']))
-        longread_extract_with_platform_qc_and_diff['log_starting_active_pores']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Starting Active Pores']))
-        longread_extract_with_platform_qc_and_diff['log_pore_difference']=np.log10(pd.to_numeric(longread_extract_with_platform_qc_and_diff['Pore Difference']))
-        # plots to include if platform qc provided
-        # pore difference violin/swarmplot
-        # pore measurement time difference violin/swarmplot
-        # all done above
-        # platform qc active pores vs. starting active pores
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pqc vs. starting active pores",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Platform QC active pores',y_variable='Starting Active Pores',prop_point_size=False,size_column=None)        
-        # platform qc active pores vs. pore difference
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pqc vs. pore difference",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Platform QC active pores',y_variable='Pore Difference',prop_point_size=False,size_column=None)    
-        # pore difference vs. time difference scatterplot with run colors set
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore vs. time difference",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Time Difference',y_variable='Pore Difference',prop_point_size=False,size_column=None)    
-        # pore difference vs. run output scatterplot
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore difference vs. run output",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Pore Difference',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)        
-        # add pore difference vs. active pore auc scatterplot
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore diff. vs. active pore AUC",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Pore Difference',y_variable='Active Pore AUC',prop_point_size=False,size_column=None)        
-        # add pore difference vs. average median Q score if Q score present
-        if (longread_extract['Average Median Q Score Over Time'].count()>0):
-            make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore diff. vs. Q score",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[8],y_cutoff_colors=['blue'],show_run_colors=True,show_reg_line=False,x_variable='Pore Difference',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)        
-        # add pore difference vs. pore occupancy scatterplot
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore occup. vs. pore diff.",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Starting Pore Occupancy',y_variable='Pore Difference',prop_point_size=False,size_column=None)        
-        # read N50 vs. run output scatterplot with coloring by run type and size based on pore difference
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"N50 output pore diff",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='N50 (kb)',y_variable='Data output (Gb)',prop_point_size=True,size_column='Pore Difference')    
-        # read N50 vs. run output scatterplot with coloring by run type and size based on starting active pores
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"N50 output starting pores",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='N50 (kb)',y_variable='Data output (Gb)',prop_point_size=True,size_column='Starting Active Pores')
-        # run matched platform qc active pores over time
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Platform QC pores over time",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[6500],y_cutoff_colors=['green'],show_run_colors=True,show_reg_line=False,x_variable='Platform QC date',y_variable='Platform QC active pores',prop_point_size=False,size_column=None,has_date_time=True)
-        # pore difference over time
-        make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore difference over time",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Run date',y_variable='Pore Difference',prop_point_size=False,size_column=None,has_date_time=True)    
-        # delivery date/batch/storage time swarmplots
-        if results.delivery_date_batches is not None:
-            # storage time vs. pore difference
-            make_scatterplot_worksheet(longread_extract_with_platform_qc_and_diff,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Pore diff. vs storage",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Storage Time (Days)',y_variable='Pore Difference',prop_point_size=False,size_column=None,has_date_time=True)    
-            
-    # run output over time
-    make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Run output over time",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Run date',y_variable='Data output (Gb)',prop_point_size=False,size_column=None,has_date_time=True)    
-    # delivery date/batch/storage time swarmplots
-    if results.delivery_date_batches is not None:
-        # storage time vs. data output
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Storage vs. data output",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[90],y_cutoff_colors=['gray'],show_run_colors=True,show_reg_line=False,x_variable='Storage Time (Days)',y_variable='Data output (Gb)',prop_point_size=False,size_column=None)            
-        # storage time vs. starting active pores
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Storage vs. starting pores",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[5000,6500],y_cutoff_colors=['red','green'],show_run_colors=True,show_reg_line=False,x_variable='Storage Time (Days)',y_variable='Starting Active Pores',prop_point_size=False,size_column=None)            
-        # storage time vs. active pore AUC
-        make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Storage vs. pore AUC",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable='Storage Time (Days)',y_variable='Active Pore AUC',prop_point_size=False,size_column=None)            
-        # storage time vs. average median Q score over run
-        if (longread_extract['Average Median Q Score Over Time'].count()>0):
-            make_scatterplot_worksheet(longread_extract,group_variable,legend_patches,user_palette,strip_plot_set,workbook,"Storage vs. Q score",title=results.plot_title,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=[8],y_cutoff_colors=['blue'],show_run_colors=True,show_reg_line=False,x_variable='Storage Time (Days)',y_variable='Average Median Q Score Over Time',prop_point_size=False,size_column=None)            
-            
-    
-# run through plots depending on whether group variable and group count variables set
-if grouped is False:
-    make_report_plot_sequence(None,legend_patches,results.colors,results.strip_plot)
-# if group variable set
-elif grouped is True:
-    # show group count if variable set
-    if results.show_group_count is True:
-        make_report_plot_sequence('Group and count',legend_patches,results.colors,results.strip_plot)
+        sheet_hashes['Summary statistics report']=get_sheet_hash(combined_summary_stats_df,longread_extract_flow_cells_per_experiment_dist,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist)
+        sheet_hashes['Output per flow cell ID']=get_sheet_hash(longread_extract_output_per_flow_cell)
+        sheet_hashes['FC + output per experiment']=get_sheet_hash(longread_extract_flow_cells_and_output_per_experiment)
+    elif grouped is True:
+        # output data frames and figures to excel spreadsheet
+        writer = pd.ExcelWriter(results.output_file,engine='xlsxwriter')
+        # run above summary statistics function once for all groups
+        with time_stage('Summary statistics'):
+            if results.platform_qc is not None:
+                summary_statistics_per_group=longread_platform_qc_summary_statistics(longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,'Group',results.names)
+            else:
+                summary_statistics_per_group=longread_platform_qc_summary_statistics(longread_extract,None,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,'Group',results.names)
+        # split flow cell and experiment tables by group once for writing
+        longread_extract_output_per_flow_cell_per_group=split_by_group(longread_extract_output_per_flow_cell,'Group',results.names)
+        longread_extract_flow_cells_and_output_per_experiment_per_group=split_by_group(longread_extract_flow_cells_and_output_per_experiment,'Group',results.names)
+        # run through loop here
+        # loop through all group names from input
+        for idx, i in enumerate(results.names):
+            (combined_summary_stats_df,longread_extract_minknow_version_dist,longread_extract_sample_rate_dist,longread_extract_flow_cells_per_experiment_dist)=summary_statistics_per_group[i]
+            # write data frames with a row between each
+            # write combined summary stats
+            start_row = 0
+            combined_summary_stats_df.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+            # write flow cells per experiment distribution
+            # add 1 to row number after combined_summary_stats_df exported
+            start_row = start_row + len(combined_summary_stats_df) + 2
+            longread_extract_flow_cells_per_experiment_dist.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+            # write minknow version distribution
+            start_row = start_row + len(longread_extract_flow_cells_per_experiment_dist) + 2
+            longread_extract_minknow_version_dist.to_excel(writer, startrow=start_row, index=False, sheet_name=i + ' statistics')
+            # write flow cells and output per flow cell on another worksheet
+            longread_extract_output_per_flow_cell_per_group[i].to_excel(writer, index=False, sheet_name=i + ' output per FC')
+            # write flow cells and output per unique experiment on another worksheet
+            longread_extract_flow_cells_and_output_per_experiment_per_group[i].to_excel(writer, index=False, sheet_name=i + ' FC+output per expt')
+            # eventually write joined platform QC/summary table to worksheet (to do)
+            sheet_hashes[i + ' statistics']=get_sheet_hash(combined_summary_stats_df,longread_extract_flow_cells_per_experiment_dist,longread_extract_minknow_version_dist)
+            sheet_hashes[i + ' output per FC']=get_sheet_hash(longread_extract_output_per_flow_cell_per_group[i])
+            sheet_hashes[i + ' FC+output per expt']=get_sheet_hash(longread_extract_flow_cells_and_output_per_experiment_per_group[i])
+        # write significance tests between groups on their own worksheet
+        if results.cohort_comparisons is True:
+            with time_stage('Cohort comparisons'):
+                cohort_comparisons=CARDlongread_cohort_comparisons.get_cohort_comparisons({'runs' : longread_extract, 'platform_qc' : longread_extract_with_platform_qc_and_diff if results.platform_qc is not None else None, 'experiments' : longread_extract_flow_cells_and_output_per_experiment, 'flow_cells' : longread_extract_output_per_flow_cell},summary_statistics_properties,'Group',results.names,results.permutations,results.permutation_seed)
+            cohort_comparisons.to_excel(writer, index=False, sheet_name='Cohort comparisons')
+            sheet_hashes['Cohort comparisons']=get_sheet_hash(cohort_comparisons)
+
+    # write rollup cube on its own worksheet for pivot tables
+    if results.rollup_cube_sheet is True:
+        rollup_cube.to_excel(writer, index=False, sheet_name='Rollup cube')
+        sheet_hashes['Rollup cube']=get_sheet_hash(rollup_cube)
+
+    # then add figures
+    # pipe image data into new worksheets of the same workbook before it is saved
+    workbook = writer.book
+
+    # describe plots depending on whether group variable and group count variables set
+    # source tables for plot jobs
+    plot_tables={'runs' : longread_extract, 'platform_qc' : longread_extract_with_platform_qc_and_diff, 'experiments' : longread_extract_flow_cells_and_output_per_experiment, 'flow_cells' : longread_extract_output_per_flow_cell}
+    if grouped is False:
+        plot_jobs=make_report_plot_sequence(results,plot_tables,None,legend_patches,results.colors,results.strip_plot)
+    # if group variable set
+    elif grouped is True:
+        # show group count if variable set
+        if results.show_group_count is True:
+            plot_jobs=make_report_plot_sequence(results,plot_tables,'Group and count',legend_patches,results.colors,results.strip_plot)
+        else:
+            plot_jobs=make_report_plot_sequence(results,plot_tables,'Group',legend_patches,results.colors,results.strip_plot)
+
+    # plot cache keys of plot worksheets for incremental manifest
+    plot_hashes={}
+    # draw plots as native Excel charts if requested
+    if results.chart_engine == 'native':
+        import CARDlongread_native_charts
+        with time_stage('Native charts'):
+            CARDlongread_native_charts.add_native_chart_worksheets(workbook,plot_jobs,plot_tables)
+    # otherwise render plots in parallel and add one worksheet per plot in plot job order
     else:
-        make_report_plot_sequence('Group',legend_patches,results.colors,results.strip_plot)
+        with time_stage('Plots'):
+            # hash plot data and options once for plot cache and incremental manifest
+            plot_cache_keys=[get_plot_cache_key(i,plot_tables) for i in plot_jobs] if (results.plot_cache is not None) or (results.incremental is True) else None
+            if plot_images_function is not None:
+                plot_images=plot_images_function(plot_jobs,plot_tables)
+            else:
+                plot_images=get_plot_images(plot_jobs,plot_tables,results.processes,results.plot_cache,results.plot_cache_max_mb,plot_cache_keys,previous_plot_images)
+        if plot_cache_keys is not None:
+            plot_hashes={i[0] : j for i, j in zip(plot_jobs,plot_cache_keys)}
+        with time_stage('Add plot worksheets'):
+            for plot_job, plot_image in zip(plot_jobs,plot_images):
+                add_image_worksheet(workbook,plot_job[0],plot_image)
+
+    # write stage timings so far to worksheet if requested (workbook save is only in JSON timings)
+    if results.timings_sheet is True:
+        pd.DataFrame(stage_timings,columns=['Stage','Item','Process','Depth','Seconds','Peak memory (MB)','Peak memory increase (MB)']).to_excel(writer, index=False, sheet_name='Run diagnostics')
+
+    # close writer and save workbook when done
+    with time_stage('Save workbook'):
+        writer.close()
+    return (sheet_hashes,plot_hashes)
+
+# subroutine to parse command line arguments
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description='This program gets summary statistics from long read sequencing report data.')
+
+    # get input and output arguments
+    # allow multiple inputs
+    parser.add_argument('-input', action="store", dest="input_file", nargs="+", help="Input tab-delimited tsv file(s) containing features extracted from long read sequencing reports.")
+    # if multiple inputs, require input names
+    parser.add_argument('-names', action="store", dest="names", nargs="*", help="Names corresponding to input tsv file(s); required if more than one tsv provided.")
+    # alternatively split single input into groups by group column
+    parser.add_argument('-group_column', action="store", default=None, dest="group_column", help="Column of single input tsv naming the group of each run, e.g. Group in output of CARDlongread_extract_from_json.py --cohorts; groups are compared as if given as separate input files, in -names order if provided (optional)")
+    # single output xlsx
+    parser.add_argument('-output', action="store", dest="output_file", help="Output long read sequencing summary statistics XLSX")
+    # import platform QC table in format specified in CARDlongread_MinKNOW_api_scripts repository
+    parser.add_argument('-platform_qc', action="store",default=None, dest="platform_qc", help="Input platform QC table to calculate active pore dropoff upon sequencing (optional)")
+    # import delivery date table parsed from ONT provided spreadsheet with export_flow_cell_delivery_dates.py
+    parser.add_argument('-delivery_date_batches',action="store",default=None,dest="delivery_date_batches", help="Input delivery date/batch table to calculate storage time per flow cell based on delivery date and run timestamp (optional).")
+    # import platform QC and delivery date tables from persistent flow cell index built with CARDlongread_flow_cell_index.py
+    parser.add_argument('-flow_cell_index',action="store",default=None,dest="flow_cell_index", help="Input flow cell index (SQLite) built with CARDlongread_flow_cell_index.py; used for platform QC and delivery date/batch information not provided with -platform_qc or -delivery_date_batches (optional).")
+    # add option to specify plot title
+    parser.add_argument('-plot_title', action="store", default=None, dest="plot_title", help="Title for each plot in output XLSX (optional)")
+    # add boolean --plot_cutoff argument
+    parser.add_argument('--plot_cutoff', action=argparse.BooleanOptionalAction, default=True, dest="plot_cutoff", help="Include cutoff lines in violin plots (optional; default true; --no-plot_cutoff to override)")
+    # include failed run cutoff to exclude as well
+    parser.add_argument('-run_cutoff', action="store", default=1, type=float, dest="run_cutoff", help="Minimum data output per flow cell run to include (optional, 1 Gb default)")
+    # add option for stripplot instead of swarmplot (in case of excessive data points)
+    parser.add_argument('--strip_plot', action=argparse.BooleanOptionalAction, default=False, dest="strip_plot", help="Show strip plots instead of swarm plots inside violin plots (optional; default false)")
+    # add option for large group mode in swarm plots
+    parser.add_argument('-swarm_max_points', action="store", default=0, type=int, dest="swarm_max_points", help="Maximum points per group shown in swarm plots; larger groups show a fixed random subsample of points over violin plots of all points, noted in plot title (optional; default 0 shows all points)")
+    # add option for color palette
+    parser.add_argument('-colors', action="store", default=None, dest="colors", nargs="*", help="Color palette corresponding to sequential groups displayed (e.g., 'blue', 'red', 'blue'); optional and used only if more than one tsv provided.")
+    # add option for custom legend colors
+    parser.add_argument('-legend_colors', action="store", default=None, dest="legend_colors", nargs="*", help="Colors shown in the legend (e.g., 'blue', 'red'); optional and used only if more color palette included above. Must be palette subset.")
+    # add option for custom legend labels
+    parser.add_argument('-legend_labels', action="store", default=None, dest="legend_labels", nargs="*", help="Labels for each color in legend in order specified in -legend_colors.")
+    # add option to show sample size for groups in grouped violinplots
+    parser.add_argument('--group_count', action=argparse.BooleanOptionalAction, default=False, dest="show_group_count", help="Show group count in x-axis labels (optional; default false)")
+    # add option to output platform qc joined table
+    parser.add_argument('-output_table_with_platform_qc', action="store", default=None, help="Output filename for run report summary table joined with platform QC flow cell check information (optional).")
+    # add option to output run type designation
+    parser.add_argument('-output_table_with_run_type', action="store", default=None, help="Output filename for run report summary table with appended run type, such as 'top up' or 'reconnection' (optional).")
+    # add option to output storage time designation
+    parser.add_argument('-output_table_with_storage_time', action="store", default=None, help="Output filename for run report summary table with delivery date, batch, and storage times in days added (optional).")
+    # add option for number of processes used to render plots
+    parser.add_argument('-processes', action="store", default=1, type=int, dest="processes", help="Number of processes used to process cohorts and render plots in parallel (optional; default 1)")
+    # add option to only write output tables without summary statistics workbook
+    parser.add_argument('--tables_only', action=argparse.BooleanOptionalAction, default=False, dest="tables_only", help="Only write tables requested with -output_table_with_run_type, -output_table_with_platform_qc, and -output_table_with_storage_time; skip summary statistics and plots and do not write output XLSX (optional; default false)")
+    # add option for native Excel charts instead of PNG figures
+    parser.add_argument('-chart_engine', action="store", default='matplotlib', choices=['matplotlib','native'], dest="chart_engine", help="Draw plots as PNG figures with matplotlib/seaborn or as interactive native Excel charts with plot data on a hidden worksheet (optional; default matplotlib)")
+    # add options to select plots by worksheet name or tag
+    parser.add_argument('-plots', action="store", default=None, nargs="*", dest="plots", help="Worksheet names or tags of plots to include, e.g. 'yield' or 'Run data output plot'; tags are violin, scatter, yield, n50, pores, occupancy, qscore, speed, time, platform_qc, and storage (optional; default all plots)")
+    parser.add_argument('-skip_plots', action="store", default=None, nargs="*", dest="skip_plots", help="Worksheet names or tags of plots to leave out (optional)")
+    # add options for on-disk plot cache
+    parser.add_argument('-plot_cache', action="store", default=None, dest="plot_cache", help="Directory for cache of rendered plots; plots whose data and options are unchanged are reused instead of rendered again (optional)")
+    parser.add_argument('-plot_cache_max_mb', action="store", default=500, type=float, dest="plot_cache_max_mb", help="Maximum plot cache size in megabytes; least recently used plots are removed beyond this size (optional; default 500)")
+    # add option for persisted, mergeable summary statistics state
+    parser.add_argument('-summary_state', action="store", default=None, dest="summary_state", help="Summary statistics state file in JSON format updated with runs not already in it, for CARDlongread_summary_state.py (optional)")
+    # add options for rollup cube of run level properties
+    parser.add_argument('-rollup_cube', action="store", default=None, dest="rollup_cube", help="Output filename for rollup cube in TSV format with run count and sum, sum of squares, min, and max of each run level property per group, run month, flow cell product code, sequencer ID, and flow cell position (optional)")
+    parser.add_argument('--rollup_cube_sheet', action=argparse.BooleanOptionalAction, default=False, dest="rollup_cube_sheet", help="Write rollup cube to 'Rollup cube' worksheet of output XLSX for pivot tables (optional; default false)")
+    # add options to filter runs while reading input tables
+    parser.add_argument('-where', action="store", default=None, dest="where", help="Keep only runs matching pandas query expression over input table columns, e.g. \"`Sequencer ID` == 'PC48B098' and `N50 (kb)` > 20\" (optional)")
+    parser.add_argument('-date_from', action="store", default=None, dest="date_from", help="Keep only runs with run date on or after this date in YYYY-MM-DD format (optional)")
+    parser.add_argument('-date_to', action="store", default=None, dest="date_to", help="Keep only runs with run date on or before this date in YYYY-MM-DD format (optional)")
+    parser.add_argument('-experiment', action="store", default=None, dest="experiments", nargs="*", help="Keep only runs from these experiment names (optional)")
+    # add option for on-disk cache of pipeline stage outputs
+    parser.add_argument('-stage_cache', action="store", default=None, dest="stage_cache", help="Directory for cache of intermediate tables (cohort run tables with run types, platform QC join, and storage time join); stages whose input files, tables, and options are unchanged are reused instead of run again. Stages are stored as pickles, which can run code when read, so use a directory only you can write to; files owned or writable by other users are not read (optional)")
+    # arguments for cross-cohort significance tests
+    parser.add_argument('--cohort_comparisons', action=argparse.BooleanOptionalAction, default=False, dest="cohort_comparisons", help="Write Kruskal-Wallis and pairwise Mann-Whitney U tests between groups with permutation and Benjamini-Hochberg adjusted p-values for every summary statistics property to 'Cohort comparisons' worksheet; requires multiple groups (optional; default false)")
+    parser.add_argument('-permutations', action="store", type=int, default=10000, dest="permutations", help="Number of group label permutations for permutation p-values of cohort comparisons; 0 skips permutation tests (optional; default 10000)")
+    parser.add_argument('-permutation_seed', action="store", type=int, default=1, dest="permutation_seed", help="Random seed for cohort comparison permutations (optional; default 1)")
+    # add option for incremental regeneration of output workbook
+    parser.add_argument('--incremental', action=argparse.BooleanOptionalAction, default=False, dest="incremental", help="Regenerate output XLSX incrementally: cohort tables are cached in <output>.incremental, and plot images whose data and options are unchanged are copied from the previous output XLSX instead of rendered again, using a manifest of cohort, worksheet, and plot content hashes (optional; default false)")
+    # add options for stage and plot timings
+    parser.add_argument('-timings', action="store", default=None, dest="timings", help="Output filename for wall time and peak resident memory of each stage and plot in JSON format (optional)")
+    parser.add_argument('--timings_sheet', action=argparse.BooleanOptionalAction, default=False, dest="timings_sheet", help="Write wall time and peak resident memory of each stage and plot to 'Run diagnostics' worksheet of output XLSX (optional; default false)")
+    # return parsed arguments
+    return parser.parse_args(args)
+
+# main script subroutine
+# args are command line arguments (default sys.argv), and input_tables are in-memory run tables used in place of -input files
+def main(args=None,input_tables=None):
+    # parse arguments
+    results = parse_args(args)
+    if input_tables is not None:
+        results.input_file = input_tables
+    # record wall time and peak memory per stage and plot if requested
+    if (results.timings is not None) or (results.timings_sheet is True):
+        start_stage_timings()
+    start_time=time.perf_counter()
+
+    # throw error if no input file provided
+    if results.input_file is None:
+        quit('ERROR: No input file (-input) provided!')
+
+    # split single input table into one input table per group
+    if results.group_column is not None:
+        if len(results.input_file)>1:
+            quit('ERROR: Group column (-group_column) requires a single input file.')
+        (results.input_file,results.names)=split_run_table_by_group_column(results.input_file[0],results.group_column,results.names)
+
+    # throw error if no names provided if multiple input files provided
+    if len(results.input_file)>1:
+        if len(results.names)<=1:
+            quit('ERROR: Multiple input files provided but not multiple names (-names).')
+
+    # throw error if cohort comparisons requested without groups
+    if (results.cohort_comparisons is True) and (len(results.input_file)<=1):
+        quit('ERROR: Cohort comparisons (--cohort_comparisons) require multiple input files or groups (-group_column).')
+
+    # throw error if no names provided if multiple input files provided
+    if len(results.input_file)>1:
+        if len(results.names)<=1:
+            quit('ERROR: Multiple input files provided but not multiple names (-names).')
+        elif len(results.names) != len(results.input_file):
+            quit('ERROR: Number of names is different from number of input files.')
+        # test if number of colors different from input files and names
+        elif (results.colors is not None) and (len(results.colors) != len(results.names)):
+            quit("ERROR: Color palette provided, but number of colors doesnt match number of group names.")
+
+    # set legend_patches to None by default
+    legend_patches=None
+    # test if legend colors and labels have proper length
+    if (results.legend_colors is not None) or (results.legend_labels is not None):
+        if len(results.legend_colors) != len(results.legend_labels):
+            quit('ERROR: Number of legend colors does not match number of legend labels.')
+        else:
+            # prepare legend patches
+            import matplotlib.patches as mpatches
+            # make list as long as legend colors (at this point same as legend_labels)
+            legend_patches = [0] * len(results.legend_colors)
+            for idx, i in enumerate(results.legend_colors):
+                legend_patches[idx] = mpatches.Patch(color=i, label=results.legend_labels[idx])
+
+    # test if legend colors provided but not labels or vice versa
+    if ((results.legend_colors is not None) and (results.legend_labels is None)) or ((results.legend_colors is None) and (results.legend_labels is not None)):
+        quit('ERROR: Either legend colors or legend labels provided but not both.')
+
+    # check run date filters and normalize to YYYY-MM-DD for comparison with run dates
+    for i in ['date_from','date_to']:
+        if getattr(results,i) is not None:
+            try:
+                setattr(results,i,datetime.strptime(getattr(results,i),'%Y-%m-%d').strftime('%Y-%m-%d'))
+            except ValueError:
+                quit('ERROR: -' + i + ' must be a date in YYYY-MM-DD format.')
+    # filters applied to run tables as they are read
+    run_filters={'where' : results.where, 'date_from' : results.date_from, 'date_to' : results.date_to, 'experiments' : results.experiments}
+
+    # set default output filename
+    if results.output_file is None:
+        results.output_file='output_summary_statistics.xlsx'
+
+    # reuse cohort tables and unchanged plots of previous output workbook if incremental regeneration requested
+    previous_manifest=None
+    previous_plot_images=None
+    incremental_start_time=time.time()
+    cohort_hashes={}
+    if results.incremental is True:
+        # cache cohort tables next to output workbook unless stage cache provided
+        if results.stage_cache is None:
+            results.stage_cache=get_incremental_dir(results.output_file)
+        # read plot images of previous workbook before output workbook is overwritten
+        if results.tables_only is False:
+            (previous_manifest,previous_plot_images)=read_incremental_manifest(results.output_file)
+        # cohort hashes are stage cache keys of cohort tables
+        for idx, i in enumerate(results.input_file):
+            if len(results.input_file)>1:
+                cohort_hashes[results.names[idx]]=get_stage_cache_key('cohort',*get_cohort_stage_key_inputs(i,results.run_cutoff,results.names[idx],results.show_group_count,run_filters))
+            else:
+                cohort_hashes[get_run_table_name(i)]=get_stage_cache_key('cohort',*get_cohort_stage_key_inputs(i,results.run_cutoff,None,False,run_filters))
+
+    # use flow cell index for platform qc and delivery date/batch tables not provided directly
+    (platform_qc_from_index,delivery_date_batches_from_index)=use_flow_cell_index(results)
+
+    # read tab delimited output, classify runs, and join delivery dates and platform QC checks
+    (longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,grouped)=get_report_tables(results,run_filters,platform_qc_from_index,delivery_date_batches_from_index)
+
+    # add runs not yet in persisted summary statistics state and save updated state
+    if results.summary_state is not None:
+        summary_state=CARDlongread_summary_state.load_summary_state(results.summary_state)
+        CARDlongread_summary_state.update_summary_state(summary_state,longread_extract,'runs',summary_statistics_properties,'Group' if grouped else None)
+        if longread_extract_with_platform_qc_and_diff is not None:
+            CARDlongread_summary_state.update_summary_state(summary_state,longread_extract_with_platform_qc_and_diff,'platform_qc',summary_statistics_properties,'Group' if grouped else None)
+        CARDlongread_summary_state.save_summary_state(summary_state,results.summary_state)
+
+    # build rollup cube if written to TSV or worksheet
+    rollup_cube=None
+    if (results.rollup_cube is not None) or (results.rollup_cube_sheet is True):
+        with time_stage('Rollup cube'):
+            rollup_cube=get_rollup_cube({'runs' : longread_extract, 'platform_qc' : longread_extract_with_platform_qc_and_diff},summary_statistics_properties,'Group' if grouped else None)
+        # output rollup cube to TSV with indexes excluded
+        if results.rollup_cube is not None:
+            rollup_cube.to_csv(results.rollup_cube,index=False,sep="\t")
+
+    # stop after output tables if only tables requested
+    if results.tables_only is True:
+        # write stage timings if requested
+        if results.timings is not None:
+            write_stage_timings(results.timings,time.perf_counter()-start_time)
+        return
 
-# save workbook when done
-workbook.save(results.output_file)
+    # write summary statistics, output tables, and plots to output workbook
+    (sheet_hashes,plot_hashes)=write_report_workbook(results,longread_extract,longread_extract_with_platform_qc_and_diff,longread_extract_flow_cells_and_output_per_experiment,longread_extract_output_per_flow_cell,grouped,legend_patches,rollup_cube,previous_plot_images)
+    # record content hashes of new workbook for next incremental regeneration
+    if results.incremental is True:
+        write_incremental_manifest(results.output_file,cohort_hashes,sheet_hashes,plot_hashes)
+        print_incremental_changes(previous_manifest,cohort_hashes,sheet_hashes,plot_hashes)
+        # drop cohort tables not used by this run from sidecar directory, comparing whole seconds for coarse file system timestamps
+        if results.stage_cache == get_incremental_dir(results.output_file):
+            prune_stage_cache(results.stage_cache,int(incremental_start_time))
+    # write stage timings if requested
+    if results.timings is not None:
+        write_stage_timings(results.timings,time.perf_counter()-start_time)
 
-# script complete
-quit()
\ No newline at end of file
+# run main subroutine
+if __name__ == "__main__":
+    main()
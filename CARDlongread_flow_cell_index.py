@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# persistent flow cell metadata index combining platform QC flow cell checks with delivery date/batch information
+# stored as a SQLite database indexed on flow cell ID and timestamp so that new platform QC checks and ONT shipments can be appended incrementally
+# and CARDlongread_extract_summary_statistics.py can look up only the flow cells present in its input tables (-flow_cell_index option)
+import sqlite3
+import os
+import pathlib
+import argparse
+from io import StringIO
+import pandas as pd
+# reuse ONT spreadsheet conversion from delivery date export script
+import export_flow_cell_delivery_dates
+
+# platform QC table columns as exported by CARDlongread_MinKNOW_api_scripts
+platform_qc_columns = ['position','flow_cell_id','product_code','passed','total_pore_count','timestamp']
+# delivery date/batch table columns as exported by export_flow_cell_delivery_dates.py
+delivery_date_batch_columns = ['Flow Cell ID','Batch','Shipped date','Delivery date','Delivery date timestamp','Delivery date timestamp (ISO)']
+
+# open flow cell index, creating tables and indexes if necessary
+def open_flow_cell_index(index_file):
+    connection = sqlite3.connect(index_file)
+    # platform QC flow cell checks, one row per check
+    # unique constraint makes repeated ingestion of the same platform QC table a no-op
+    connection.execute('CREATE TABLE IF NOT EXISTS platform_qc (position TEXT, flow_cell_id TEXT NOT NULL, product_code TEXT, passed INTEGER, total_pore_count INTEGER, timestamp INTEGER NOT NULL, UNIQUE (flow_cell_id, timestamp, position))')
+    # delivery dates and batches, one row per flow cell shipment
+    connection.execute('CREATE TABLE IF NOT EXISTS delivery_date_batches (flow_cell_id TEXT NOT NULL, batch TEXT, shipped_date TEXT, delivery_date TEXT, delivery_date_timestamp REAL, delivery_date_timestamp_iso TEXT, UNIQUE (flow_cell_id, batch, shipped_date))')
+    # sort both tables by flow cell ID and timestamp for indexed lookups
+    connection.execute('CREATE INDEX IF NOT EXISTS platform_qc_flow_cell_timestamp ON platform_qc (flow_cell_id, timestamp)')
+    connection.execute('CREATE INDEX IF NOT EXISTS delivery_date_batches_flow_cell_timestamp ON delivery_date_batches (flow_cell_id, delivery_date_timestamp)')
+    return connection
+
+# open existing flow cell index read only for lookups, so that mistyped index files are reported rather than created empty
+def open_flow_cell_index_read_only(index_file):
+    if not os.path.isfile(index_file):
+        quit('ERROR: Flow cell index ' + str(index_file) + ' not found; build it with CARDlongread_flow_cell_index.py first.')
+    connection = sqlite3.connect(pathlib.Path(index_file).resolve().as_uri() + '?mode=ro', uri=True)
+    # check that file is a flow cell index
+    table_names = [i[0] for i in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    if any(i not in table_names for i in ['platform_qc','delivery_date_batches']):
+        connection.close()
+        quit('ERROR: ' + str(index_file) + ' is not a flow cell index built by CARDlongread_flow_cell_index.py.')
+    return connection
+
+# append platform QC table rows to flow cell index; return number of new rows
+def ingest_platform_qc(index_file, platform_qc_table):
+    connection = open_flow_cell_index(index_file)
+    # convert passed column to integer for storage
+    rows = [(position, flow_cell_id, product_code, int(passed), int(total_pore_count), int(timestamp)) for position, flow_cell_id, product_code, passed, total_pore_count, timestamp in platform_qc_table[platform_qc_columns].dropna(subset=['flow_cell_id','timestamp']).itertuples(index=False)]
+    with connection:
+        changes_before = connection.total_changes
+        connection.executemany('INSERT OR IGNORE INTO platform_qc VALUES (?, ?, ?, ?, ?, ?)', rows)
+        new_rows = connection.total_changes - changes_before
+    connection.close()
+    return new_rows
+
+# append delivery date/batch table rows to flow cell index; return number of new rows
+def ingest_delivery_date_batches(index_file, delivery_date_batch_table):
+    connection = open_flow_cell_index(index_file)
+    # round trip through TSV text so that tables built from ONT spreadsheets are stored exactly as export_flow_cell_delivery_dates.py writes them
+    delivery_date_batch_table = pd.read_csv(StringIO(delivery_date_batch_table[delivery_date_batch_columns].to_csv(index=False,sep="\t")),sep="\t",dtype={'Flow Cell ID':str,'Batch':str})
+    rows = list(delivery_date_batch_table.dropna(subset=['Flow Cell ID']).itertuples(index=False, name=None))
+    with connection:
+        changes_before = connection.total_changes
+        connection.executemany('INSERT OR IGNORE INTO delivery_date_batches VALUES (?, ?, ?, ?, ?, ?)', rows)
+        new_rows = connection.total_changes - changes_before
+    connection.close()
+    return new_rows
+
+# count rows in each flow cell index table
+def get_flow_cell_index_row_counts(index_file):
+    connection = open_flow_cell_index_read_only(index_file)
+    row_counts = {'platform_qc' : connection.execute('SELECT COUNT(*) FROM platform_qc').fetchone()[0],
+    'delivery_date_batches' : connection.execute('SELECT COUNT(*) FROM delivery_date_batches').fetchone()[0]}
+    connection.close()
+    return row_counts
+
+# look up rows of one flow cell index table for a set of flow cell IDs
+def lookup_flow_cell_rows(index_file, table_name, selected_columns, order_by, flow_cell_ids):
+    connection = open_flow_cell_index_read_only(index_file)
+    # load requested flow cell IDs into temporary table and join against indexed flow cell ID column
+    connection.execute('CREATE TEMP TABLE requested_flow_cells (flow_cell_id TEXT PRIMARY KEY)')
+    connection.executemany('INSERT OR IGNORE INTO requested_flow_cells VALUES (?)', [(str(i),) for i in pd.unique(pd.Series(flow_cell_ids).dropna())])
+    flow_cell_rows = pd.read_sql_query('SELECT ' + ', '.join(selected_columns) + ' FROM ' + table_name + ' JOIN requested_flow_cells USING (flow_cell_id) ORDER BY ' + order_by, connection)
+    connection.close()
+    return flow_cell_rows
+
+# get platform QC table in same format as platform QC CSV for a set of flow cell IDs
+def lookup_platform_qc(index_file, flow_cell_ids):
+    platform_qc_table = lookup_flow_cell_rows(index_file, 'platform_qc', platform_qc_columns, 'flow_cell_id, timestamp', flow_cell_ids)
+    # restore boolean passed column
+    platform_qc_table['passed'] = platform_qc_table['passed'].astype(bool)
+    return platform_qc_table
+
+# get delivery date/batch table in same format as export_flow_cell_delivery_dates.py output for a set of flow cell IDs
+def lookup_delivery_date_batches(index_file, flow_cell_ids):
+    delivery_date_batch_table = lookup_flow_cell_rows(index_file, 'delivery_date_batches', ['flow_cell_id','batch','shipped_date','delivery_date','delivery_date_timestamp','delivery_date_timestamp_iso'], 'flow_cell_id, delivery_date_timestamp', flow_cell_ids)
+    # restore original column names
+    delivery_date_batch_table.columns = delivery_date_batch_columns
+    return delivery_date_batch_table
+
+# subroutine to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or update persistent flow cell index of platform QC flow cell checks and delivery dates/batches for the MinKNOW run report dashboard.")
+    # argument for index file
+    parser.add_argument("--index", required=True, help="Flow cell index file in SQLite format; created if it does not exist (required).")
+    # arguments for tables to ingest
+    parser.add_argument("--platform_qc", nargs="*", default=None, help="Platform QC table(s) in CSV format to append to index (optional).")
+    parser.add_argument("--delivery_date_batches", nargs="*", default=None, help="Delivery date/batch table(s) in TSV format from export_flow_cell_delivery_dates.py to append to index (optional).")
+    parser.add_argument("--ont_spreadsheet", nargs="*", default=None, help="ONT ship date/sales info/QC spreadsheet(s) in xlsx format to append to index directly (optional).")
+    # return parsed arguments
+    return parser.parse_args()
+
+# main script subroutine
+def main():
+    # Parse the arguments
+    args = parse_args()
+    # ingest each provided platform QC table
+    if args.platform_qc is not None:
+        for i in args.platform_qc:
+            print(i + ": " + str(ingest_platform_qc(args.index, pd.read_csv(i))) + " new platform QC rows")
+    # ingest each provided delivery date/batch table
+    if args.delivery_date_batches is not None:
+        for i in args.delivery_date_batches:
+            print(i + ": " + str(ingest_delivery_date_batches(args.index, pd.read_csv(i,sep="\t"))) + " new delivery date/batch rows")
+    # ingest each provided ONT spreadsheet
+    if args.ont_spreadsheet is not None:
+        for i in args.ont_spreadsheet:
+            print(i + ": " + str(ingest_delivery_date_batches(args.index, export_flow_cell_delivery_dates.make_delivery_date_batch_table(i))) + " new delivery date/batch rows")
+    # report index contents
+    row_counts = get_flow_cell_index_row_counts(args.index)
+    print(args.index + ": " + str(row_counts['platform_qc']) + " platform QC rows, " + str(row_counts['delivery_date_batches']) + " delivery date/batch rows")
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# native Excel chart output for CARDlongread_extract_summary_statistics.py (-chart_engine native)
+# plot jobs are drawn as interactive xlsxwriter scatter charts on their worksheets rather than rendered as PNG images
+# plotted values are written to a hidden data worksheet that all charts reference
+import numpy as np
+import pandas as pd
+import seaborn as sb
+from matplotlib.colors import to_hex
+
+# run types in same order as seaborn plots
+run_types = ['Standard run','Interrupted','Top up','Reconnection','Recovery']
+# chart size in pixels, close to size of PNG figures
+chart_size = {'width' : 960, 'height' : 720}
+# name of hidden worksheet holding chart data
+chart_data_worksheet_name = 'Chart data'
+
+# run type colors as in seaborn plots
+def get_run_type_colors():
+    return [to_hex(i) for i in [sb.color_palette()[0],'firebrick',sb.color_palette()[1],sb.color_palette()[4],sb.color_palette()[5]]]
+
+# start hidden chart data worksheet
+# chart data is a dictionary of worksheet and next free column
+def start_chart_data(workbook):
+    worksheet=workbook.add_worksheet(chart_data_worksheet_name)
+    worksheet.hide()
+    return {'worksheet' : worksheet, 'column' : 0}
+
+# write one column of chart data with header and return its range for chart series
+# missing values are left as blank cells, which charts show as gaps
+def write_chart_data(chart_data,header,values):
+    column=chart_data['column']
+    values=[None if pd.isna(i) else float(i) for i in values]
+    chart_data['worksheet'].write_column(0,column,[header] + values)
+    chart_data['column']=column + 1
+    return [chart_data_worksheet_name,1,column,max(len(values),1),column]
+
+# add scatter series of points (x, y) to chart
+def add_chart_points(chart,chart_data,name,x_values,y_values,color):
+    chart.add_series({'name' : name,
+    'categories' : write_chart_data(chart_data,name + ' x',x_values),
+    'values' : write_chart_data(chart_data,name + ' y',y_values),
+    'marker' : {'type' : 'circle', 'size' : 5, 'fill' : {'color' : color}, 'border' : {'color' : 'white'}},
+    'line' : {'none' : True}})
+
+# add line series through points (x, y) to chart; None in values breaks line
+def add_chart_line(chart,chart_data,name,x_values,y_values,color,width=1.5):
+    chart.add_series({'name' : name,
+    'categories' : write_chart_data(chart_data,name + ' x',x_values),
+    'values' : write_chart_data(chart_data,name + ' y',y_values),
+    'marker' : {'type' : 'none'},
+    'line' : {'color' : color, 'width' : width}})
+
+# split data into colored series as seaborn hue would
+# returns list of (series name, color, row mask)
+def get_hue_series(data,group_variable,legend_patches,user_palette,run_type_hue):
+    # color by run type
+    if run_type_hue is True:
+        return [(i,j,data['Run type']==i) for i, j in zip(run_types,get_run_type_colors())]
+    # single black series if no group variable
+    if group_variable is None:
+        return [('Runs','#000000',pd.Series(True,index=data.index))]
+    # color by group, with default or user specified palette
+    groups=list(pd.unique(data[group_variable].dropna()))
+    if user_palette is None:
+        group_colors=[to_hex(i) for i in sb.color_palette(n_colors=len(groups))]
+    else:
+        group_colors=[to_hex(user_palette[idx % len(user_palette)]) for idx in range(len(groups))]
+    # one series per legend color and label if custom legend set
+    if legend_patches is not None:
+        hue_series=[]
+        for i in legend_patches:
+            legend_color=to_hex(i.get_facecolor())
+            legend_groups=[j for j, k in zip(groups,group_colors) if k == legend_color]
+            hue_series.append((i.get_label(),legend_color,data[group_variable].isin(legend_groups)))
+        return hue_series
+    return [(i,j,data[group_variable]==i) for i, j in zip(groups,group_colors)]
+
+# convert column to numbers for chart data, with datetimes as Excel serial dates
+def get_chart_values(column):
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return (column - pd.Timestamp('1899-12-30'))/pd.Timedelta(days=1)
+    return pd.to_numeric(column,errors='coerce')
+
+# axis range padded by 5% on each side, including cutoff values
+def get_axis_range(values,cutoffs=None,start_at_zero=False):
+    axis_values=list(values.dropna())
+    if cutoffs is not None:
+        axis_values=axis_values + list(cutoffs)
+    if len(axis_values) == 0:
+        return (0,1)
+    axis_min=min(axis_values)
+    axis_max=max(axis_values)
+    padding=(axis_max - axis_min)*0.05 if axis_max > axis_min else 1
+    if start_at_zero is True and axis_min >= 0:
+        return (0,axis_max + padding)
+    return (axis_min - padding,axis_max + padding)
+
+# add native violinplot/swarmplot equivalent worksheet
+# Excel has no violin or box charts, so points are shown as a jittered strip scatter with a box (quartiles and 1.5 IQR whiskers) drawn per group
+def add_native_violinswarmplot(workbook,chart_data,worksheet_name,data,input_variable,group_variable,legend_patches,user_palette,strip_plot_set,x_axis_title=None,cutoff=None,title=None,top_up=None,max_points=None):
+    chart=workbook.add_chart({'type' : 'scatter', 'subtype' : 'straight'})
+    values=get_chart_values(data[input_variable])
+    # group positions along x axis in order of appearance as in seaborn
+    if group_variable is None:
+        groups=[x_axis_title if x_axis_title is not None else input_variable]
+        positions=pd.Series(0,index=data.index)
+    else:
+        groups=list(pd.unique(data[group_variable].dropna()))
+        positions=data[group_variable].map({j : idx for idx, j in enumerate(groups)})
+    # deterministic jitter for strip points
+    jitter=pd.Series(np.random.default_rng(0).uniform(-0.2,0.2,len(data)),index=data.index)
+    # color points by run type as in seaborn plots when top ups shown and no user palette set
+    run_type_hue=(top_up is not None) and (group_variable is None or user_palette is None)
+    for (name, color, mask) in get_hue_series(data,group_variable,legend_patches,user_palette,run_type_hue):
+        mask=mask & values.notna() & positions.notna()
+        if mask.sum() > 0:
+            add_chart_points(chart,chart_data,str(name),positions[mask] + jitter[mask],values[mask],color)
+    # box per group from all values
+    box_x=[]
+    box_y=[]
+    for idx, i in enumerate(groups):
+        group_values=values[(positions==idx) & values.notna()]
+        if len(group_values) == 0:
+            continue
+        (q1, median, q3)=np.percentile(group_values,[25,50,75])
+        lower_whisker=group_values[group_values >= q1 - 1.5*(q3 - q1)].min()
+        upper_whisker=group_values[group_values <= q3 + 1.5*(q3 - q1)].max()
+        # box outline, median, and whiskers with gaps between line segments
+        box_x=box_x + [idx-0.3,idx+0.3,idx+0.3,idx-0.3,idx-0.3,None,idx-0.3,idx+0.3,None,idx,idx,None,idx,idx,None]
+        box_y=box_y + [q1,q1,q3,q3,q1,None,median,median,None,q3,upper_whisker,None,q1,lower_whisker,None]
+    non_point_series=[]
+    if len(box_x) > 0:
+        add_chart_line(chart,chart_data,'Quartiles',box_x,box_y,'#000000',1)
+        non_point_series.append(len(chart.series) - 1)
+    # red line for 90GB/30X cutoff or whatever necessary for specific plots
+    (y_min, y_max)=get_axis_range(values,[cutoff] if cutoff is not None else None)
+    if cutoff is not None:
+        add_chart_line(chart,chart_data,'Cutoff',[-0.5,len(groups)-0.5],[cutoff,cutoff],'#ff0000')
+        non_point_series.append(len(chart.series) - 1)
+    # group labels shown as data labels along bottom of chart since x axis is numeric
+    chart.add_series({'name' : 'Groups',
+    'categories' : write_chart_data(chart_data,'Group positions',range(len(groups))),
+    'values' : write_chart_data(chart_data,'Group label positions',[y_min]*len(groups)),
+    'marker' : {'type' : 'none'},
+    'line' : {'none' : True},
+    'data_labels' : {'value' : True, 'position' : 'above', 'custom' : [{'value' : str(i)} for i in groups]}})
+    non_point_series.append(len(chart.series) - 1)
+    # axes
+    chart.set_x_axis({'name' : group_variable, 'min' : -0.5, 'max' : len(groups)-0.5, 'major_unit' : 1, 'label_position' : 'none', 'major_gridlines' : {'visible' : False}})
+    chart.set_y_axis({'name' : x_axis_title if x_axis_title is not None else input_variable, 'min' : y_min, 'max' : y_max, 'major_gridlines' : {'visible' : False}})
+    finish_native_chart(workbook,chart,worksheet_name,title,non_point_series)
+
+# add native scatterplot worksheet with cutoff lines
+# point sizes (prop_point_size) are not shown since Excel scatter charts have one marker size per series
+def add_native_scatterplot(workbook,chart_data,worksheet_name,data,group_variable,legend_patches,user_palette,strip_plot_set,title=None,x_cutoffs=None,x_cutoff_colors=None,y_cutoffs=None,y_cutoff_colors=None,show_run_colors=True,show_reg_line=False,x_variable=None,y_variable=None,prop_point_size=False,size_column=None,has_date_time=False):
+    chart=workbook.add_chart({'type' : 'scatter', 'subtype' : 'straight'})
+    x_values=get_chart_values(data[x_variable])
+    y_values=get_chart_values(data[y_variable])
+    # color points by run type if no group variable included, otherwise by group
+    if show_run_colors is True:
+        hue_series=get_hue_series(data,group_variable,legend_patches,user_palette,group_variable is None)
+    else:
+        hue_series=get_hue_series(data,None,None,None,False)
+    for (name, color, mask) in hue_series:
+        mask=mask & x_values.notna() & y_values.notna()
+        if mask.sum() > 0:
+            add_chart_points(chart,chart_data,str(name),x_values[mask],y_values[mask],color)
+    # set minimum y and x to zero as in seaborn plots, except for dates
+    (x_min, x_max)=get_axis_range(x_values,x_cutoffs,has_date_time is False)
+    if has_date_time is True:
+        x_values_present=x_values.dropna()
+        if len(x_values_present) > 0:
+            (x_min, x_max)=(x_values_present.min(),x_values_present.max())
+    (y_min, y_max)=get_axis_range(y_values,y_cutoffs,True)
+    non_point_series=[]
+    # show linear trendline over all points if specified
+    if show_reg_line is True:
+        mask=x_values.notna() & y_values.notna()
+        chart.add_series({'name' : 'All runs',
+        'categories' : write_chart_data(chart_data,'All runs x',x_values[mask]),
+        'values' : write_chart_data(chart_data,'All runs y',y_values[mask]),
+        'marker' : {'type' : 'none'},
+        'line' : {'none' : True},
+        'trendline' : {'type' : 'linear', 'line' : {'color' : to_hex(sb.color_palette()[0]), 'width' : 2}}})
+        non_point_series.append(len(chart.series) - 1)
+    # add vertical x cutoffs and horizontal y cutoffs sequentially
+    if x_cutoffs is not None:
+        for idx, i in enumerate(x_cutoffs):
+            add_chart_line(chart,chart_data,'Cutoff ' + str(i),[i,i],[y_min,y_max],to_hex(x_cutoff_colors[idx]))
+            non_point_series.append(len(chart.series) - 1)
+    if y_cutoffs is not None:
+        for idx, i in enumerate(y_cutoffs):
+            add_chart_line(chart,chart_data,'Cutoff ' + str(i),[x_min,x_max],[i,i],to_hex(y_cutoff_colors[idx]))
+            non_point_series.append(len(chart.series) - 1)
+    # axes, with dates shown as dates
+    x_axis={'name' : x_variable, 'min' : x_min, 'max' : x_max, 'major_gridlines' : {'visible' : False}}
+    if pd.api.types.is_datetime64_any_dtype(data[x_variable]):
+        x_axis['num_format']='yyyy-mm-dd'
+        x_axis['num_font']={'rotation' : -45}
+    chart.set_x_axis(x_axis)
+    chart.set_y_axis({'name' : y_variable, 'min' : y_min, 'max' : y_max, 'major_gridlines' : {'visible' : False}})
+    finish_native_chart(workbook,chart,worksheet_name,title,non_point_series)
+
+# set chart title, size, and legend and insert into new worksheet at A1
+def finish_native_chart(workbook,chart,worksheet_name,title,non_point_series):
+    if title is not None:
+        chart.set_title({'name' : title})
+    else:
+        chart.set_title({'none' : True})
+    # legend shows point series only
+    chart.set_legend({'position' : 'right', 'delete_series' : non_point_series})
+    chart.set_size(chart_size)
+    worksheet=workbook.add_worksheet(worksheet_name)
+    worksheet.insert_chart('A1',chart)
+
+# add one native chart worksheet per plot job in plot job order
+# plot jobs are (worksheet name, plot type, source table name, plot arguments) as for PNG rendering
+def add_native_chart_worksheets(workbook,plot_jobs,tables):
+    chart_data=start_chart_data(workbook)
+    for (worksheet_name,plot_type,table_name,plot_arguments) in plot_jobs:
+        if plot_type == 'violinswarmplot':
+            add_native_violinswarmplot(workbook,chart_data,worksheet_name,tables[table_name],**plot_arguments)
+        elif plot_type == 'scatterplot':
+            add_native_scatterplot(workbook,chart_data,worksheet_name,tables[table_name],**plot_arguments)
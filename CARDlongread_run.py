@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# one process pipeline from long read sequencing report JSONs to summary statistics workbook
+# run tables are extracted as in CARDlongread_extract_from_json.py and handed in memory to CARDlongread_extract_summary_statistics.py,
+# skipping the TSV write, second interpreter startup, and TSV re-read of the two step workflow
+# all arguments other than those below are passed on to CARDlongread_extract_summary_statistics.py (e.g., -output, -names, -platform_qc)
+import argparse
+import CARDlongread_extract_from_json as extract_from_json
+import CARDlongread_extract_summary_statistics as summary_statistics
+
+# subroutine to parse command line arguments, returning (parsed arguments, arguments for summary statistics script)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract long read sequencing report JSONs and make summary statistics workbook in one process. Other arguments are passed to CARDlongread_extract_summary_statistics.py.", allow_abbrev=False)
+    # arguments for JSON reports, one directory or file list per cohort
+    parser.add_argument("--json_dir", nargs="+", default=None, help="Directory (or directories, one per cohort) containing JSON reports.")
+    parser.add_argument("--filelist", nargs="+", default=None, help="Text file(s) listing JSON reports, one per cohort.")
+    parser.add_argument("--cohorts", nargs="+", default=None, help="Cohorts as name=list.txt, where list.txt lists JSON reports of cohort; reports in several lists are parsed once and cohort names are used as -names.")
+    # argument for intermediate run tables
+    parser.add_argument("--output_table", nargs="+", default=None, help="Output file name(s) for extracted run table(s) in tab-delimited format, one per cohort (optional).")
+    # argument for read ahead of JSON reports
+    parser.add_argument("--read_ahead", type=int, default=8, help="Number of JSON reports to read ahead in background threads while current report is parsed; 0 reads serially (optional; default 8).")
+    return parser.parse_known_args()
+
+# main script subroutine
+def main():
+    # Parse the arguments
+    (args, summary_statistics_args) = parse_args()
+    if sum([i is not None for i in [args.json_dir,args.filelist,args.cohorts]]) > 1:
+        quit('ERROR: Provide only one of JSON report directories (--json_dir), file lists (--filelist), or cohorts (--cohorts).')
+    # extract all cohorts in one pass, parsing reports shared between cohorts once
+    if args.cohorts is not None:
+        cohort_run_tables = extract_from_json.extract_cohort_run_tables(extract_from_json.get_cohort_json_report_files(args.cohorts),args.read_ahead)
+        if (args.output_table is not None) and (len(args.output_table) != len(cohort_run_tables)):
+            quit('ERROR: Number of output tables (--output_table) is different from number of cohorts.')
+        input_tables = []
+        for idx, (name, sequencing_report_df) in enumerate(cohort_run_tables.items()):
+            if args.output_table is not None:
+                sequencing_report_df.to_csv(args.output_table[idx],sep='\t',index=False)
+            input_table = extract_from_json.get_typed_run_table(sequencing_report_df)
+            input_table.attrs['name'] = name
+            input_tables.append(input_table)
+        summary_statistics.main(summary_statistics_args + ['-names'] + list(cohort_run_tables),input_tables)
+        return
+    # one JSON report source per cohort
+    if args.json_dir is not None:
+        sources = [('json_dir',i) for i in args.json_dir]
+    elif args.filelist is not None:
+        sources = [('filelist',i) for i in args.filelist]
+    else:
+        quit('ERROR: No directory (--json_dir) or file list (--filelist) provided!')
+    if (args.output_table is not None) and (len(args.output_table) != len(sources)):
+        quit('ERROR: Number of output tables (--output_table) is different from number of JSON report directories or file lists.')
+    # extract run table for each cohort
+    input_tables = []
+    for idx, (source_type, source) in enumerate(sources):
+        files = extract_from_json.get_json_report_files(**{source_type : source})
+        sequencing_report_df = extract_from_json.extract_run_table(files,args.read_ahead)
+        # optionally write intermediate run table as two step workflow would
+        if args.output_table is not None:
+            sequencing_report_df.to_csv(args.output_table[idx],sep='\t',index=False)
+        input_table = extract_from_json.get_typed_run_table(sequencing_report_df)
+        # name run table after its source in messages and stage timings
+        input_table.attrs['name'] = source
+        input_tables.append(input_table)
+    # make summary statistics workbook from in-memory run tables
+    summary_statistics.main(summary_statistics_args,input_tables)
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# persisted, mergeable summary statistics state for run level properties of CARDlongread_extract_summary_statistics.py
+# per group and property, the state keeps count, mean, and sum of squared differences from the mean (merged exactly with the parallel update of Chan et al.),
+# min, max, and an exact value frequency map for median and mode, plus MinKNOW version and sample rate frequency maps,
+# so that statistics of merged states equal those of get_batched_summary_statistics over all their runs
+# state size grows with the number of runs: value frequency maps by one entry per distinct value (at most one per run and property),
+# and the run keys used to skip runs already added by one key per run (about 30 bytes); no values are dropped or binned to bound this
+# runs are identified by flow cell ID and start run timestamp, so adding a table only adds runs not already in the state (O(new rows))
+# states from different cohorts or sites are merged with --merge as long as they do not share runs
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# state file format version
+summary_state_version = 1
+# group name used for runs without a group
+ungrouped_state_name = 'All runs'
+# run level frequency distributions kept per group
+summary_state_distributions = ['MinKNOW Version','Sample Rate (Hz)']
+
+# empty summary statistics state
+def new_summary_state():
+    return {'version' : summary_state_version, 'groups' : {}}
+
+# empty state for one group
+def new_group_state():
+    return {'run_keys' : {'runs' : set(), 'platform_qc' : set()}, 'properties' : {}, 'distributions' : {i : {} for i in summary_state_distributions}}
+
+# empty state for one property
+def new_property_state():
+    return {'count' : 0, 'mean' : 0.0, 'm2' : 0.0, 'min' : None, 'max' : None, 'values' : {}}
+
+# merge property state b into property state a
+def merge_property_states(a,b):
+    if b['count'] == 0:
+        return a
+    if a['count'] == 0:
+        a.update({'count' : b['count'], 'mean' : b['mean'], 'm2' : b['m2'], 'min' : b['min'], 'max' : b['max']})
+    else:
+        # parallel mean/variance update
+        count = a['count'] + b['count']
+        delta = b['mean'] - a['mean']
+        a['mean'] = a['mean'] + delta*b['count']/count
+        a['m2'] = a['m2'] + b['m2'] + delta*delta*a['count']*b['count']/count
+        a['count'] = count
+        a['min'] = min(a['min'],b['min'])
+        a['max'] = max(a['max'],b['max'])
+    # frequencies added in order of first appearance
+    merge_frequencies(a['values'],b['values'])
+    return a
+
+# add frequency map b into frequency map a
+def merge_frequencies(a,b):
+    for value, frequency in b.items():
+        a[value] = a.get(value,0) + frequency
+    return a
+
+# property state for a batch of new values
+def get_property_state(values):
+    values = pd.to_numeric(pd.Series(values)).dropna()
+    property_state = new_property_state()
+    if len(values) == 0:
+        return property_state
+    property_state.update({'count' : len(values), 'mean' : float(values.mean()), 'm2' : float(((values - values.mean())**2).sum()), 'min' : float(values.min()), 'max' : float(values.max())})
+    # value_counts without sorting keeps values in order of first appearance
+    property_state['values'] = {float(value) : int(frequency) for value, frequency in values.value_counts(sort=False).items()}
+    return property_state
+
+# key identifying each run in a table
+def get_run_keys(table):
+    return table['Flow Cell ID'].astype(str) + '_' + table['Start Run Timestamp'].astype(str)
+
+# add runs not already in state from run table ('runs') or run table joined with platform QC ('platform_qc') to state
+# properties are (property name, source table, column) as in summary_statistics_properties; only properties of the given source table are updated
+# returns number of new runs per group
+def update_summary_state(state,table,table_name,properties,group_variable=None):
+    new_runs = {}
+    if group_variable is None:
+        table_per_group = {ungrouped_state_name : table}
+    else:
+        table_per_group = dict(tuple(table.groupby(group_variable, sort=False)))
+    for group_name, group_table in table_per_group.items():
+        group_state = state['groups'].setdefault(str(group_name),new_group_state())
+        # keep only runs not yet added from this source table
+        run_keys = get_run_keys(group_table)
+        new_run_rows = ~run_keys.isin(group_state['run_keys'][table_name]) & ~run_keys.duplicated()
+        group_table = group_table[new_run_rows.values]
+        group_state['run_keys'][table_name].update(run_keys[new_run_rows.values])
+        new_runs[group_name] = len(group_table)
+        for property_name, property_table_name, column in properties:
+            if (property_table_name == table_name) and (column in group_table):
+                merge_property_states(group_state['properties'].setdefault(property_name,new_property_state()),get_property_state(group_table[column]))
+        # update MinKNOW version and sample rate distributions from run table
+        if table_name == 'runs':
+            for i in summary_state_distributions:
+                if i in group_table:
+                    # count as plain values so that categorical columns keep order of first appearance without unused categories
+                    merge_frequencies(group_state['distributions'][i],{(value.item() if hasattr(value,'item') else value) : int(frequency) for value, frequency in group_table[i].astype(object).value_counts(sort=False).items()})
+    return new_runs
+
+# merge summary statistics state b into state a
+# states must not share runs, since shared runs would be counted twice
+def merge_summary_states(a,b):
+    for group_name, b_group_state in b['groups'].items():
+        a_group_state = a['groups'].setdefault(group_name,new_group_state())
+        for table_name in a_group_state['run_keys']:
+            if len(a_group_state['run_keys'][table_name] & b_group_state['run_keys'][table_name]) > 0:
+                quit('ERROR: Summary statistics states to merge share runs in group ' + group_name + '.')
+            a_group_state['run_keys'][table_name].update(b_group_state['run_keys'][table_name])
+        for property_name, b_property_state in b_group_state['properties'].items():
+            merge_property_states(a_group_state['properties'].setdefault(property_name,new_property_state()),b_property_state)
+        for i in summary_state_distributions:
+            merge_frequencies(a_group_state['distributions'][i],b_group_state['distributions'][i])
+    return a
+
+# median of values from frequency map, averaging middle values for even counts
+def get_frequency_median(frequencies):
+    values = np.array(sorted(frequencies))
+    cumulative_frequencies = np.cumsum([frequencies[i] for i in values])
+    count = cumulative_frequencies[-1]
+    lower = values[np.searchsorted(cumulative_frequencies,(count - 1)//2 + 1)]
+    upper = values[np.searchsorted(cumulative_frequencies,count//2 + 1)]
+    return (lower + upper)/2
+
+# summary statistics data frame for one group in same format as get_batched_summary_statistics
+# properties are listed in order of given properties; those never added to the state are left out
+def get_summary_state_statistics(state,group_name,properties):
+    group_state = state['groups'][group_name]
+    summary_statistics_rows = []
+    for property_name, table_name, column in properties:
+        if property_name not in group_state['properties']:
+            continue
+        property_state = group_state['properties'][property_name]
+        if property_state['count'] == 0:
+            summary_statistics_rows.append([property_name,0,np.nan,np.nan,np.nan,np.nan,np.nan,np.nan])
+            continue
+        # mode as most frequent value, taking first value seen in case of ties
+        mode = max(property_state['values'].items(),key=lambda x: x[1])[0]
+        # population standard deviation
+        summary_statistics_rows.append([property_name,property_state['count'],property_state['min'],property_state['max'],
+        round(property_state['mean'],3),round(get_frequency_median(property_state['values']),3),round(mode,3),round(np.sqrt(property_state['m2']/property_state['count']),3)])
+    return pd.DataFrame(summary_statistics_rows,columns=['Property','Total','Min','Max','Mean','Median','Mode','Standard Deviation'])
+
+# frequency distribution for one group in same format as get_value_dist, sorted by value
+def get_summary_state_distribution(state,group_name,column_name):
+    frequencies = state['groups'][group_name]['distributions'][column_name]
+    values = sorted(frequencies)
+    return pd.DataFrame({column_name : values, 'Frequency' : [frequencies[i] for i in values]}, index=values, columns=[column_name, 'Frequency'])
+
+# read summary statistics state from JSON file, or start new state if file does not exist
+def load_summary_state(state_file):
+    if not os.path.exists(state_file):
+        return new_summary_state()
+    with open(state_file) as infile:
+        state_json = json.load(infile)
+    if state_json.get('version') != summary_state_version:
+        quit('ERROR: Unsupported summary statistics state version in ' + state_file + '.')
+    state = new_summary_state()
+    for group_name, group_json in state_json['groups'].items():
+        group_state = new_group_state()
+        group_state['run_keys'] = {i : set(j) for i, j in group_json['run_keys'].items()}
+        for property_name, property_json in group_json['properties'].items():
+            property_state = dict(property_json)
+            # frequency maps are stored as [value, frequency] pairs to keep value types
+            property_state['values'] = {value : frequency for value, frequency in property_json['values']}
+            group_state['properties'][property_name] = property_state
+        group_state['distributions'] = {i : {value : frequency for value, frequency in group_json['distributions'][i]} for i in summary_state_distributions}
+        state['groups'][group_name] = group_state
+    return state
+
+# write summary statistics state to JSON file
+def save_summary_state(state,state_file):
+    state_json = {'version' : summary_state_version, 'groups' : {}}
+    for group_name, group_state in state['groups'].items():
+        state_json['groups'][group_name] = {'run_keys' : {i : sorted(j) for i, j in group_state['run_keys'].items()},
+        'properties' : {property_name : dict(property_state, values=[[value, frequency] for value, frequency in property_state['values'].items()]) for property_name, property_state in group_state['properties'].items()},
+        'distributions' : {i : [[value, frequency] for value, frequency in group_state['distributions'][i].items()] for i in summary_state_distributions}}
+    # write to temporary file first so that interrupted writes never leave partial states
+    with open(state_file + '.tmp','w') as outfile:
+        json.dump(state_json,outfile)
+    os.replace(state_file + '.tmp',state_file)
+
+# subroutine to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Update, merge, and report persisted summary statistics states of run level QC metrics for the MinKNOW run report dashboard.")
+    # argument for state file
+    parser.add_argument("--state", required=True, help="Summary statistics state file in JSON format; created if it does not exist (required).")
+    # arguments for run tables to add
+    parser.add_argument("--add", nargs="*", default=None, help="Run table(s) from CARDlongread_extract_from_json.py in TSV format to add to state; runs already in state are skipped (optional).")
+    parser.add_argument("--add_platform_qc", nargs="*", default=None, help="Run table(s) joined with platform QC from -output_table_with_platform_qc in TSV format to add to state (optional).")
+    parser.add_argument("--group", default=ungrouped_state_name, help="Group name for added runs (optional; default '" + ungrouped_state_name + "').")
+    parser.add_argument("--run_cutoff", default=1, type=float, help="Minimum data output per flow cell run to include from --add tables (optional, 1 Gb default).")
+    # argument for states to merge
+    parser.add_argument("--merge", nargs="*", default=None, help="Summary statistics state file(s) with distinct runs to merge into state (optional).")
+    # argument for report
+    parser.add_argument("--report", default=None, help="Output file name for summary statistics of each group in state in TSV format (optional).")
+    # return parsed arguments
+    return parser.parse_args()
+
+# main script subroutine
+def main():
+    # summary statistics properties shared with dashboard script
+    from CARDlongread_extract_summary_statistics import summary_statistics_properties
+    # Parse the arguments
+    args = parse_args()
+    state = load_summary_state(args.state)
+    # add run tables, filtering out low output runs as dashboard script does
+    if args.add is not None:
+        for i in args.add:
+            run_table = pd.read_csv(i,sep="\t")
+            run_table = run_table[run_table['Data output (Gb)'] > args.run_cutoff]
+            run_table = run_table.assign(Group=args.group)
+            print(i + ": " + str(sum(update_summary_state(state,run_table,'runs',summary_statistics_properties,'Group').values())) + " new runs")
+    # add run tables joined with platform QC
+    if args.add_platform_qc is not None:
+        for i in args.add_platform_qc:
+            platform_qc_table = pd.read_csv(i,sep="\t").assign(Group=args.group)
+            print(i + ": " + str(sum(update_summary_state(state,platform_qc_table,'platform_qc',summary_statistics_properties,'Group').values())) + " new runs with platform QC")
+    # merge other states
+    if args.merge is not None:
+        for i in args.merge:
+            merge_summary_states(state,load_summary_state(i))
+    save_summary_state(state,args.state)
+    # write summary statistics of each group
+    if args.report is not None:
+        pd.concat([get_summary_state_statistics(state,i,summary_statistics_properties).assign(Group=i) for i in state['groups']],ignore_index=True)[['Group','Property','Total','Min','Max','Mean','Median','Mode','Standard Deviation']].to_csv(args.report,index=False,sep="\t")
+    # report state contents
+    for group_name, group_state in state['groups'].items():
+        print(args.state + ": " + group_name + ": " + str(len(group_state['run_keys']['runs'])) + " runs, " + str(len(group_state['run_keys']['platform_qc'])) + " runs with platform QC")
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# script to benchmark how CARDlongread_extract_summary_statistics.py functions scale with run table size
+# synthetic run, platform QC, and delivery date tables are generated from example_output.tsv at each size,
+# each function is timed, and the scaling exponent (slope of log time against log rows) is stored per function
+# so that regressions to quadratic behavior are caught by comparing with a baseline result file
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import sys
+import json
+import time
+import platform
+import CARDlongread_extract_summary_statistics as summary_statistics
+
+# example run table used as template for synthetic runs
+example_run_table = os.path.join(os.path.dirname(os.path.abspath(__file__)),'example_output.tsv')
+# columns varied between synthetic runs
+varied_columns = ['Data output (Gb)','N50 (kb)','Read Count (M)','Starting Active Pores','Average Active Pores','Active Pore AUC']
+
+# subroutine to parse command line arguments
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark scaling of MinKNOW run report dashboard summary statistics functions on synthetic run tables.")
+    # arguments for benchmark sizes and repeats
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000,10000,100000], help="Run table sizes in rows (optional; default 1000 10000 100000).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed repeats per function and size; best time is kept (optional; default 3).")
+    parser.add_argument("--benchmarks", nargs="*", default=None, help="Names of benchmarks to run (optional; default all).")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for synthetic tables (optional; default 1).")
+    # arguments for result and baseline files
+    parser.add_argument("--output", default=None, help="Output file name for benchmark results with times and scaling exponents in JSON format (optional).")
+    parser.add_argument("--baseline", default=None, help="Benchmark results in JSON format to compare against; exits with error on regressions (optional).")
+    # arguments for regression thresholds
+    parser.add_argument("--max_exponent", type=float, default=1.5, help="Maximum scaling exponent before a function is flagged as superlinear (optional; default 1.5).")
+    parser.add_argument("--max_slowdown", type=float, default=2.0, help="Maximum ratio of time to baseline time at largest common size before a function is flagged (optional; default 2.0).")
+    # return parsed arguments
+    return parser.parse_args()
+
+# make synthetic run table with realistic flow cell reuse, top ups, reconnections, and run dates
+def make_synthetic_run_table(rows,rng):
+    template = pd.read_csv(example_run_table,sep='\t')
+    run_table = template.sample(n=rows,replace=True,random_state=rng.integers(2**31)).reset_index(drop=True)
+    for i in varied_columns:
+        run_table[i] = (run_table[i]*rng.normal(1,0.1,rows)).round(3)
+    run_table['Starting Active Pores'] = run_table['Starting Active Pores'].round().astype(int)
+    # about one in ten runs reuses a flow cell, either as top up or reconnection of same sample
+    flow_cells = int(rows*0.9)
+    run_table['Flow Cell ID'] = ['PA' + str(i).zfill(6) for i in rng.integers(0,flow_cells,rows)]
+    samples = ['SAMPLE_' + str(i).zfill(6) for i in rng.integers(0,int(rows*0.7),rows)]
+    run_types = rng.choice(['','_topup','_recovery'],size=rows,p=[0.9,0.07,0.03])
+    run_table['Sample Name'] = [i + j for i, j in zip(samples,run_types)]
+    run_table['Experiment Name'] = run_table['Sample Name']
+    run_table['Start Run Timestamp'] = 1650000000 + rng.integers(0,80000000,rows)
+    run_table['Run Date'] = pd.to_datetime(run_table['Start Run Timestamp'],unit='s').dt.strftime('%Y-%m-%d')
+    return run_table
+
+# make synthetic platform QC table with one or two checks per flow cell before its runs
+def make_synthetic_platform_qc_table(run_table,rng):
+    first_runs = run_table.groupby('Flow Cell ID',sort=False)['Start Run Timestamp'].min()
+    checks = first_runs.sample(frac=1.3,replace=True,random_state=rng.integers(2**31))
+    return pd.DataFrame({'position' : '1A', 'flow_cell_id' : checks.index, 'product_code' : 'FLO-PRO114M', 'passed' : True,
+    'total_pore_count' : rng.integers(5000,9000,len(checks)), 'timestamp' : checks.values - rng.integers(0,1000000,len(checks))})
+
+# make synthetic delivery date/batch table for all flow cells
+def make_synthetic_delivery_date_batches_table(run_table,rng):
+    first_runs = run_table.groupby('Flow Cell ID',sort=False)['Start Run Timestamp'].min()
+    delivery_date_timestamps = first_runs.values - rng.integers(86400,86400*200,len(first_runs))
+    return pd.DataFrame({'Flow Cell ID' : first_runs.index, 'Batch' : ['B' + str(i).zfill(3) for i in rng.integers(0,50,len(first_runs))],
+    'Delivery date timestamp' : delivery_date_timestamps.astype(float)})
+
+# prepare tables used by benchmarks for one size
+def make_benchmark_tables(rows,rng):
+    run_table = make_synthetic_run_table(rows,rng)
+    platform_qc_table = make_synthetic_platform_qc_table(run_table,rng)
+    delivery_date_batches_table = make_synthetic_delivery_date_batches_table(run_table,rng)
+    # classified run table as main script makes it
+    classified_run_table = run_table.copy()
+    classified_run_table.insert(classified_run_table.shape[1],"Run type",summary_statistics.identify_topups(classified_run_table["Sample Name"]),True)
+    classified_run_table = summary_statistics.identify_reconnections(classified_run_table)
+    classified_run_table['Run date'] = summary_statistics.get_local_datetimes(classified_run_table['Start Run Timestamp'])
+    classified_run_table = classified_run_table.reset_index(drop=True)
+    run_table_with_platform_qc = summary_statistics.platform_qc_starting_active_pore_diff(classified_run_table,platform_qc_table.copy())
+    run_table_with_platform_qc['Platform QC active pores'] = run_table_with_platform_qc['total_pore_count']
+    return {'runs' : run_table, 'classified_runs' : classified_run_table, 'platform_qc' : platform_qc_table, 'delivery_date_batches' : delivery_date_batches_table,
+    'runs_with_platform_qc' : run_table_with_platform_qc,
+    'experiments' : summary_statistics.get_flow_cells_and_output_per_experiment(classified_run_table['Experiment Name'],classified_run_table['Flow Cell ID'],classified_run_table['Data output (Gb)']),
+    'flow_cells' : summary_statistics.get_output_per_flow_cell(classified_run_table['Flow Cell ID'],classified_run_table['Data output (Gb)'],classified_run_table['Run type'])}
+
+# benchmarked functions by name, each taking prepared tables
+benchmarks = {
+'get_output_per_flow_cell' : lambda t: summary_statistics.get_output_per_flow_cell(t['classified_runs']['Flow Cell ID'],t['classified_runs']['Data output (Gb)'],t['classified_runs']['Run type']),
+'get_flow_cells_and_output_per_experiment' : lambda t: summary_statistics.get_flow_cells_and_output_per_experiment(t['classified_runs']['Experiment Name'],t['classified_runs']['Flow Cell ID'],t['classified_runs']['Data output (Gb)']),
+'identify_topups' : lambda t: summary_statistics.identify_topups(t['runs']['Sample Name']),
+'identify_reconnections' : lambda t: summary_statistics.identify_reconnections(t['runs'].assign(**{'Run type' : 'Standard run'})),
+'platform_qc_starting_active_pore_diff' : lambda t: summary_statistics.platform_qc_starting_active_pore_diff(t['classified_runs'],t['platform_qc'].copy()),
+'calc_storage_time_from_delivery_date' : lambda t: summary_statistics.calc_storage_time_from_delivery_date(t['classified_runs'],t['delivery_date_batches']),
+'longread_platform_qc_summary_statistics' : lambda t: summary_statistics.longread_platform_qc_summary_statistics(t['classified_runs'],t['runs_with_platform_qc'],t['experiments'],t['flow_cells']),
+'render_violinswarmplot' : lambda t: summary_statistics.render_violinswarmplot(t['classified_runs'],'N50 (kb)',None,None,None,False,'Read N50 (kb)',None,'Read N50',None,1000),
+'render_scatterplot' : lambda t: summary_statistics.render_scatterplot(t['classified_runs'],None,None,None,False,'Run output over time',x_variable='Run date',y_variable='Data output (Gb)',has_date_time=True),
+}
+
+# best wall time of repeated calls
+def time_benchmark(benchmark,tables,repeats):
+    times = []
+    for i in range(repeats):
+        start_time = time.perf_counter()
+        benchmark(tables)
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+# scaling exponent as least squares slope of log time against log rows
+def get_scaling_exponent(sizes,times):
+    if len(sizes) < 2:
+        return None
+    return round(float(np.polyfit(np.log(sizes),np.log(times),1)[0]),3)
+
+# compare results with baseline results, returning list of regression messages
+def compare_with_baseline(results,baseline,max_exponent,max_slowdown):
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        if (result['exponent'] is not None) and (result['exponent'] > max_exponent):
+            regressions.append(name + ': scaling exponent ' + str(result['exponent']) + ' above ' + str(max_exponent))
+        if (baseline is None) or (name not in baseline['benchmarks']):
+            continue
+        # compare times at largest size in both results
+        baseline_times = dict(zip(baseline['sizes'],baseline['benchmarks'][name]['seconds']))
+        common_sizes = [i for i in results['sizes'] if i in baseline_times]
+        if len(common_sizes) > 0:
+            largest_size = max(common_sizes)
+            slowdown = result['seconds'][results['sizes'].index(largest_size)]/baseline_times[largest_size]
+            if slowdown > max_slowdown:
+                regressions.append(name + ': ' + str(round(slowdown,2)) + 'x slower than baseline at ' + str(largest_size) + ' rows')
+    return regressions
+
+# main script subroutine
+def main():
+    # Parse the arguments
+    args = parse_args()
+    selected_benchmarks = benchmarks if args.benchmarks is None else {i : benchmarks[i] for i in args.benchmarks if i in benchmarks}
+    if (args.benchmarks is not None) and (len(selected_benchmarks) != len(args.benchmarks)):
+        quit('ERROR: Unknown benchmark name(s). Available benchmarks: ' + ', '.join(benchmarks) + '.')
+    sizes = sorted(args.sizes)
+    rng = np.random.default_rng(args.seed)
+    results = {'sizes' : sizes, 'python' : platform.python_version(), 'pandas' : pd.__version__, 'numpy' : np.__version__, 'benchmarks' : {i : {'seconds' : []} for i in selected_benchmarks}}
+    for rows in sizes:
+        tables = make_benchmark_tables(rows,rng)
+        for name, benchmark in selected_benchmarks.items():
+            seconds = time_benchmark(benchmark,tables,args.repeats)
+            results['benchmarks'][name]['seconds'].append(round(seconds,6))
+            print(str(rows) + "\t" + name + "\t" + str(round(seconds,4)) + " s", file=sys.stderr)
+    # scaling exponent per function
+    for name, result in results['benchmarks'].items():
+        result['exponent'] = get_scaling_exponent(sizes,result['seconds'])
+    # show scaling table with one row per function
+    scaling_table = pd.DataFrame({name : result['seconds'] + [result['exponent']] for name, result in results['benchmarks'].items()}, index=[str(i) + ' rows (s)' for i in sizes] + ['Scaling exponent']).T
+    print(scaling_table.to_string())
+    # write results for later comparison
+    if args.output is not None:
+        with open(args.output,'w') as outfile:
+            json.dump(results,outfile,indent=1)
+    # compare with baseline and thresholds
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+    regressions = compare_with_baseline(results,baseline,args.max_exponent,args.max_slowdown)
+    if len(regressions) > 0:
+        quit('ERROR: Scaling regressions found:\n' + '\n'.join(regressions))
+
+# run main subroutine
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,27 @@
 import pandas as pd
 import numpy as np
 import argparse
-from datetime import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+# xlsx spreadsheets are zip archives of XML worksheets, streamed row by row
+import zipfile
+import xml.etree.ElementTree as ET
+# for round trip of new rows through TSV text
+from io import StringIO
+# local time zone for delivery date timestamps
+from dateutil import tz
+
+# columns kept from each sheet of ONT spreadsheet (TPL Batch is used as Batch where present)
+ont_spreadsheet_columns = ['Flowcell ID','Batch','Shipped date']
+# sheets of ONT spreadsheet without shipped flow cells
+ont_spreadsheet_skipped_sheets = ['FC Utilization Calc']
+# key columns of delivery date/batch table rows
+delivery_table_key_columns = ['Flow Cell ID','Batch','Shipped date']
+# key columns of shipments, whose shipped date is taken from the latest spreadsheet if it conflicts with the existing table
+delivery_table_shipment_columns = ['Flow Cell ID','Batch']
+# XML namespaces of xlsx workbook parts
+spreadsheet_namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+relationship_namespace = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
 
 # subroutine to parse command line arguments
 def parse_args():
@@ -10,32 +30,158 @@ def parse_args():
     # argument for input ONT ship date/QC spreadsheet
     parser.add_argument("--input_ont_spreadsheet", required=True, help="Input ONT ship date/sales info/QC spreadsheet in xlsx format (required).")
     # argument for output table
-    parser.add_argument("--output_delivery_table", required=True, help="Output file name for delivery date table in TSV format with batch info and timestamps included for dashboard import.")
+    parser.add_argument("--output_delivery_table", default=None, help="Output file name for delivery date table in TSV format with batch info and timestamps included for dashboard import (required unless --update used).")
+    # argument for existing table to update
+    parser.add_argument("--update", default=None, help="Existing delivery date table in TSV format to merge new shipments into; only rows with new flow cell ID, batch, and shipped date are appended, rows whose flow cell ID and batch are in the spreadsheet with another shipped date are replaced by the spreadsheet rows, and the table is replaced in place unless --output_delivery_table given (optional).")
+    # argument for number of processes reading sheets
+    parser.add_argument("--processes", type=int, default=1, help="Number of processes used to read spreadsheet sheets in parallel, at most one per sheet (optional; default 1).")
     # return parsed arguments
     return parser.parse_args()
 
-# main script subroutine
-def main():
-    # Parse the arguments
-    args = parse_args()
-    # import ONT spreadsheet
-    input_ONT_spreadsheet=pd.ExcelFile(args.input_ont_spreadsheet)
-    # get sheet names
-    sheets_of_interest = input_ONT_spreadsheet.sheet_names
-    # drop FC Utilization Calc
-    sheets_of_interest.remove('FC Utilization Calc')
-    # get data frames to pull and stitch together
-    input_ONT_spreadsheet_dfs={sheet_name: input_ONT_spreadsheet.parse(sheet_name) for sheet_name in sheets_of_interest}
-    # initialize delivery date/batch data frame
-    delivery_date_batch_df=pd.DataFrame()
-    # fill it in with Flowcell ID, Batch (aka TPL Batch), and Shipped date columns from each sheet of interest
-    for sheet_name in sheets_of_interest:
-        # rename TPL Batch to Batch if necessary
-        if 'TPL Batch' in input_ONT_spreadsheet_dfs[sheet_name].columns:
-            input_ONT_spreadsheet_dfs[sheet_name]['Batch'] = input_ONT_spreadsheet_dfs[sheet_name]['TPL Batch']
-        # get fields of interest from current sheet to incorporate into delivery date/batch data frame
-        current_sheet_fields_of_interest=input_ONT_spreadsheet_dfs[sheet_name][['Flowcell ID','Batch','Shipped date']].dropna()
-        delivery_date_batch_df=pd.concat([delivery_date_batch_df, current_sheet_fields_of_interest], ignore_index=True)
+# get worksheet XML paths by sheet name and whether dates count from 1904 from xlsx archive
+def get_xlsx_sheet_paths(xlsx_archive):
+    workbook=ET.fromstring(xlsx_archive.read('xl/workbook.xml'))
+    workbook_relationships=ET.fromstring(xlsx_archive.read('xl/_rels/workbook.xml.rels'))
+    relationship_targets={i.get('Id') : i.get('Target') for i in workbook_relationships}
+    sheet_paths={}
+    for sheet in workbook.iter(spreadsheet_namespace + 'sheet'):
+        sheet_target=relationship_targets[sheet.get(relationship_namespace + 'id')]
+        # targets are relative to xl folder unless absolute
+        sheet_paths[sheet.get('name')]=sheet_target.lstrip('/') if sheet_target.startswith('/') else 'xl/' + sheet_target
+    workbook_properties=workbook.find(spreadsheet_namespace + 'workbookPr')
+    date1904=(workbook_properties is not None) and (workbook_properties.get('date1904') in ['1','true'])
+    return (sheet_paths,date1904)
+
+# get text of shared or inline string element, from plain text or rich text runs (phonetic guides left out)
+def get_xlsx_string(string_element):
+    plain_text=string_element.find(spreadsheet_namespace + 't')
+    if plain_text is not None:
+        return plain_text.text or ''
+    return ''.join((i.findtext(spreadsheet_namespace + 't') or '') for i in string_element.findall(spreadsheet_namespace + 'r'))
+
+# get shared strings of xlsx archive
+def read_xlsx_shared_strings(xlsx_archive):
+    shared_strings=[]
+    if 'xl/sharedStrings.xml' not in xlsx_archive.namelist():
+        return shared_strings
+    with xlsx_archive.open('xl/sharedStrings.xml') as infile:
+        for event, element in ET.iterparse(infile):
+            if element.tag == spreadsheet_namespace + 'si':
+                shared_strings.append(get_xlsx_string(element))
+                element.clear()
+    return shared_strings
+
+# get value of worksheet cell element as string, number, or boolean (None if empty or error); dates stored as ISO 8601 text are returned as strings
+def get_xlsx_cell_value(cell,shared_strings):
+    cell_type=cell.get('t','n')
+    if cell_type == 'inlineStr':
+        inline_string=cell.find(spreadsheet_namespace + 'is')
+        return get_xlsx_string(inline_string) if inline_string is not None else None
+    cell_value=cell.findtext(spreadsheet_namespace + 'v')
+    if (cell_value is None) or (cell_type == 'e'):
+        return None
+    if cell_type == 's':
+        return shared_strings[int(cell_value)]
+    # formula strings and ISO 8601 dates (parsed with other text dates)
+    if cell_type in ['str','d']:
+        return cell_value
+    if cell_type == 'b':
+        return cell_value == '1'
+    # numbers (including dates as serial days) as int where integral
+    return int(cell_value) if cell_value.lstrip('-').isdigit() else float(cell_value)
+
+# shared strings of spreadsheet in each sheet reading process
+sheet_shared_strings=None
+
+# initialize sheet reading process with shared strings so that they are parsed once and sent once per process rather than parsed for every sheet
+def init_sheet_worker(shared_strings):
+    global sheet_shared_strings
+    sheet_shared_strings=shared_strings
+
+# column index (from 0) of cell reference such as 'AB12'
+def get_xlsx_column_index(cell_reference):
+    column_index=0
+    for i in cell_reference.rstrip('0123456789'):
+        column_index=column_index*26 + ord(i) - ord('A') + 1
+    return column_index - 1
+
+# read Flowcell ID, Batch (or TPL Batch), and Shipped date columns of one sheet of ONT spreadsheet
+# worksheet XML is streamed row by row and only cells of needed columns are converted, so wide sheets are never loaded in full
+# shared strings are read with read_xlsx_shared_strings once per spreadsheet, and taken from init_sheet_worker in sheet reading processes if not given
+# returns (sheet table, rows with shipped dates that could not be parsed), with unparsed rows left out of sheet table
+def read_ont_spreadsheet_sheet(input_ont_spreadsheet,sheet_name,shared_strings=None):
+    if shared_strings is None:
+        shared_strings=sheet_shared_strings
+    with zipfile.ZipFile(input_ont_spreadsheet) as xlsx_archive:
+        (sheet_paths,date1904)=get_xlsx_sheet_paths(xlsx_archive)
+        column_indexes=None
+        sheet_rows=[]
+        with xlsx_archive.open(sheet_paths[sheet_name]) as infile:
+            for event, element in ET.iterparse(infile):
+                if element.tag != spreadsheet_namespace + 'row':
+                    continue
+                # cells may leave out references, in which case they follow on from previous cell
+                row_values={}
+                column_index=-1
+                for cell in element.iter(spreadsheet_namespace + 'c'):
+                    column_index=get_xlsx_column_index(cell.get('r')) if cell.get('r') is not None else column_index + 1
+                    # cells are in column order, so rest of row can be skipped after last needed column
+                    if (column_indexes is not None) and (column_index > max_column_index):
+                        break
+                    if (column_indexes is None) or (column_index in column_indexes):
+                        row_values[column_index]=get_xlsx_cell_value(cell,shared_strings)
+                element.clear()
+                # first row is header
+                if column_indexes is None:
+                    # first column of each name is used if names repeat
+                    header={}
+                    for i, j in row_values.items():
+                        if j is not None:
+                            header.setdefault(str(j),i)
+                    # rename TPL Batch to Batch if necessary
+                    if 'TPL Batch' in header:
+                        header['Batch']=header['TPL Batch']
+                    if any(i not in header for i in ont_spreadsheet_columns):
+                        quit('ERROR: Sheet ' + sheet_name + ' of ' + input_ont_spreadsheet + ' lacks one of columns ' + ', '.join(ont_spreadsheet_columns) + '.')
+                    column_indexes=[header[i] for i in ont_spreadsheet_columns]
+                    max_column_index=max(column_indexes)
+                    continue
+                sheet_rows.append([row_values.get(i) for i in column_indexes])
+    sheet_df=pd.DataFrame(sheet_rows,columns=ont_spreadsheet_columns)
+    # convert shipped dates stored as serial days in one vectorized step, parsing any text dates
+    shipped_serial_days=pd.to_numeric(sheet_df['Shipped date'],errors='coerce')
+    shipped_dates=pd.to_datetime(shipped_serial_days,unit='D',origin='1904-01-01' if date1904 else '1899-12-30').dt.round('us')
+    text_shipped_dates=shipped_serial_days.isna() & sheet_df['Shipped date'].notna()
+    if text_shipped_dates.any():
+        # copy so that parsed text dates are set on a series of its own rather than a datetime accessor result
+        shipped_dates=shipped_dates.copy()
+        shipped_dates[text_shipped_dates]=pd.to_datetime(sheet_df.loc[text_shipped_dates,'Shipped date'].astype(str),errors='coerce')
+    # keep rows with shipped dates that could not be parsed for reporting, since they are left out of the delivery date table
+    unparsed_shipped_dates=shipped_dates.isna() & sheet_df['Shipped date'].notna()
+    unparsed_df=sheet_df[unparsed_shipped_dates]
+    sheet_df['Shipped date']=shipped_dates
+    return (sheet_df,unparsed_df)
+
+# subroutine to make delivery date/batch table from ONT spreadsheet
+# also used by CARDlongread_flow_cell_index.py to ingest spreadsheets directly
+def make_delivery_date_batch_table(input_ont_spreadsheet,processes=1):
+    # get sheet names without loading sheets, and shared strings of all sheets once
+    with zipfile.ZipFile(input_ont_spreadsheet) as xlsx_archive:
+        sheets_of_interest=[i for i in get_xlsx_sheet_paths(xlsx_archive)[0] if i not in ont_spreadsheet_skipped_sheets]
+        shared_strings=read_xlsx_shared_strings(xlsx_archive)
+    # read Flowcell ID, Batch (aka TPL Batch), and Shipped date columns from each sheet of interest, in parallel if requested
+    if (processes is None) or (processes <= 1) or (len(sheets_of_interest) <= 1):
+        sheet_tables=[read_ont_spreadsheet_sheet(input_ont_spreadsheet,i,shared_strings) for i in sheets_of_interest]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes,len(sheets_of_interest)),initializer=init_sheet_worker,initargs=(shared_strings,)) as executor:
+            sheet_tables=list(executor.map(read_ont_spreadsheet_sheet,[input_ont_spreadsheet]*len(sheets_of_interest),sheets_of_interest))
+    # report shipped dates that could not be parsed from this process, in sheet order
+    for sheet_name, (sheet_df, unparsed_df) in zip(sheets_of_interest,sheet_tables):
+        if len(unparsed_df) > 0:
+            print('Warning: ' + str(len(unparsed_df)) + ' rows of sheet ' + sheet_name + ' of ' + input_ont_spreadsheet + ' have shipped dates that could not be parsed and are left out (e.g., flow cell ' + str(unparsed_df['Flowcell ID'].iloc[0]) + ' shipped ' + str(unparsed_df['Shipped date'].iloc[0]) + ').')
+    sheet_dfs=[i[0] for i in sheet_tables]
+    # stitch sheets together once, keeping rows with all fields of interest
+    delivery_date_batch_df=pd.concat(sheet_dfs,ignore_index=True).dropna()
     # rename Flowcell ID column to Flow Cell ID
     delivery_date_batch_df = delivery_date_batch_df.rename(columns={'Flowcell ID':'Flow Cell ID'})
     # get unique rows
@@ -43,13 +189,56 @@ def main():
     # calculate delivery date by adding one to shipped date
     delivery_date_batch_df['Delivery date']=delivery_date_batch_df['Shipped date']+pd.Timedelta(days=1)
     # make delivery date timestamps for dashboard calculation
-    # Unix/Linux epoch time
-    delivery_date_batch_df['Delivery date timestamp']=[datetime.timestamp(x) for x in delivery_date_batch_df['Delivery date']]
-    # ISO 8601 time
-    delivery_date_batch_df['Delivery date timestamp (ISO)']=[datetime.isoformat(x) for x in delivery_date_batch_df['Delivery date']]
+    # Unix/Linux epoch time of delivery date in local time zone, as datetime.timestamp gives
+    local_delivery_date=delivery_date_batch_df['Delivery date'].dt.tz_localize(tz.tzlocal(),ambiguous=True,nonexistent='shift_forward')
+    delivery_date_batch_df['Delivery date timestamp']=(local_delivery_date-pd.Timestamp(0,tz='UTC'))/pd.Timedelta(seconds=1)
+    # ISO 8601 time, with microseconds only where present as datetime.isoformat gives
+    delivery_date_batch_df['Delivery date timestamp (ISO)']=np.where(delivery_date_batch_df['Delivery date'].dt.microsecond > 0,
+    delivery_date_batch_df['Delivery date'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f'),delivery_date_batch_df['Delivery date'].dt.strftime('%Y-%m-%dT%H:%M:%S'))
+    # return delivery date/batch table
+    return delivery_date_batch_df
+
+# keys of delivery date/batch table rows from key columns, with shipped dates parsed so that differently formatted but equal dates match
+def get_delivery_table_keys(delivery_df,key_columns):
+    return pd.MultiIndex.from_arrays([pd.to_datetime(delivery_df[i]) if i == 'Shipped date' else delivery_df[i] for i in key_columns])
+
+# merge new delivery date/batch rows into existing delivery date/batch table in TSV format
+# rows are keyed by flow cell ID, batch, and shipped date; existing rows are kept as written and rows with new keys are appended
+# flow cells shipped more than once (in different batches) keep a row per shipment, as in a full export
+# conflicting ship dates are resolved in favor of the new spreadsheet: existing rows of a flow cell ID and batch listed in it with other shipped dates are replaced by its rows
+# returns (merged table, number of appended rows, number of replaced rows)
+def update_delivery_date_batch_table(existing_delivery_table,delivery_date_batch_df):
+    # compare and keep rows as TSV text so existing rows are written back unchanged
+    existing_df=pd.read_csv(existing_delivery_table,sep="\t",dtype=str,keep_default_na=False)
+    new_df=pd.read_csv(StringIO(delivery_date_batch_df.to_csv(index=False,sep="\t")),sep="\t",dtype=str,keep_default_na=False)
+    existing_keys=get_delivery_table_keys(existing_df,delivery_table_key_columns)
+    new_keys=get_delivery_table_keys(new_df,delivery_table_key_columns)
+    # existing shipments with shipped dates corrected in new spreadsheet
+    replaced_rows=get_delivery_table_keys(existing_df,delivery_table_shipment_columns).isin(get_delivery_table_keys(new_df,delivery_table_shipment_columns)) & ~existing_keys.isin(new_keys)
+    # new rows are compared against existing keys, so re-merging the same spreadsheet changes nothing
+    new_rows=~new_keys.isin(existing_keys) & ~new_keys.duplicated()
+    merged_df=pd.concat([existing_df[~replaced_rows],new_df[new_rows]],ignore_index=True)
+    return (merged_df,int(new_rows.sum()),int(replaced_rows.sum()))
+
+# main script subroutine
+def main():
+    # Parse the arguments
+    args = parse_args()
+    if (args.output_delivery_table is None) and (args.update is None):
+        quit('ERROR: No output delivery table (--output_delivery_table) or existing table to update (--update) provided.')
+    # make delivery date/batch table from ONT spreadsheet
+    delivery_date_batch_df = make_delivery_date_batch_table(args.input_ont_spreadsheet,args.processes)
+    # merge into existing table if updating
+    if args.update is not None:
+        (delivery_date_batch_df,appended_rows,replaced_rows)=update_delivery_date_batch_table(args.update,delivery_date_batch_df)
+        print(args.update + ": " + str(appended_rows) + " new delivery date/batch rows, " + str(replaced_rows) + " rows replaced by corrected shipped dates")
+        if args.output_delivery_table is None:
+            args.output_delivery_table = args.update
     # output final table as TSV
-    delivery_date_batch_df.to_csv(args.output_delivery_table,index=False,sep="\t")
-    
+    # write to temporary file first so that interrupted writes never leave partial tables
+    delivery_date_batch_df.to_csv(args.output_delivery_table + '.tmp',index=False,sep="\t")
+    os.replace(args.output_delivery_table + '.tmp',args.output_delivery_table)
+
 # run main subroutine
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,5 @@
+# scripts are top-level modules of the repository, imported by tests from the repository root
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
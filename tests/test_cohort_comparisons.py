@@ -0,0 +1,52 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+import CARDlongread_cohort_comparisons as cohort_comparisons
+
+# known values below are from scipy.stats (kruskal, mannwhitneyu with method='asymptotic', chi2.sf) and R p.adjust(method='BH')
+
+def test_kruskal_wallis_tests_of_known_values():
+    # groups [1,3,5,7,9] and [2,4,6,8,10] without ties
+    values=np.array([[1],[3],[5],[7],[9],[2],[4],[6],[8],[10]],dtype=float)
+    (statistics,p_values,permutation_p_values)=cohort_comparisons.get_kruskal_wallis_tests(values,np.array([0]*5 + [1]*5),2,0,np.random.default_rng(1))
+    assert statistics[0] == pytest.approx(0.2727272727272734)
+    assert p_values[0] == pytest.approx(0.6015081344405895)
+    assert np.isnan(permutation_p_values[0])
+    # groups [1,1,1], [2,2,2], and [2,2] with ties (H = 5 before tie correction)
+    values=np.array([[1],[1],[1],[2],[2],[2],[2],[2]],dtype=float)
+    (statistics,p_values,permutation_p_values)=cohort_comparisons.get_kruskal_wallis_tests(values,np.array([0,0,0,1,1,1,2,2]),3,0,np.random.default_rng(1))
+    assert statistics[0] == pytest.approx(7.0)
+    assert p_values[0] == pytest.approx(0.0301973834223185)
+
+def test_mann_whitney_tests_of_known_values():
+    values=np.array([[19],[22],[16],[29],[24],[20],[11],[17],[12]],dtype=float)
+    labels=np.array([0,0,0,0,0,1,1,1,1])
+    (statistics,p_values,permutation_p_values)=cohort_comparisons.get_mann_whitney_tests(values,labels,20000,np.random.default_rng(1))
+    assert statistics[0] == 17
+    assert p_values[0] == pytest.approx(0.11134688653314041)
+    # exact two-sided p-value is 14/126
+    assert permutation_p_values[0] == pytest.approx(14/126,abs=0.01)
+
+def test_chi_square_p_values_of_known_values():
+    assert cohort_comparisons.get_chi_square_p_value(1,1) == pytest.approx(0.31731050786291415)
+    assert cohort_comparisons.get_chi_square_p_value(10,4) == pytest.approx(0.04042768199451279)
+    assert cohort_comparisons.get_chi_square_p_value(0.5,6) == pytest.approx(0.9978385693299687)
+    assert cohort_comparisons.get_chi_square_p_value(0,2) == 1.0
+
+def test_benjamini_hochberg_p_values_of_known_values():
+    adjusted_p_values=cohort_comparisons.get_benjamini_hochberg_p_values([0.01,0.04,0.03,0.005,np.nan])
+    assert adjusted_p_values[:4] == pytest.approx([0.02,0.04,0.04,0.02])
+    assert np.isnan(adjusted_p_values[4])
+    # running minimum from largest p-value down, capped at 1
+    assert cohort_comparisons.get_benjamini_hochberg_p_values([0.9,0.8]) == pytest.approx([0.9,0.9])
+    assert cohort_comparisons.get_benjamini_hochberg_p_values([0.6,0.9,0.7]) == pytest.approx([0.9,0.9,0.9])
+    assert cohort_comparisons.get_benjamini_hochberg_p_values([0.5,0.02,0.02,0.8]) == pytest.approx([2/3,0.04,0.04,0.8])
+
+def test_cohort_comparisons_of_known_values():
+    run_table=pd.DataFrame({'Group' : ['M']*5 + ['F']*4, 'N50 (kb)' : [19,22,16,29,24,20,11,17,12]})
+    cohort_comparisons_df=cohort_comparisons.get_cohort_comparisons({'runs' : run_table},[('Read N50 (kb)','runs','N50 (kb)')],'Group',['M','F'],permutations=0)
+    assert cohort_comparisons_df['Test'].tolist() == ['Kruskal-Wallis','Mann-Whitney U']
+    assert cohort_comparisons_df['Comparison'].tolist() == ['All groups','M vs. F']
+    assert cohort_comparisons_df['Statistic'].tolist() == [2.94,17]
+    assert cohort_comparisons_df['p-value'][1] == pytest.approx(0.11134688653314041)
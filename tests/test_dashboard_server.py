@@ -0,0 +1,42 @@
+import os
+import pytest
+import CARDlongread_dashboard_server as dashboard_server
+
+# example tables are in repository root
+repo_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def dashboard_with_startup_filters():
+    dashboard_server.dashboard.clear()
+    dashboard_server.load_dashboard(['-input',os.path.join(repo_dir,'group_comparison/cohort_1_output.tsv'),os.path.join(repo_dir,'group_comparison/cohort_2_output.tsv'),'-names','C1','C2','-date_from','2024-01-01','-processes','1'],8,8)
+    yield dashboard_server.dashboard
+    dashboard_server.dashboard.clear()
+
+def get_run_dates(query):
+    (results,tables,grouped)=dashboard_server.get_query_tables(dashboard_server.get_query_filters(query))
+    return tables['runs']['Run Date'].astype(str)
+
+def test_query_filters_narrow_startup_filters(dashboard_with_startup_filters):
+    # no query filters and an earlier date_from keep the startup date filter
+    assert len(get_run_dates({})) > 0
+    assert (get_run_dates({}) >= '2024-01-01').all()
+    assert (get_run_dates({'date_from' : ['2022-01-01']}) >= '2024-01-01').all()
+    # where filter of query applies on top of startup filters
+    assert len(get_run_dates({'where' : ['`N50 (kb)` > 30']})) < len(get_run_dates({}))
+
+def test_bad_queries_raise_value_error(dashboard_with_startup_filters):
+    with pytest.raises(ValueError,match='YYYY-MM-DD'):
+        dashboard_server.get_query_filters({'date_to' : ['bad']})
+    with pytest.raises(ValueError,match='Unknown group'):
+        dashboard_server.get_query_filters({'group' : ['C3']})
+    with pytest.raises(ValueError,match='No runs left'):
+        dashboard_server.get_query_tables(dashboard_server.get_query_filters({'date_from' : ['2030-01-01']}))
+
+@pytest.mark.parametrize('where',["`N50 (kb)` > 20 and `Sequencer ID` == 'PC48B098'","`Flow Cell ID` in ['PA00160','PA00161'] | ~(`N50 (kb)` < -1)"])
+def test_where_filter_of_column_comparisons(dashboard_with_startup_filters,where):
+    dashboard_server.check_where_filter(where)
+
+@pytest.mark.parametrize('where',["__import__('os').system('true')","`N50 (kb)`.abs() > 2","@dashboard","`N50 (kb)` * 2 > 40","`No such column` > 1"])
+def test_where_filter_rejects_other_expressions(dashboard_with_startup_filters,where):
+    with pytest.raises(ValueError):
+        dashboard_server.check_where_filter(where)
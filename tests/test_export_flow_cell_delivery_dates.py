@@ -0,0 +1,91 @@
+import zipfile
+import pandas as pd
+import export_flow_cell_delivery_dates
+
+# write minimal xlsx with one sheet per name; cells are (type, value) with type 'n' (number), 'd' (ISO date), 's' (shared string index), or 'inlineStr'
+def write_xlsx(xlsx_file,sheets,shared_strings=None):
+    spreadsheet_namespace='http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    relationship_namespace='http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    with zipfile.ZipFile(xlsx_file,'w') as xlsx_archive:
+        workbook_sheets=''.join('<sheet name="' + j + '" sheetId="' + str(i + 1) + '" r:id="rId' + str(i + 1) + '"/>' for i, j in enumerate(sheets))
+        xlsx_archive.writestr('xl/workbook.xml','<workbook xmlns="' + spreadsheet_namespace + '" xmlns:r="' + relationship_namespace + '"><sheets>' + workbook_sheets + '</sheets></workbook>')
+        workbook_relationships=''.join('<Relationship Id="rId' + str(i + 1) + '" Type="' + relationship_namespace + '/worksheet" Target="worksheets/sheet' + str(i + 1) + '.xml"/>' for i in range(len(sheets)))
+        if shared_strings is not None:
+            xlsx_archive.writestr('xl/sharedStrings.xml','<sst xmlns="' + spreadsheet_namespace + '">' + ''.join('<si><t>' + i + '</t></si>' for i in shared_strings) + '</sst>')
+        xlsx_archive.writestr('xl/_rels/workbook.xml.rels','<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' + workbook_relationships + '</Relationships>')
+        for idx, rows in enumerate(sheets.values()):
+            sheet_rows=''
+            for row in rows:
+                cells=''
+                for cell_type, cell_value in row:
+                    if cell_type == 'inlineStr':
+                        cells=cells + '<c t="inlineStr"><is><t>' + cell_value + '</t></is></c>'
+                    else:
+                        cells=cells + '<c t="' + cell_type + '"><v>' + str(cell_value) + '</v></c>'
+                sheet_rows=sheet_rows + '<row>' + cells + '</row>'
+            xlsx_archive.writestr('xl/worksheets/sheet' + str(idx + 1) + '.xml','<worksheet xmlns="' + spreadsheet_namespace + '"><sheetData>' + sheet_rows + '</sheetData></worksheet>')
+
+def get_header():
+    return [('inlineStr','Flowcell ID'),('inlineStr','Batch'),('inlineStr','Shipped date')]
+
+# ONT spreadsheet with a flow cell shipped twice (serial day dates)
+def write_shipments(xlsx_file):
+    write_xlsx(xlsx_file,{'Shipments' : [get_header(),
+    [('inlineStr','PA00160'),('inlineStr','B6'),('n',45087)],
+    [('inlineStr','PA00160'),('inlineStr','B7'),('n',45200)],
+    [('inlineStr','PA00161'),('inlineStr','B6'),('n',45087)]]})
+
+def test_update_with_same_spreadsheet_keeps_table(tmp_path):
+    write_shipments(tmp_path / 'shipments.xlsx')
+    delivery_date_batch_df=export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx'))
+    delivery_date_batch_df.to_csv(tmp_path / 'delivery.tsv',index=False,sep="\t")
+    (merged_df,appended_rows,replaced_rows)=export_flow_cell_delivery_dates.update_delivery_date_batch_table(tmp_path / 'delivery.tsv',delivery_date_batch_df)
+    merged_df.to_csv(tmp_path / 'merged.tsv',index=False,sep="\t")
+    assert (appended_rows,replaced_rows) == (0,0)
+    assert (tmp_path / 'merged.tsv').read_text() == (tmp_path / 'delivery.tsv').read_text()
+    # both shipments of PA00160 are kept, as in full export
+    assert list(merged_df['Batch'][merged_df['Flow Cell ID'] == 'PA00160']) == ['B6','B7']
+
+def test_update_appends_only_new_shipments(tmp_path):
+    write_shipments(tmp_path / 'shipments.xlsx')
+    delivery_date_batch_df=export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx'))
+    delivery_date_batch_df.iloc[:2].to_csv(tmp_path / 'delivery.tsv',index=False,sep="\t")
+    (merged_df,appended_rows,replaced_rows)=export_flow_cell_delivery_dates.update_delivery_date_batch_table(tmp_path / 'delivery.tsv',delivery_date_batch_df)
+    assert (appended_rows,replaced_rows) == (1,0)
+    assert list(merged_df['Flow Cell ID']) == ['PA00160','PA00160','PA00161']
+
+def test_update_takes_corrected_shipped_date_from_spreadsheet(tmp_path):
+    write_shipments(tmp_path / 'shipments.xlsx')
+    export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx')).to_csv(tmp_path / 'delivery.tsv',index=False,sep="\t")
+    # later spreadsheet corrects shipped date of first shipment of PA00160 and leaves out other shipments
+    write_xlsx(tmp_path / 'corrected.xlsx',{'Shipments' : [get_header(),[('inlineStr','PA00160'),('inlineStr','B6'),('n',45090)]]})
+    (merged_df,appended_rows,replaced_rows)=export_flow_cell_delivery_dates.update_delivery_date_batch_table(tmp_path / 'delivery.tsv',export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'corrected.xlsx')))
+    assert (appended_rows,replaced_rows) == (1,1)
+    assert list(zip(merged_df['Flow Cell ID'],merged_df['Batch'],merged_df['Shipped date'])) == [('PA00160','B7','2023-10-01'),('PA00161','B6','2023-06-10'),('PA00160','B6','2023-06-13')]
+    # merging corrected spreadsheet again changes nothing
+    merged_df.to_csv(tmp_path / 'delivery.tsv',index=False,sep="\t")
+    assert export_flow_cell_delivery_dates.update_delivery_date_batch_table(tmp_path / 'delivery.tsv',export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'corrected.xlsx')))[1:] == (0,0)
+
+def test_iso_date_cells_are_parsed(tmp_path):
+    write_xlsx(tmp_path / 'shipments.xlsx',{'Shipments' : [get_header(),
+    [('inlineStr','PA00160'),('inlineStr','B6'),('d','2023-06-10T00:00:00')],
+    [('inlineStr','PA00161'),('inlineStr','B6'),('n',45087)]]})
+    delivery_date_batch_df=export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx'))
+    assert list(delivery_date_batch_df['Shipped date']) == [pd.Timestamp('2023-06-10'),pd.Timestamp('2023-06-10')]
+
+def test_unparsed_dates_are_reported(tmp_path,capsys):
+    write_xlsx(tmp_path / 'shipments.xlsx',{'Shipments' : [get_header(),
+    [('inlineStr','PA00160'),('inlineStr','B6'),('inlineStr','not shipped yet')],
+    [('inlineStr','PA00161'),('inlineStr','B6'),('n',45087)]]})
+    delivery_date_batch_df=export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx'))
+    assert list(delivery_date_batch_df['Flow Cell ID']) == ['PA00161']
+    assert '1 rows of sheet Shipments' in capsys.readouterr().out
+
+def test_sheets_read_in_parallel_with_shared_strings(tmp_path,capsys):
+    # shared strings are read once and sent to sheet reading processes
+    write_xlsx(tmp_path / 'shipments.xlsx',{'2023' : [get_header(),[('s',0),('s',1),('n',45087)],[('s',2),('s',1),('s',3)]],
+    '2024' : [get_header(),[('s',2),('s',1),('n',45300)]]},shared_strings=['PA00160','B6','PA00161','not shipped yet'])
+    delivery_date_batch_df=export_flow_cell_delivery_dates.make_delivery_date_batch_table(str(tmp_path / 'shipments.xlsx'),processes=2)
+    assert list(zip(delivery_date_batch_df['Flow Cell ID'],delivery_date_batch_df['Batch'])) == [('PA00160','B6'),('PA00161','B6')]
+    # unparsed dates of worker processes are reported by main process
+    assert '1 rows of sheet 2023' in capsys.readouterr().out
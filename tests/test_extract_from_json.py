@@ -0,0 +1,36 @@
+import glob
+import os
+import pandas as pd
+import CARDlongread_extract_from_json as extract_from_json
+import CARDlongread_extract_summary_statistics as summary_statistics
+
+# example tables are in repository root
+repo_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_sample_json_files():
+    return sorted(glob.glob(os.path.join(repo_dir,'sample_jsons','*.json')))
+
+def test_typed_run_table_matches_tsv_output(tmp_path):
+    sequencing_report_df=extract_from_json.extract_run_table(get_sample_json_files())
+    sequencing_report_df.to_csv(tmp_path / 'output.tsv',sep='\t',index=False)
+    typed_run_table=extract_from_json.get_typed_run_table(sequencing_report_df)
+    pd.testing.assert_frame_equal(typed_run_table,pd.read_csv(tmp_path / 'output.tsv',sep='\t'))
+    # summary statistics script reads both into the same run table
+    pd.testing.assert_frame_equal(summary_statistics.read_run_table(typed_run_table,1),summary_statistics.read_run_table(str(tmp_path / 'output.tsv'),1))
+
+def test_cohort_run_tables_parse_overlapping_reports_once(monkeypatch):
+    files=get_sample_json_files()
+    cohort_files={'A' : files[:6],'B' : files[3:],'C' : [files[4],files[0],files[4]]}
+    read_files=[]
+    read_json_report=extract_from_json.read_json_report
+    def counted_read_json_report(x):
+        read_files.append(x)
+        return read_json_report(x)
+    monkeypatch.setattr(extract_from_json,'read_json_report',counted_read_json_report)
+    cohort_run_tables=extract_from_json.extract_cohort_run_tables(cohort_files)
+    assert sorted(read_files) == files
+    # each cohort has the rows of extracting its own file list
+    monkeypatch.setattr(extract_from_json,'read_json_report',read_json_report)
+    for name, cohort_file_list in cohort_files.items():
+        pd.testing.assert_frame_equal(cohort_run_tables[name].reset_index(drop=True),extract_from_json.extract_run_table(cohort_file_list).reset_index(drop=True))
+    assert list(extract_from_json.combine_cohort_run_tables(cohort_run_tables)['Group']) == ['A']*6 + ['B']*6 + ['C']*3
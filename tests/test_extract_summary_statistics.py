@@ -0,0 +1,154 @@
+import os
+import statistics
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import CARDlongread_extract_summary_statistics as summary_statistics
+
+# example tables are in repository root
+repo_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# summary statistics of one column as computed per column before batching
+def get_column_summary_statistics(column):
+    column=pd.to_numeric(column).dropna()
+    if len(column) == 0:
+        return [0] + [np.nan]*6
+    return [column.count(),column.min(),column.max(),round(np.nanmean(column),3),round(np.nanmedian(column),3),round(statistics.mode(column),3),round(np.nanstd(column),3)]
+
+def test_batched_statistics_match_per_column_statistics():
+    run_tables=[summary_statistics.read_run_table(os.path.join(repo_dir,'group_comparison/cohort_' + i + '_output.tsv'),1).assign(Group='C' + i) for i in ['1','2']]
+    run_table=pd.concat(run_tables,ignore_index=True)
+    properties=[i for i in summary_statistics.summary_statistics_properties if (i[1] == 'runs') and (i[2] in run_table)]
+    batched_statistics=summary_statistics.get_batched_summary_statistics({'runs' : run_table},properties,'Group',['C1','C2'])
+    for group_run_table in run_tables:
+        group_statistics=batched_statistics[group_run_table['Group'][0]]
+        for property_name, _, column in properties:
+            assert group_statistics.loc[property_name,'Total':'Standard Deviation'].tolist() == pytest.approx(get_column_summary_statistics(group_run_table[column]),nan_ok=True), property_name
+
+def test_flow_cells_per_experiment_dist_of_empty_column():
+    flow_cells_per_experiment_dist=summary_statistics.get_flow_cells_per_experiment_dist(pd.Series([],dtype='int64'))
+    assert list(flow_cells_per_experiment_dist.columns) == ['Flow Cells','Frequency']
+    assert len(flow_cells_per_experiment_dist) == 0
+
+def test_run_filters_emptying_group(tmp_path):
+    # only runs of cohort 1 are in this experiment, so cohort 2 has no runs left
+    summary_statistics.main(['-input',os.path.join(repo_dir,'group_comparison/cohort_1_output.tsv'),os.path.join(repo_dir,'group_comparison/cohort_2_output.tsv'),'-names','C1','C2','-experiment','COL_109_FTX','-skip_plots','violin','scatter','-processes','1','-output',str(tmp_path / 'empty_group.xlsx')])
+    workbook=openpyxl.load_workbook(tmp_path / 'empty_group.xlsx',read_only=True)
+    assert 'C2 statistics' in workbook.sheetnames
+    # empty group has zero runs for every property
+    assert next(workbook['C2 statistics'].iter_rows(min_row=2,max_row=2,values_only=True))[:2] == ('Read N50 (kb)',0)
+
+def test_run_filters_emptying_table(tmp_path):
+    with pytest.raises(SystemExit,match='No runs left'):
+        summary_statistics.main(['-input',os.path.join(repo_dir,'example_output.tsv'),'-date_from','2030-01-01','-processes','1','-output',str(tmp_path / 'empty.xlsx')])
+
+def test_stage_cache_skips_files_writable_by_others(tmp_path):
+    summary_statistics.write_stage_cache(str(tmp_path),'stage',pd.DataFrame({'a' : [1,2]}))
+    assert summary_statistics.read_stage_cache(str(tmp_path),'stage')['a'].tolist() == [1,2]
+    # group writable stage output could have been written by someone else
+    os.chmod(tmp_path / 'stage.pkl',0o664)
+    assert summary_statistics.read_stage_cache(str(tmp_path),'stage') is None
+
+def get_n50_plot_job(title='Read N50',legend_label='Cohort 1'):
+    import matplotlib.patches as mpatches
+    return summary_statistics.violinswarmplot_job('runs','N50 (kb)','Group',[mpatches.Patch(color='tab:blue',label=legend_label)],None,False,'Read N50 plot',x_axis_title='Read N50 (kb)',title=title)
+
+def test_plot_cache_key_stability():
+    run_table=summary_statistics.read_run_table(os.path.join(repo_dir,'example_output.tsv'),1).assign(Group='C1')
+    plot_cache_key=summary_statistics.get_plot_cache_key(get_n50_plot_job(),{'runs' : run_table})
+    # same plot of a copy of the same data, with new legend patch objects, has the same key
+    assert summary_statistics.get_plot_cache_key(get_n50_plot_job(),{'runs' : run_table.copy()}) == plot_cache_key
+    # columns the plot does not use do not change the key
+    assert summary_statistics.get_plot_cache_key(get_n50_plot_job(),{'runs' : run_table.assign(**{'Data output (Gb)' : 0})}) == plot_cache_key
+    # plotted values and plot options do
+    changed_run_table=run_table.copy()
+    changed_run_table.loc[0,'N50 (kb)']=changed_run_table.loc[0,'N50 (kb)'] + 1
+    assert summary_statistics.get_plot_cache_key(get_n50_plot_job(),{'runs' : changed_run_table}) != plot_cache_key
+    assert summary_statistics.get_plot_cache_key(get_n50_plot_job(title='Other title'),{'runs' : run_table}) != plot_cache_key
+    assert summary_statistics.get_plot_cache_key(get_n50_plot_job(legend_label='Cohort 2'),{'runs' : run_table}) != plot_cache_key
+
+def test_plot_cache_reuses_cached_plots(tmp_path,monkeypatch):
+    run_table=summary_statistics.read_run_table(os.path.join(repo_dir,'example_output.tsv'),1).assign(Group='C1')
+    rendered_plot_jobs=[]
+    # stand-in renderer records plot jobs and returns plot title as image data
+    def render_plot_jobs(plot_jobs,tables,processes=1):
+        rendered_plot_jobs.extend(plot_jobs)
+        return [b'png ' + i[3]['title'].encode() for i in plot_jobs]
+    monkeypatch.setattr(summary_statistics,'render_plot_jobs',render_plot_jobs)
+    plot_jobs=[get_n50_plot_job(),get_n50_plot_job(title='Other title')]
+    assert summary_statistics.get_plot_images(plot_jobs,{'runs' : run_table},plot_cache_dir=str(tmp_path)) == [b'png Read N50',b'png Other title']
+    # second run renders nothing
+    assert summary_statistics.get_plot_images(plot_jobs,{'runs' : run_table},plot_cache_dir=str(tmp_path)) == [b'png Read N50',b'png Other title']
+    assert len(rendered_plot_jobs) == 2
+
+def get_selected_plot_names(plots=None,skip_plots=None):
+    return [i['name'] for i in summary_statistics.select_report_plots(plots,skip_plots)]
+
+def test_select_report_plots_by_name_and_tag():
+    assert get_selected_plot_names() == [i['name'] for i in summary_statistics.report_plots]
+    # names and tags select plots in report order
+    assert get_selected_plot_names(['Storage time plot','Read N50 plot']) == ['Read N50 plot','Storage time plot']
+    assert get_selected_plot_names(['n50','violin']) == [i['name'] for i in summary_statistics.report_plots if ('n50' in i['tags']) or (i['plot_type'] == 'violinswarmplot')]
+    # skipped names and tags are removed from selection
+    assert get_selected_plot_names(['n50'],['scatter']) == ['Read N50 plot']
+    assert 'Pore difference over time' not in get_selected_plot_names(skip_plots=['platform_qc'])
+    assert all(i['plot_type'] == 'scatterplot' for i in summary_statistics.select_report_plots(skip_plots=['violin']))
+
+def test_select_report_plots_of_unknown_name():
+    with pytest.raises(SystemExit,match='Unknown plot name or tag nanopore'):
+        summary_statistics.select_report_plots(['n50','nanopore'])
+
+def test_rollup_cube_totals():
+    run_tables=[summary_statistics.read_run_table(os.path.join(repo_dir,'group_comparison/cohort_' + i + '_output.tsv'),1).assign(Group='C' + i) for i in ['1','2']]
+    run_table=pd.concat(run_tables,ignore_index=True)
+    # every other run has platform qc
+    platform_qc_table=run_table[::2].assign(total_pore_count=7000,**{'Pore Difference' : 7000 - run_table['Starting Active Pores'][::2]})
+    rollup_cube=summary_statistics.get_rollup_cube({'runs' : run_table,'platform_qc' : platform_qc_table},summary_statistics.summary_statistics_properties,'Group')
+    assert rollup_cube['Runs'].sum() == len(run_table)
+    assert rollup_cube['Runs with platform QC'].sum() == len(platform_qc_table)
+    assert rollup_cube.groupby('Group')['Runs'].sum().to_dict() == {'C1' : len(run_tables[0]),'C2' : len(run_tables[1])}
+    for property_name, table_name, column in summary_statistics.summary_statistics_properties:
+        if property_name + ' count' not in rollup_cube:
+            continue
+        values=pd.to_numeric({'runs' : run_table,'platform_qc' : platform_qc_table}[table_name][column])
+        assert rollup_cube[property_name + ' count'].sum() == values.count(), property_name
+        assert rollup_cube[property_name + ' sum'].sum() == pytest.approx(values.sum()), property_name
+        assert rollup_cube[property_name + ' sum of squares'].sum() == pytest.approx((values.astype('float64')**2).sum()), property_name
+        # columns without values have missing min and max
+        assert rollup_cube[property_name + ' min'].min() == pytest.approx(values.min(),nan_ok=True), property_name
+        assert rollup_cube[property_name + ' max'].max() == pytest.approx(values.max(),nan_ok=True), property_name
+    # mean and population standard deviation of one group rolled up from its cells
+    group_cube=rollup_cube[rollup_cube['Group'] == 'C1']
+    (count,total,total_of_squares)=group_cube[['Read N50 (kb) count','Read N50 (kb) sum','Read N50 (kb) sum of squares']].sum()
+    assert total/count == pytest.approx(run_tables[0]['N50 (kb)'].mean())
+    assert (total_of_squares/count - (total/count)**2)**0.5 == pytest.approx(run_tables[0]['N50 (kb)'].std(ddof=0))
+
+def test_incremental_reuses_unchanged_plots(tmp_path,monkeypatch):
+    run_table=pd.read_csv(os.path.join(repo_dir,'example_output.tsv'),sep='\t')
+    run_table.to_csv(tmp_path / 'input.tsv',sep='\t',index=False)
+    rendered_plots=[]
+    render_plot_jobs=summary_statistics.render_plot_jobs
+    # record worksheet names of rendered plots
+    def recorded_render_plot_jobs(plot_jobs,tables,processes=1):
+        rendered_plots.extend(i[0] for i in plot_jobs)
+        return render_plot_jobs(plot_jobs,tables,processes)
+    monkeypatch.setattr(summary_statistics,'render_plot_jobs',recorded_render_plot_jobs)
+    def run_incremental():
+        rendered_plots.clear()
+        summary_statistics.main(['-input',str(tmp_path / 'input.tsv'),'-plots','Read N50 plot','Run data output plot','-processes','1','--incremental','-output',str(tmp_path / 'output.xlsx')])
+        return sorted(rendered_plots)
+    assert run_incremental() == ['Read N50 plot','Run data output plot']
+    workbook_images=summary_statistics.get_workbook_images(str(tmp_path / 'output.xlsx'))
+    # unchanged input renders no plots and keeps plot images
+    assert run_incremental() == []
+    assert summary_statistics.get_workbook_images(str(tmp_path / 'output.xlsx')) == workbook_images
+    # changed N50 of one run renders N50 plot only
+    run_table.loc[0,'N50 (kb)']=run_table.loc[0,'N50 (kb)'] + 1
+    run_table.to_csv(tmp_path / 'input.tsv',sep='\t',index=False)
+    assert run_incremental() == ['Read N50 plot']
+    assert summary_statistics.get_workbook_images(str(tmp_path / 'output.xlsx'))['Run data output plot'] == workbook_images['Run data output plot']
+    # workbook changed since manifest was written renders all plots
+    with open(tmp_path / 'output.xlsx','ab') as outfile:
+        outfile.write(b'\0')
+    assert run_incremental() == ['Read N50 plot','Run data output plot']
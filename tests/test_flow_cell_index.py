@@ -0,0 +1,16 @@
+import pandas as pd
+import pytest
+import CARDlongread_flow_cell_index
+
+def test_lookup_of_missing_index_fails_without_creating_it(tmp_path):
+    with pytest.raises(SystemExit,match='not found'):
+        CARDlongread_flow_cell_index.get_flow_cell_index_row_counts(str(tmp_path / 'typo.sqlite'))
+    with pytest.raises(SystemExit,match='not found'):
+        CARDlongread_flow_cell_index.lookup_platform_qc(str(tmp_path / 'typo.sqlite'),['PA00160'])
+    assert not (tmp_path / 'typo.sqlite').exists()
+
+def test_lookup_of_built_index(tmp_path):
+    platform_qc_table=pd.DataFrame({'position' : ['1A'], 'flow_cell_id' : ['PA00160'], 'product_code' : ['FLO-PRO114M'], 'passed' : [True], 'total_pore_count' : [7000], 'timestamp' : [1700000000]})
+    assert CARDlongread_flow_cell_index.ingest_platform_qc(str(tmp_path / 'index.sqlite'),platform_qc_table) == 1
+    assert CARDlongread_flow_cell_index.get_flow_cell_index_row_counts(str(tmp_path / 'index.sqlite')) == {'platform_qc' : 1, 'delivery_date_batches' : 0}
+    assert list(CARDlongread_flow_cell_index.lookup_platform_qc(str(tmp_path / 'index.sqlite'),['PA00160','PA00161'])['total_pore_count']) == [7000]
@@ -0,0 +1,32 @@
+import json
+import os
+import pandas as pd
+import CARDlongread_extract_summary_statistics as summary_statistics
+import CARDlongread_summary_state
+
+# example tables are in repository root
+repo_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_run_table(values,first_run=0):
+    return pd.DataFrame({'Flow Cell ID' : ['PA' + str(i) for i in range(first_run,first_run + len(values))], 'Start Run Timestamp' : 1700000000, 'N50 (kb)' : values})
+
+def test_merged_state_matches_batched_statistics():
+    run_table=summary_statistics.read_run_table(os.path.join(repo_dir,'example_output.tsv'),1)
+    properties=[i for i in summary_statistics.summary_statistics_properties if (i[1] == 'runs') and (i[2] in run_table)]
+    # state of each half of the runs, merged
+    state=CARDlongread_summary_state.new_summary_state()
+    CARDlongread_summary_state.update_summary_state(state,run_table[:len(run_table)//2],'runs',properties)
+    other_state=CARDlongread_summary_state.new_summary_state()
+    CARDlongread_summary_state.update_summary_state(other_state,run_table[len(run_table)//2:],'runs',properties)
+    CARDlongread_summary_state.merge_summary_states(state,other_state)
+    batched_statistics=summary_statistics.get_batched_summary_statistics({'runs' : run_table},properties)[None]
+    pd.testing.assert_frame_equal(CARDlongread_summary_state.get_summary_state_statistics(state,'All runs',properties),batched_statistics.reset_index(drop=True),check_dtype=False)
+
+def test_saved_state_keeps_exact_values(tmp_path):
+    state=CARDlongread_summary_state.new_summary_state()
+    CARDlongread_summary_state.update_summary_state(state,get_run_table([23.90999,23.91001,23.91001]),'runs',[('Read N50 (kb)','runs','N50 (kb)')])
+    CARDlongread_summary_state.save_summary_state(state,str(tmp_path / 'state.json'))
+    state=CARDlongread_summary_state.load_summary_state(str(tmp_path / 'state.json'))
+    assert state['groups']['All runs']['properties']['Read N50 (kb)']['values'] == {23.90999 : 1, 23.91001 : 2}
+    # runs already in state are skipped
+    assert CARDlongread_summary_state.update_summary_state(state,get_run_table([23.90999]),'runs',[('Read N50 (kb)','runs','N50 (kb)')]) == {'All runs' : 0}